@@ -0,0 +1,78 @@
+"""
+上游 JSON 响应转发微基准
+
+对比三种由上游响应构建网关响应的方式（股票列表，条目数从 100 增长到 20000）：
+- 解析再序列化：原先的 response.json() + JSONResponse（标准库 json）
+- orjson 解析再序列化：需要由网关构建 JSON 时的开销
+- 原样转发：upstream_response 直接使用上游字节
+
+用法:
+    python -m benchmarks.json_passthrough
+"""
+
+import json
+import time
+from typing import Callable, List
+
+import httpx
+from fastapi.responses import JSONResponse
+
+from src.utils.json_codec import CODECS, FastJSONResponse, upstream_response
+
+ITEM_COUNTS = [100, 1000, 5000, 20000]
+
+
+def stock_payload(count: int) -> bytes:
+    """生成与股票列表接口结构相近的 JSON"""
+    items = [
+        {
+            "code": f"{600000 + i}",
+            "name": f"股票{i}",
+            "price": round(10 + i * 0.01, 2),
+            "change_percent": round((i % 200 - 100) / 10, 2),
+            "volume": 1000 * i,
+            "industry": "银行",
+            "listed_date": "2020-01-01",
+            "tags": ["沪深300", "高股息"]
+        }
+        for i in range(count)
+    ]
+    return json.dumps({"total": count, "items": items}, ensure_ascii=False).encode("utf-8")
+
+
+def _timeit(func: Callable[[], object], rounds: int) -> float:
+    """平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    print(f"{'条目数':>8} {'大小 (KB)':>10} {'json 解析+序列化 (μs)':>22} {'orjson 解析+序列化 (μs)':>24} {'原样转发 (μs)':>14}")
+    for count in ITEM_COUNTS:
+        body = stock_payload(count)
+        response = httpx.Response(200, content=body, headers={"content-type": "application/json"})
+        rounds = max(5, 20000 // count)
+
+        def stdlib_roundtrip():
+            return JSONResponse(content=response.json(), status_code=response.status_code)
+
+        results: List[float] = [_timeit(stdlib_roundtrip, rounds)]
+        if "orjson" in CODECS:
+            orjson_codec = CODECS["orjson"]
+            results.append(_timeit(
+                lambda: FastJSONResponse(content=orjson_codec.loads(response.content), status_code=200),
+                rounds
+            ))
+        else:
+            results.append(float("nan"))
+        results.append(_timeit(lambda: upstream_response(response), rounds))
+
+        print(
+            f"{count:>8} {len(body) / 1024:>10.1f} {results[0]:>22.1f} {results[1]:>24.1f} {results[2]:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+网关压测套件
+
+启动本地桩服务（fast / slow / large / flaky / hang），生成指向桩服务的服务配置，
+以子进程启动网关后按固定并发或固定速率施加负载，输出吞吐量、延迟分位数、网关自身开销
+与各 worker 的 CPU、内存，结果保存为 JSON，可与基线对比
+"""
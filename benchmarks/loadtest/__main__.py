@@ -0,0 +1,238 @@
+"""
+网关压测
+
+用法:
+    python -m benchmarks.loadtest [--scenarios fast,slow,large,flaky,hang] [--workers 2] [--launcher]
+        [--concurrency 50 | --rps 500] [--duration 10] [--output 结果.json] [--baseline 基线.json]
+
+示例:
+    # 保存基线
+    python -m benchmarks.loadtest --output benchmarks/results/baseline.json
+    # 修改代码后对比，任一指标变差超过 10% 时退出码为 1
+    python -m benchmarks.loadtest --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import os
+import platform
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import yaml
+
+from benchmarks.loadtest import report
+from benchmarks.loadtest.driver import run_load
+from benchmarks.loadtest.resources import ResourceSampler
+from benchmarks.loadtest.scenarios import SCENARIOS, Scenario, build_services_config
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# 多 worker 时指标快照的同步间隔；读取开销指标前等待两个间隔
+METRICS_SYNC_INTERVAL = 0.5
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(args: List[str], env: Optional[Dict[str, str]] = None, module: str = "uvicorn") -> subprocess.Popen:
+    """以子进程启动 uvicorn（或其他模块）"""
+    return subprocess.Popen(
+        [sys.executable, "-m", module, *args],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    """等待服务可以响应，子进程提前退出时输出其错误信息"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"进程启动失败: {process.stderr.read().decode(errors='replace')}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"等待 {url} 超时")
+                await asyncio.sleep(0.2)
+
+
+def _stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _overhead(base_url: str) -> Dict[str, tuple]:
+    """读取 /metrics 中各路由网关开销直方图的 (总和, 次数)"""
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        text = (await client.get("/metrics")).text
+    totals: Dict[str, list] = {}
+    pattern = re.compile(r'^gateway_request_overhead_seconds_(sum|count)\{.*?route="([^"]*)".*\} (\S+)$')
+    for line in text.splitlines():
+        match = pattern.match(line)
+        if match:
+            kind, route, value = match.groups()
+            entry = totals.setdefault(route, [0.0, 0.0])
+            entry[0 if kind == "sum" else 1] += float(value)
+    return {route: tuple(values) for route, values in totals.items()}
+
+
+async def _run_scenario(
+    scenario: Scenario,
+    base_url: str,
+    gateway: subprocess.Popen,
+    options: argparse.Namespace,
+    headers: Dict[str, str]
+) -> dict:
+    """预热后施加负载，采集延迟、网关开销与资源占用"""
+    if options.warmup > 0:
+        await run_load(base_url, scenario.url_path, options.warmup, options.concurrency, options.rps, headers)
+
+    await asyncio.sleep(METRICS_SYNC_INTERVAL * 2)
+    before = (await _overhead(base_url)).get(scenario.path, (0.0, 0.0))
+    sampler = ResourceSampler(gateway.pid)
+    sampler.start()
+    result = await run_load(base_url, scenario.url_path, options.duration, options.concurrency, options.rps, headers)
+    workers = await sampler.stop()
+    await asyncio.sleep(METRICS_SYNC_INTERVAL * 2)
+    after = (await _overhead(base_url)).get(scenario.path, (0.0, 0.0))
+
+    summary = result.summary()
+    count = after[1] - before[1]
+    summary["gateway_overhead_ms"] = round((after[0] - before[0]) / count * 1000, 3) if count else None
+    summary["workers"] = workers
+    peaks = [w["rss_mb_peak"] for w in workers if w["rss_mb_peak"]]
+    summary["rss_mb_peak"] = round(sum(peaks), 1) if peaks else None
+    return summary
+
+
+async def main(options: argparse.Namespace) -> int:
+    names = [name.strip() for name in options.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"未知场景: {unknown}，可选: {list(SCENARIOS)}")
+        return 2
+    scenarios = [SCENARIOS[name] for name in names]
+
+    workdir = tempfile.mkdtemp(prefix="gateway-loadtest-")
+    stub_port, gateway_port = _free_port(), _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    gateway_url = f"http://127.0.0.1:{gateway_port}"
+
+    config_path = os.path.join(workdir, "services.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(build_services_config(stub_url, scenarios), f, allow_unicode=True, sort_keys=False)
+
+    env = dict(os.environ)
+    env["CONFIG_FILE"] = config_path
+    env["METRICS_DIR"] = os.path.join(workdir, "metrics")
+    env["METRICS_SYNC_INTERVAL"] = str(METRICS_SYNC_INTERVAL)
+    # 默认关闭访问日志并提高日志级别，避免输出成为瓶颈；可通过环境变量覆盖
+    env.setdefault("ACCESS_LOG", "false")
+    env.setdefault("LOG_LEVEL", "WARNING")
+
+    common = ["--host", "127.0.0.1", "--log-level", "warning", "--no-access-log"]
+    stub = _start(["benchmarks.loadtest.stubs:app", "--port", str(stub_port),
+                   "--workers", str(options.stub_workers), *common])
+    gateway = None
+    try:
+        await _wait_ready(f"{stub_url}/health", stub)
+        if options.launcher:
+            # 生产启动器：worker 数等参数由环境变量传入
+            env.update(HOST="127.0.0.1", PORT=str(gateway_port), WORKERS=str(options.workers))
+            gateway = _start([], env, module="src.server")
+        else:
+            gateway = _start(["src.main:app", "--port", str(gateway_port),
+                              "--workers", str(options.workers), *common], env)
+        await _wait_ready(f"{gateway_url}/health", gateway)
+
+        headers = {"Accept-Encoding": options.accept_encoding}
+        results = {
+            "meta": {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "git_commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "workers": options.workers,
+                "launcher": "src.server" if options.launcher else "uvicorn",
+                "concurrency": options.concurrency,
+                "rps": options.rps,
+                "duration": options.duration,
+                "accept_encoding": options.accept_encoding
+            },
+            "scenarios": {}
+        }
+        for scenario in scenarios:
+            print(f"▶ {scenario.name}: {scenario.description}")
+            results["scenarios"][scenario.name] = await _run_scenario(scenario, gateway_url, gateway, options, headers)
+    finally:
+        if gateway is not None:
+            _stop(gateway)
+        _stop(stub)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report.print_results(results)
+    output = options.output or os.path.join(
+        "benchmarks", "results", f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    report.save(results, output)
+    print(f"\n结果已保存: {output}")
+
+    if options.baseline:
+        regressions = report.compare(results, report.load(options.baseline), options.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 项超出容差 {options.tolerance:.0%}:")
+            for item in regressions:
+                print(f"  {item}")
+            return 1
+        print(f"\n✅ 所有指标在容差 {options.tolerance:.0%} 以内")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="网关压测")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"逗号分隔的场景，可选: {', '.join(SCENARIOS)}")
+    parser.add_argument("--workers", type=int, default=1, help="网关 worker 数")
+    parser.add_argument("--launcher", action="store_true", help="以生产启动器 python -m src.server 启动网关")
+    parser.add_argument("--stub-workers", type=int, default=1, help="桩服务 worker 数")
+    parser.add_argument("--concurrency", type=int, default=50, help="闭环并发数（开环模式下为最大连接数）")
+    parser.add_argument("--rps", type=float, default=None, help="开环模式的目标速率，不指定时使用闭环模式")
+    parser.add_argument("--duration", type=float, default=10.0, help="每个场景的压测时长（秒）")
+    parser.add_argument("--warmup", type=float, default=2.0, help="每个场景的预热时长（秒）")
+    parser.add_argument("--accept-encoding", default="identity", help="请求的 Accept-Encoding")
+    parser.add_argument("--output", default=None, help="结果 JSON 路径，默认 benchmarks/results/loadtest-<时间>.json")
+    parser.add_argument("--baseline", default=None, help="对比的基线结果 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的相对变差比例")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,125 @@
+"""
+压测负载生成
+
+- 闭环（默认）：concurrency 个协程循环发送请求，测量最大吞吐
+- 开环（指定 rps）：按固定速率发出请求，不等待前一个请求完成；延迟从计划发送时刻算起，
+  避免网关变慢时发送端跟着降速而低估尾延迟（coordinated omission）
+"""
+
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+
+@dataclass
+class LoadResult:
+    """一次压测的原始结果"""
+
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    client_cpu: float = 0.0
+
+    def record(self, latency: float, status: Optional[int], error: Optional[str]):
+        self.latencies.append(latency)
+        if error is not None:
+            self.errors[error] += 1
+        else:
+            self.statuses[str(status)] += 1
+
+    def summary(self) -> Dict[str, object]:
+        """吞吐量、延迟分位数与状态码分布"""
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not count:
+                return None
+            return round(latencies[min(count - 1, int(count * p))] * 1000, 3)
+
+        return {
+            "requests": count,
+            "throughput_rps": round(count / self.elapsed, 1) if self.elapsed else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / count * 1000, 3) if count else None,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": percentile(1.0)
+            },
+            "status": dict(self.statuses),
+            "errors": dict(self.errors),
+            # 发送端自身的 CPU 占用，接近 100% 时吞吐量受限于压测进程而非网关
+            "client_cpu_percent": round(self.client_cpu / self.elapsed * 100, 1) if self.elapsed else 0.0
+        }
+
+
+async def _send(client: httpx.AsyncClient, url: str, result: LoadResult, start: float):
+    """发送一个请求，延迟从 start 算起"""
+    status = error = None
+    try:
+        response = await client.get(url)
+        status = response.status_code
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    result.record(time.perf_counter() - start, status, error)
+
+
+async def run_load(
+    base_url: str,
+    path: str,
+    duration: float,
+    concurrency: int,
+    rps: Optional[float] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> LoadResult:
+    """对单个路径施加负载
+
+    Args:
+        base_url: 网关地址
+        path: 请求路径（含查询参数）
+        duration: 持续时间（秒）
+        concurrency: 闭环模式的并发数；开环模式的最大连接数
+        rps: 开环模式的目标速率，为 None 时使用闭环模式
+        headers: 额外请求头
+
+    Returns:
+        LoadResult: 原始结果
+    """
+    result = LoadResult()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(60.0, pool=None)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout, headers=headers) as client:
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        deadline = start + duration
+
+        if rps is None:
+            async def worker():
+                while time.perf_counter() < deadline:
+                    await _send(client, path, result, time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        else:
+            interval = 1.0 / rps
+            tasks = []
+            sent = 0
+            while True:
+                scheduled = start + sent * interval
+                if scheduled >= deadline:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(_send(client, path, result, scheduled)))
+                sent += 1
+            await asyncio.gather(*tasks)
+
+        result.elapsed = time.perf_counter() - start
+        result.client_cpu = time.process_time() - cpu_start
+    return result
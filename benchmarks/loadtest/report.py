@@ -0,0 +1,105 @@
+"""
+压测结果的保存、输出与基线对比
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+# 对比的指标：(显示名称, 取值路径, 越大越好)
+COMPARED_METRICS: List[Tuple[str, Tuple[str, ...], bool]] = [
+    ("吞吐量 (req/s)", ("throughput_rps",), True),
+    ("p50 (ms)", ("latency_ms", "p50"), False),
+    ("p95 (ms)", ("latency_ms", "p95"), False),
+    ("p99 (ms)", ("latency_ms", "p99"), False),
+    ("网关开销 (ms)", ("gateway_overhead_ms",), False),
+    ("内存峰值 (MB)", ("rss_mb_peak",), False),
+]
+
+
+def save(results: dict, path: str):
+    """以 JSON 保存结果"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> dict:
+    """读取保存的结果"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _value(scenario: dict, keys: Tuple[str, ...]) -> Optional[float]:
+    value = scenario
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def print_results(results: dict):
+    """输出各场景的结果"""
+    meta = results["meta"]
+    load_desc = f"{meta['rps']} req/s 开环" if meta.get("rps") else f"并发 {meta['concurrency']} 闭环"
+    print(f"\nworker 数 {meta['workers']}，{load_desc}，每个场景 {meta['duration']}s")
+    print(
+        f"{'场景':<8} {'请求数':>8} {'吞吐量':>10} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'网关开销':>10} {'worker CPU%':>12} {'内存 MB':>9} {'压测端 CPU%':>12}  状态码 / 错误"
+    )
+    for name, scenario in results["scenarios"].items():
+        latency = scenario["latency_ms"]
+        workers = scenario.get("workers") or []
+        cpu = "/".join(f"{w['cpu_percent']:.0f}" for w in workers if w["cpu_percent"] is not None) or "-"
+        outcome = {**scenario["status"], **scenario["errors"]}
+        print(
+            f"{name:<8} {scenario['requests']:>8} {scenario['throughput_rps']:>10.1f} "
+            f"{_fmt(latency['p50']):>8} {_fmt(latency['p95']):>8} {_fmt(latency['p99']):>8} "
+            f"{_fmt(scenario.get('gateway_overhead_ms')):>10} {cpu:>12} "
+            f"{_fmt(scenario.get('rss_mb_peak')):>9} {scenario['client_cpu_percent']:>12.1f}  {outcome}"
+        )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """与基线对比并输出差异
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        tolerance: 允许的相对变差比例，如 0.1 表示 10%
+
+    Returns:
+        List[str]: 超出容差的退化项
+    """
+    regressions = []
+    print(f"\n与基线对比（{baseline['meta'].get('created')}，commit {baseline['meta'].get('git_commit')}）")
+    differing = [
+        key for key in ("workers", "launcher", "concurrency", "rps", "duration", "accept_encoding")
+        if baseline["meta"].get(key) != results["meta"].get(key)
+    ]
+    if differing:
+        print(f"⚠️ 压测参数与基线不同: {differing}，结果不可直接比较")
+    print(f"{'场景':<8} {'指标':<14} {'基线':>10} {'本次':>10} {'变化':>8}")
+    for name, scenario in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        for label, keys, higher_is_better in COMPARED_METRICS:
+            old, new = _value(base, keys), _value(scenario, keys)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  ← 退化"
+                regressions.append(f"{name} {label}: {old:.2f} -> {new:.2f}")
+            print(f"{name:<8} {label:<14} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{flag}")
+    return regressions
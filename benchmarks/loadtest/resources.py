@@ -0,0 +1,126 @@
+"""
+网关 worker 的 CPU 与内存采样
+
+通过 /proc 读取（仅 Linux）：多 worker 模式下采样 uvicorn 主进程的子进程，单 worker 模式下采样主进程本身
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+PROC = "/proc"
+SAMPLE_INTERVAL = 0.5
+
+
+def available() -> bool:
+    """当前平台是否支持采样"""
+    return os.path.isdir(os.path.join(PROC, "self"))
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _stat_fields(pid: int) -> Optional[List[str]]:
+    """/proc/<pid>/stat 中进程名之后的字段（进程名可能含空格）"""
+    stat = _read(os.path.join(PROC, str(pid), "stat"))
+    if stat is None:
+        return None
+    return stat[stat.rfind(")") + 2:].split()
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    """uvicorn 的 worker 进程（排除 multiprocessing 的辅助进程）"""
+    children = []
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        fields = _stat_fields(int(entry))
+        if fields is None or int(fields[1]) != master_pid:
+            continue
+        cmdline = _read(os.path.join(PROC, entry, "cmdline")) or ""
+        if "resource_tracker" in cmdline:
+            continue
+        children.append(int(entry))
+    return sorted(children) or [master_pid]
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """进程累计 CPU 时间（用户态 + 内核态）"""
+    fields = _stat_fields(pid)
+    if fields is None:
+        return None
+    # utime、stime 是 stat 的第 14、15 个字段
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """常驻内存（MB）"""
+    statm = _read(os.path.join(PROC, str(pid), "statm"))
+    if statm is None:
+        return None
+    return int(statm.split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class ResourceSampler:
+    """在一个压测场景期间周期性采样各 worker 的 CPU 与内存"""
+
+    def __init__(self, master_pid: int):
+        self.master_pid = master_pid
+        self._pids: List[int] = []
+        self._cpu_start: Dict[int, float] = {}
+        self._rss_peak: Dict[int, float] = {}
+        self._started = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """开始采样"""
+        if not available():
+            return
+        self._pids = worker_pids(self.master_pid)
+        self._cpu_start = {pid: _cpu_seconds(pid) or 0.0 for pid in self._pids}
+        self._rss_peak = {pid: 0.0 for pid in self._pids}
+        self._started = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> List[Dict[str, object]]:
+        """停止采样
+
+        Returns:
+            List[Dict[str, object]]: 每个 worker 的 CPU 占用率（100% 为一个核）、当前与峰值内存
+        """
+        if self._task is None:
+            return []
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._sample()
+        elapsed = time.perf_counter() - self._started
+
+        workers = []
+        for pid in self._pids:
+            cpu = _cpu_seconds(pid)
+            rss = _rss_mb(pid)
+            workers.append({
+                "pid": pid,
+                "cpu_percent": round((cpu - self._cpu_start[pid]) / elapsed * 100, 1) if cpu is not None else None,
+                "rss_mb": round(rss, 1) if rss is not None else None,
+                "rss_mb_peak": round(self._rss_peak[pid], 1)
+            })
+        return workers
+
+    def _sample(self):
+        for pid in self._pids:
+            rss = _rss_mb(pid)
+            if rss is not None and rss > self._rss_peak[pid]:
+                self._rss_peak[pid] = rss
+
+    async def _run(self):
+        while True:
+            self._sample()
+            await asyncio.sleep(SAMPLE_INTERVAL)
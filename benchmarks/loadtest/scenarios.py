@@ -0,0 +1,75 @@
+"""
+压测场景与服务配置生成
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# 生成的配置中桩服务的名称
+STUB_SERVICE = "stub"
+
+
+@dataclass
+class Scenario:
+    """一个压测场景：网关路由、请求参数与路由配置"""
+
+    name: str
+    description: str
+    path: str
+    backend_path: str
+    query: str = ""
+    route_options: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def url_path(self) -> str:
+        """压测请求的路径（含查询参数）"""
+        return f"{self.path}?{self.query}" if self.query else self.path
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in [
+        Scenario("fast", "小 JSON，立即返回（网关开销占比最大）", "/bench/fast", "/fast"),
+        Scenario("slow", "上游延迟 50ms", "/bench/slow", "/slow", query="ms=50"),
+        Scenario("large", "256KB JSON 响应体", "/bench/large", "/large", query="kb=256"),
+        Scenario(
+            "flaky", "20% 请求返回 503，重试一次", "/bench/flaky", "/flaky",
+            query="rate=0.2",
+            route_options={"retry": {"attempts": 2, "backoff_base": 0.005}}
+        ),
+        Scenario(
+            "hang", "上游不返回，500ms 后网关超时", "/bench/hang", "/hang",
+            route_options={"timeout": {"total": 0.5}}
+        ),
+    ]
+}
+
+
+def build_services_config(stub_url: str, scenarios: List[Scenario]) -> dict:
+    """生成指向桩服务的 services.yaml 内容
+
+    Args:
+        stub_url: 桩服务地址
+        scenarios: 需要注册路由的场景
+
+    Returns:
+        dict: 可直接写入 YAML 的服务配置
+    """
+    routes = []
+    for scenario in scenarios:
+        routes.append({
+            "path": scenario.path,
+            "method": "GET",
+            "backend_path": scenario.backend_path,
+            **scenario.route_options
+        })
+    return {
+        "services": {
+            STUB_SERVICE: {
+                "url": stub_url,
+                "enabled": True,
+                "health_path": "/health",
+                "pool": {"max_connections": 1000, "max_keepalive_connections": 200},
+                "routes": routes
+            }
+        }
+    }
@@ -0,0 +1,90 @@
+"""
+压测用的上游桩服务
+
+最小的 ASGI 应用（不经过 FastAPI，桩服务自身的开销尽量小），提供以下接口：
+- /fast：立即返回一小段 JSON
+- /slow?ms=50：延迟后返回
+- /large?kb=256：返回大 JSON 响应体（按大小缓存，不重复生成）
+- /flaky?rate=0.2：按比例返回 503
+- /hang：不返回，直到网关超时断开连接
+- /health：健康检查
+"""
+
+import asyncio
+import json
+import random
+from functools import lru_cache
+from typing import Dict
+from urllib.parse import parse_qs
+
+SMALL_BODY = json.dumps(
+    {"code": "600000", "name": "浦发银行", "price": 10.52, "change_percent": 1.25},
+    ensure_ascii=False
+).encode("utf-8")
+
+
+@lru_cache(maxsize=16)
+def large_body(kb: int) -> bytes:
+    """约 kb KB 的股票列表 JSON"""
+    items = []
+    size = 0
+    while size < kb * 1024:
+        item = {"code": f"{600000 + len(items)}", "name": f"股票{len(items)}", "price": 10.52, "volume": 123456}
+        items.append(item)
+        size += 80
+    return json.dumps({"total": len(items), "items": items}, ensure_ascii=False).encode("utf-8")
+
+
+async def _respond(send, status: int, body: bytes):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _drain(receive):
+    """读取完请求体"""
+    while True:
+        message = await receive()
+        if message["type"] != "http.request" or not message.get("more_body"):
+            return
+
+
+async def app(scope, receive, send):
+    """桩服务 ASGI 入口"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    await _drain(receive)
+    path = scope["path"]
+    query: Dict[str, list] = parse_qs(scope["query_string"].decode("latin-1"))
+
+    def arg(name: str, default: float) -> float:
+        return float(query.get(name, [default])[0])
+
+    if path in ("/fast", "/health"):
+        await _respond(send, 200, SMALL_BODY)
+    elif path == "/slow":
+        await asyncio.sleep(arg("ms", 50) / 1000)
+        await _respond(send, 200, SMALL_BODY)
+    elif path == "/large":
+        await _respond(send, 200, large_body(int(arg("kb", 256))))
+    elif path == "/flaky":
+        if random.random() < arg("rate", 0.2):
+            await _respond(send, 503, b'{"detail":"unavailable"}')
+        else:
+            await _respond(send, 200, SMALL_BODY)
+    elif path == "/hang":
+        # 等待客户端断开（网关超时后关闭连接）
+        while (await receive())["type"] != "http.disconnect":
+            pass
+    else:
+        await _respond(send, 404, b'{"detail":"Not Found"}')
@@ -0,0 +1,107 @@
+"""
+日志对事件循环的阻塞时间
+
+对比原先的同步 StreamHandler 与队列日志处理器：在事件循环上模拟请求，每个请求输出 3 条日志
+（原先每个请求的代理日志数量），统计日志调用占用事件循环的时间与最大循环延迟。
+输出目标分两种：
+- devnull：写入几乎不阻塞
+- slow：每次写入阻塞 0.2ms，模拟 stdout 管道被日志采集端读取不及时
+
+用法:
+    python -m benchmarks.logging_overhead
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import time
+from typing import Dict, List, TextIO
+
+from src.utils.logger import DATE_FORMAT, TEXT_FORMAT, AsyncLogHandler, JsonFormatter
+
+REQUESTS = 5000
+RECORDS_PER_REQUEST = 3
+SLOW_WRITE_SECONDS = 0.0002
+
+
+class SlowStream:
+    """每次写入都阻塞一段时间的输出流"""
+
+    def __init__(self, stream: TextIO, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, data: str):
+        time.sleep(self.delay)
+        self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+async def _measure(logger: logging.Logger) -> Dict[str, float]:
+    """模拟请求并统计日志调用耗时与事件循环延迟"""
+    durations: List[float] = []
+    lags: List[float] = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        """每 1ms 醒来一次，记录实际延迟"""
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    for i in range(REQUESTS):
+        start = time.perf_counter()
+        logger.info("代理请求: %s %s", "GET", f"http://backend:8001/api/items/{i}")
+        logger.info("服务响应: %s", 200)
+        logger.info("GET /api/items/%s 200 %.1fms", i, 1.5, extra={"fields": {"status": 200}})
+        durations.append(time.perf_counter() - start)
+        if i % 10 == 0:
+            await asyncio.sleep(0)
+    stop.set()
+    await task
+
+    durations.sort()
+    return {
+        "per_request_us": statistics.mean(durations) * 1e6,
+        "p99_us": durations[int(len(durations) * 0.99)] * 1e6,
+        "total_ms": sum(durations) * 1000,
+        "max_lag_ms": max(lags) * 1000 if lags else 0.0
+    }
+
+
+def _run(handler: logging.Handler) -> Dict[str, float]:
+    logger = logging.getLogger(f"benchmark.{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        return asyncio.run(_measure(logger))
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def main():
+    with open(os.devnull, "w") as devnull:
+        sinks = {"devnull": devnull, "slow": SlowStream(devnull, SLOW_WRITE_SECONDS)}
+        print(f"{REQUESTS} 个请求，每个请求 {RECORDS_PER_REQUEST} 条日志\n")
+        print(f"{'输出':>8} {'处理器':>10} {'每请求 (μs)':>12} {'p99 (μs)':>10} {'合计 (ms)':>10} {'最大循环延迟 (ms)':>16}")
+        for sink_name, stream in sinks.items():
+            sync_handler = logging.StreamHandler(stream)
+            sync_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+            async_handler = AsyncLogHandler(stream, JsonFormatter(), maxsize=100000)
+            for handler_name, handler in (("同步", sync_handler), ("队列", async_handler)):
+                result = _run(handler)
+                print(
+                    f"{sink_name:>8} {handler_name:>10} {result['per_request_us']:>12.1f} "
+                    f"{result['p99_us']:>10.1f} {result['total_ms']:>10.1f} {result['max_lag_ms']:>16.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
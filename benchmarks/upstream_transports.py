@@ -0,0 +1,183 @@
+"""
+上游传输方式基准
+
+在子进程中启动一个最小的后端服务（同时监听 TCP 端口与 Unix 套接字），
+以相同并发分别通过以下方式发送请求，统计吞吐量与延迟：
+- 每请求新建连接：每个请求一个新客户端（新建 TCP 连接，HTTP/1.1）
+- HTTP/1.1 连接池：网关默认的长连接客户端
+- Unix 套接字：unix:// 实例使用的传输层
+- h2c：明文 HTTP/2 多路复用（需要安装 h2 与 hypercorn，否则跳过）
+
+用法:
+    python -m benchmarks.upstream_transports [--requests 2000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+PAYLOAD = b'{"code":"600000","name":"\xe6\xb5\xa6\xe5\x8f\x91\xe9\x93\xb6\xe8\xa1\x8c","price":10.5}'
+
+
+async def backend(scope, receive, send):
+    """固定返回一小段 JSON 的 ASGI 应用"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(PAYLOAD)).encode())]
+    })
+    await send({"type": "http.response.body", "body": PAYLOAD})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(args: List[str]) -> subprocess.Popen:
+    """在子进程中启动后端"""
+    return subprocess.Popen(
+        [sys.executable, "-m", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, url: str, timeout: float = 10.0):
+    """等待后端可以响应"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.get(url)
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def _run(
+    send: Callable[[], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int
+) -> Dict[str, float]:
+    """以固定并发发送请求，统计吞吐量与延迟"""
+    latencies: List[float] = []
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await send()
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+
+async def _bench(url: str, transport: Optional[httpx.AsyncHTTPTransport], requests: int, concurrency: int):
+    """通过长期存活的客户端压测"""
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(transport=transport or httpx.AsyncHTTPTransport(limits=limits)) as client:
+        await _wait_ready(client, url)
+        # 预热，建立连接
+        await asyncio.gather(*(client.get(url) for _ in range(concurrency)))
+        return await _run(lambda: client.get(url), requests, concurrency)
+
+
+async def _bench_per_request(url: str, requests: int, concurrency: int):
+    """每个请求新建客户端（新 TCP 连接）"""
+    async def send():
+        async with httpx.AsyncClient() as client:
+            return await client.get(url)
+
+    return await _run(send, requests, concurrency)
+
+
+async def main(requests: int, concurrency: int):
+    workdir = tempfile.mkdtemp(prefix="gateway-bench-")
+    socket_path = os.path.join(workdir, "backend.sock")
+    tcp_port = _free_port()
+    app = "benchmarks.upstream_transports:backend"
+    common = ["--log-level", "warning", "--no-access-log"]
+    servers = [
+        _start_server(["uvicorn", app, "--port", str(tcp_port), *common]),
+        _start_server(["uvicorn", app, "--uds", socket_path, *common])
+    ]
+    h2c_port = None
+    if importlib.util.find_spec("h2") and importlib.util.find_spec("hypercorn"):
+        h2c_port = _free_port()
+        servers.append(_start_server(["hypercorn", app, "--bind", f"127.0.0.1:{h2c_port}"]))
+
+    tcp_url = f"http://127.0.0.1:{tcp_port}/quote"
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=concurrency)
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        async with httpx.AsyncClient() as client:
+            await _wait_ready(client, tcp_url)
+        results["每请求新建连接"] = await _bench_per_request(tcp_url, requests, concurrency)
+        results["HTTP/1.1 连接池"] = await _bench(tcp_url, None, requests, concurrency)
+        results["Unix 套接字"] = await _bench(
+            "http://localhost/quote",
+            httpx.AsyncHTTPTransport(limits=limits, uds=socket_path),
+            requests,
+            concurrency
+        )
+        if h2c_port is not None:
+            results["h2c 单连接多路复用"] = await _bench(
+                f"http://127.0.0.1:{h2c_port}/quote",
+                httpx.AsyncHTTPTransport(limits=limits, http1=False, http2=True),
+                requests,
+                concurrency
+            )
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{requests} 个请求，并发 {concurrency}\n")
+    print(f"{'传输方式':<16} {'吞吐量 (req/s)':>14} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['rps']:>14.0f} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f}")
+    if h2c_port is None:
+        print("\n未安装 h2 / hypercorn，跳过 h2c")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="上游传输方式基准")
+    parser.add_argument("--requests", type=int, default=2000, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发数")
+    options = parser.parse_args()
+    asyncio.run(main(options.requests, options.concurrency))
@@ -0,0 +1,73 @@
+"""
+worker 数扩展性基准
+
+以生产启动器（python -m src.server）依次用不同 worker 数启动网关，对本地桩服务施加相同的负载，
+输出吞吐量、延迟与相对单 worker 的加速比，用于确认吞吐量随 CPU 核数增长。
+
+压测端与网关在同一台机器上运行时，压测端本身也占用 CPU；worker 数超过可用核数后吞吐量不再增长。
+
+用法:
+    python -m benchmarks.worker_scaling [--workers 1,2,4] [--scenario fast] [--concurrency 100] [--duration 10]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import List
+
+from benchmarks.loadtest import report
+from benchmarks.loadtest.__main__ import PROJECT_ROOT
+from src.server import cpu_count
+
+
+def _run(workers: int, options: argparse.Namespace, output: str) -> dict:
+    """在子进程中运行一次压测并读取结果"""
+    subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.loadtest", "--launcher",
+            "--workers", str(workers),
+            "--stub-workers", str(options.stub_workers),
+            "--scenarios", options.scenario,
+            "--concurrency", str(options.concurrency),
+            "--duration", str(options.duration),
+            "--output", output
+        ],
+        cwd=PROJECT_ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL
+    )
+    return report.load(output)["scenarios"][options.scenario]
+
+
+def main(options: argparse.Namespace) -> int:
+    counts: List[int] = [int(n) for n in options.workers.split(",") if n.strip()]
+    print(f"可用 CPU 数 {cpu_count()}，场景 {options.scenario}，并发 {options.concurrency}，每轮 {options.duration}s")
+    print(f"{'worker':>6} {'吞吐量':>10} {'加速比':>8} {'p50':>8} {'p99':>8} {'worker CPU%':>14}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory(prefix="gateway-scaling-") as workdir:
+        for workers in counts:
+            result = _run(workers, options, os.path.join(workdir, f"{workers}.json"))
+            throughput = result["throughput_rps"]
+            baseline = baseline or throughput
+            cpu = "/".join(
+                f"{w['cpu_percent']:.0f}" for w in result.get("workers") or [] if w["cpu_percent"] is not None
+            ) or "-"
+            latency = result["latency_ms"]
+            print(
+                f"{workers:>6} {throughput:>10.1f} {throughput / baseline:>7.2f}x "
+                f"{latency['p50']:>8.2f} {latency['p99']:>8.2f} {cpu:>14}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="worker 数扩展性基准")
+    parser.add_argument("--workers", default="1,2,4", help="逗号分隔的 worker 数")
+    parser.add_argument("--scenario", default="fast", help="压测场景，见 benchmarks.loadtest")
+    parser.add_argument("--concurrency", type=int, default=100, help="闭环并发数")
+    parser.add_argument("--duration", type=float, default=10.0, help="每轮压测时长（秒）")
+    parser.add_argument("--stub-workers", type=int, default=2, help="桩服务 worker 数（避免桩服务成为瓶颈）")
+    sys.exit(main(parser.parse_args()))
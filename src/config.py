@@ -11,7 +11,7 @@ from typing import Optional
 import yaml
 import httpx
 
-from src.models.service_config import ServicesConfig, ServiceItem
+from src.models.service_config import ServicesConfig, ServiceItem, unix_socket_path
 
 
 class Config:
@@ -19,12 +19,94 @@ class Config:
 
     # 基础配置
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # 日志格式：json（每行一条 JSON）或 text
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    # 日志队列容量，写出跟不上时丢弃新记录而不阻塞请求
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # 是否输出访问日志（每个请求一条，可按路由 access_log_sample 采样）
+    ACCESS_LOG: bool = os.getenv("ACCESS_LOG", "true").lower() == "true"
     TIMEOUT: int = int(os.getenv("TIMEOUT", "30"))
+    # 客户端传入/向后端传递剩余处理时间（毫秒）的请求头
+    DEADLINE_HEADER: str = os.getenv("DEADLINE_HEADER", "X-Request-Timeout-Ms")
+
+    # 全局重试预算：每个请求存入 RATIO 个重试令牌，另外每秒保底补充 MIN_PER_SECOND 个
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+    RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "10"))
+
+    # 限流状态存储：memory（进程内）或 sqlite:///path（同一主机的多个 worker 共享）
+    RATE_LIMIT_STORE: str = os.getenv("RATE_LIMIT_STORE", "memory")
+    # 获取客户端 IP 的请求头（如 X-Forwarded-For，取第一个地址），为空时使用连接地址
+    CLIENT_IP_HEADER: str = os.getenv("CLIENT_IP_HEADER", "")
+
+    # 配置文件变更检查间隔（秒），检测到变更后自动热重载；0 表示关闭自动检查
+    CONFIG_WATCH_INTERVAL: float = float(os.getenv("CONFIG_WATCH_INTERVAL", "5"))
+    # 管理操作（手动重载配置、查看最近的 trace）的令牌，请求须带 Authorization: Bearer <令牌>；为空时禁用这些操作
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+
+    # 网关自行构建 JSON 时使用的编解码器：auto（orjson 已安装时使用）、orjson 或 stdlib
+    JSON_CODEC: str = os.getenv("JSON_CODEC", "auto")
+
+    # 响应压缩：小于该字节数的响应不压缩
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    # 参与协商的编码（按偏好排序，br / zstd 需安装 brotli / zstandard）；为空时关闭压缩
+    COMPRESSION_ENCODINGS: list = [
+        name.strip().lower()
+        for name in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")
+        if name.strip()
+    ]
+
+    # 请求 ID 请求头：接受客户端传入的值（缺失时生成），转发给上游并在响应中返回
+    REQUEST_ID_HEADER: str = os.getenv("REQUEST_ID_HEADER", "X-Request-ID")
+    # 追踪导出器：none、memory、log 或 file:///path（JSON Lines）
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    # 追踪采样比例（0~1），上游已采样（traceparent flags=01）的请求总是采样
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+
+    # 多 worker 部署时各 worker 写入指标快照的共享目录，为空时 /metrics 只导出当前进程的指标
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    # 指标快照写入间隔（秒）
+    METRICS_SYNC_INTERVAL: float = float(os.getenv("METRICS_SYNC_INTERVAL", "5"))
+
+    # 批量接口：单个批次最多包含的子请求数
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    # 单个批次对同一服务同时发出的最大子请求数（之外仍受服务 concurrency 限制）
+    BATCH_SERVICE_CONCURRENCY: int = int(os.getenv("BATCH_SERVICE_CONCURRENCY", "4"))
+
+    # 异步任务：结果存储 memory（进程内）或 sqlite:///path（多个 worker 共享，任一 worker 都能查询）
+    JOB_STORE: str = os.getenv("JOB_STORE", "memory")
+    # 后台执行任务的并发数与排队上限（队列满时提交返回 503）
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "16"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+    # 内存存储最多保存的任务数与结果总字节数（超出时淘汰最早结束的任务）
+    JOB_MAX_RESULTS: int = int(os.getenv("JOB_MAX_RESULTS", "10000"))
+    JOB_MAX_RESULT_BYTES: int = int(os.getenv("JOB_MAX_RESULT_BYTES", str(128 * 1024 * 1024)))
+    # 长轮询最长等待时间（秒）
+    JOB_LONG_POLL_MAX: float = float(os.getenv("JOB_LONG_POLL_MAX", "30"))
+
+    # 请求体记忆化的磁盘层：memory（只用内存层）或 sqlite:///path（重启后保留，多个 worker 共享）
+    MEMOIZE_STORE: str = os.getenv("MEMOIZE_STORE", "memory")
+
+    # 生产启动器（python -m src.server）监听地址与端口
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    # worker 进程数：auto 为可用 CPU 数（考虑 CPU 亲和性与 cgroup 配额）
+    WORKERS: str = os.getenv("WORKERS", "auto")
+    # 监听队列长度（还受内核 net.core.somaxconn 限制）
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    # 客户端 keep-alive 连接的空闲超时（秒）
+    KEEPALIVE_TIMEOUT: int = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+    # 每个 worker 同时处理的连接与请求上限，超出时直接返回 503；0 为不限制
+    LIMIT_CONCURRENCY: int = int(os.getenv("LIMIT_CONCURRENCY", "0"))
+    # 优雅退出时等待进行中请求完成的最长时间（秒）
+    GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    # 每个 worker 各自绑定 SO_REUSEPORT 套接字、由内核均衡分配连接；false 时共享主进程创建的监听套接字
+    SERVER_REUSEPORT: bool = os.getenv("SERVER_REUSEPORT", "false").lower() == "true"
 
     # 服务配置
     APP_NAME: str = "API Gateway"
     VERSION: str = "2.1.0"
     services_config: ServicesConfig = None
+    config_file: Path = None
 
     def __init__(self, config_path: str = "config/services.yaml"):
         """
@@ -58,16 +140,30 @@ class Config:
                 f"请创建配置文件并配置服务信息。"
             )
 
+        self.config_file = config_file
+        self.services_config = self.read_services_config()
+
+    def read_services_config(self) -> ServicesConfig:
+        """读取并验证服务配置文件（不修改当前配置）
+
+        Returns:
+            ServicesConfig: 验证通过的服务配置
+
+        Raises:
+            ValueError: 文件无法读取或配置格式错误
+        """
         # 解析 YAML
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
                 config_data = yaml.safe_load(f)
+        except OSError as e:
+            raise ValueError(f"配置文件无法读取: {e}")
         except yaml.YAMLError as e:
             raise ValueError(f"YAML 格式错误: {e}")
 
         # 验证配置格式
         try:
-            self.services_config = ServicesConfig(**config_data)
+            return ServicesConfig(**config_data)
         except Exception as e:
             raise ValueError(f"配置格式错误: {e}")
 
@@ -77,7 +173,8 @@ class Config:
             tasks = []
             for name, service in self.services_config.services.items():
                 if service.enabled:
-                    tasks.append(self._check_service(client, name, service))
+                    for endpoint in service.endpoints:
+                        tasks.append(self._check_service(client, name, endpoint.url, service))
 
             if not tasks:
                 # 没有启用的服务，跳过可达性检查
@@ -94,12 +191,23 @@ class Config:
         self,
         client: httpx.AsyncClient,
         name: str,
+        url: str,
         service: ServiceItem
     ):
-        """检查单个服务的可达性"""
-        health_url = f"{service.url}{service.health_path}"
+        """检查单个服务实例的可达性
+
+        unix:// 实例与 HTTP/2 服务使用与代理相同传输方式的临时客户端
+        """
+        health_url = f"{url}{service.health_path}"
+        socket_path = unix_socket_path(url)
         try:
-            response = await client.get(health_url)
+            if socket_path is None and service.protocol == "http1":
+                response = await client.get(health_url)
+            else:
+                transport = httpx.AsyncHTTPTransport(uds=socket_path, **service.transport_options())
+                base_url = "http://localhost" if socket_path is not None else url
+                async with httpx.AsyncClient(timeout=client.timeout, transport=transport) as service_client:
+                    response = await service_client.get(f"{base_url}{service.health_path}")
             if response.status_code != 200:
                 raise ValueError(
                     f"服务 '{name}' 健康检查失败 "
@@ -126,5 +234,5 @@ class Config:
         return None
 
 
-# 全局配置实例
-config = Config()
+# 全局配置实例（CONFIG_FILE 可指定其他服务配置文件，如压测生成的配置）
+config = Config(os.getenv("CONFIG_FILE", "config/services.yaml"))
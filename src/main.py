@@ -4,28 +4,34 @@ API Gateway - FastAPI 主入口
 通用 API 网关，提供统一入口，根据配置动态路由转发到后端微服务
 """
 
-import os
-from typing import Final
-
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from src.config import config
-from src.routes import health
+from src.routes import admin, batch, health, jobs, metrics
+from src.utils.circuit_breaker import breaker_registry
+from src.utils.concurrency import limiter_registry
+from src.utils.config_reloader import config_reloader
 from src.utils.dynamic_router import DynamicRouter
+from src.utils.health_checker import health_checker
+from src.utils.http_client import client_registry
+from src.utils.jobs import job_manager
+from src.utils.json_codec import FastJSONResponse
+from src.utils.load_balancer import balancer_registry
 from src.utils.logger import setup_logger
-
-# 常量定义
-DEFAULT_PORT: Final = 8000
+from src.utils.memoize import memo_registry
+from src.utils.metrics import metrics_registry
+from src.utils.rate_limit import rate_limiter_registry
+from src.utils.tracing import tracer
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title=config.APP_NAME,
     version=config.VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
 # 初始化日志
@@ -34,34 +40,39 @@ logger = setup_logger(level=config.LOG_LEVEL)
 
 # 注册健康检查路由（保留，因为不需要动态配置）
 app.include_router(health.router, tags=["健康检查"])
+app.include_router(admin.router, tags=["网关管理"])
+app.include_router(metrics.router, tags=["监控指标"])
+app.include_router(batch.router, tags=["批量请求"])
+app.include_router(jobs.router, tags=["异步任务"])
 
 
 # 全局异常处理器
 @app.exception_handler(StarletteHTTPException)
-async def http_exception_handler(request, exc) -> JSONResponse:
+async def http_exception_handler(request, exc) -> FastJSONResponse:
     """HTTP 异常处理器"""
-    logger.error(f"HTTP 异常: {exc.status_code} - {exc.detail}")
-    return JSONResponse(
+    logger.error("HTTP 异常: %s - %s", exc.status_code, exc.detail)
+    return FastJSONResponse(
         status_code=exc.status_code,
-        content={"error": exc.detail}
+        content={"error": exc.detail},
+        headers=getattr(exc, "headers", None)
     )
 
 
 @app.exception_handler(RequestValidationError)
-async def validation_exception_handler(request, exc) -> JSONResponse:
+async def validation_exception_handler(request, exc) -> FastJSONResponse:
     """请求验证异常处理器"""
-    logger.error(f"请求验证失败: {exc}")
-    return JSONResponse(
+    logger.error("请求验证失败: %s", exc)
+    return FastJSONResponse(
         status_code=422,
         content={"error": "请求参数验证失败", "details": exc.errors()}
     )
 
 
 @app.exception_handler(Exception)
-async def global_exception_handler(request, exc) -> JSONResponse:
+async def global_exception_handler(request, exc) -> FastJSONResponse:
     """全局异常处理器"""
     logger.error(f"未处理的异常: {exc}", exc_info=True)
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={"error": "内部服务错误"}
     )
@@ -81,10 +92,27 @@ async def startup_event():
         logger.error(f"❌ 服务可达性检查失败: {e}")
         # 注意：这里不抛出异常，允许应用启动但记录错误
 
+    # 创建上游连接池、负载均衡器、熔断器与并发限制器
+    await client_registry.start(config.services_config)
+    balancer_registry.configure(config.services_config)
+    breaker_registry.configure(config.services_config)
+    limiter_registry.configure(config.services_config)
+    rate_limiter_registry.start(config.RATE_LIMIT_STORE)
+    memo_registry.start(config.MEMOIZE_STORE)
+    metrics_registry.start(config.METRICS_DIR, config.METRICS_SYNC_INTERVAL)
+    tracer.start(config.TRACE_EXPORTER, config.TRACE_SAMPLE_RATE)
+    job_manager.start(config.JOB_STORE, config.JOB_WORKERS, config.JOB_QUEUE_SIZE)
+
+    # 启动后台健康检查
+    health_checker.start(config.services_config)
+
     # 动态注册所有路由
     dynamic_router = DynamicRouter(app, config.services_config)
     dynamic_router.register_all_routes()
 
+    # 监听配置文件变更，支持热重载
+    config_reloader.start(app, config.CONFIG_WATCH_INTERVAL)
+
     # 记录已注册的服务
     enabled_services = config.services_config.get_enabled_services()
     logger.info(f"📋 已注册服务: {list(enabled_services.keys())}")
@@ -93,19 +121,22 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时的清理"""
+    await config_reloader.stop()
+    await health_checker.stop()
+    # 先停止异步任务（执行中的任务还在使用上游连接）
+    await job_manager.stop()
+    await client_registry.aclose()
+    await rate_limiter_registry.aclose()
+    await memo_registry.aclose()
+    await metrics_registry.stop()
+    tracer.stop()
     logger.info(f"👋 {config.APP_NAME} 已停止")
 
 
 if __name__ == "__main__":
-    import uvicorn
+    # python -m src.main 等同于 python -m src.server（多 worker 生产启动器）
+    import sys
 
-    port = int(os.getenv("PORT", str(DEFAULT_PORT)))
+    from src.server import serve
 
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=port,
-        log_level=config.LOG_LEVEL.lower(),
-        access_log=True,
-        reload=False
-    )
+    sys.exit(serve())
@@ -1,6 +1,16 @@
 """
 数据模型包
 """
-from src.models.service_config import ServiceItem, ServicesConfig, RouteItem
+from src.models.service_config import (
+    ServiceItem, ServicesConfig, RouteItem, PoolConfig, CacheConfig, EndpointConfig,
+    HealthCheckConfig, CircuitBreakerConfig, RetryConfig, HedgeConfig,
+    TimeoutConfig, ConcurrencyConfig, RateLimitConfig, AsyncJobConfig, MemoizeConfig
+)
+from src.models.batch import BatchItem, BatchRequest
 
-__all__ = ["ServiceItem", "ServicesConfig", "RouteItem"]
+__all__ = [
+    "ServiceItem", "ServicesConfig", "RouteItem", "PoolConfig", "CacheConfig", "EndpointConfig",
+    "HealthCheckConfig", "CircuitBreakerConfig", "RetryConfig", "HedgeConfig",
+    "TimeoutConfig", "ConcurrencyConfig", "RateLimitConfig", "AsyncJobConfig", "MemoizeConfig",
+    "BatchItem", "BatchRequest"
+]
@@ -0,0 +1,69 @@
+"""
+批量请求数据模型
+"""
+
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+class BatchItem(BaseModel):
+    """批次中的单个子请求"""
+
+    id: Optional[str] = Field(default=None, description="子请求标识，默认为在批次中的序号")
+    method: Literal["GET", "POST", "PUT", "DELETE", "PATCH"] = Field(
+        default="GET",
+        description="HTTP 方法"
+    )
+    path: str = Field(..., description="网关路由路径，可带查询字符串")
+    query: Dict[str, Any] = Field(default_factory=dict, description="查询参数")
+    headers: Dict[str, str] = Field(default_factory=dict, description="额外请求头")
+    body: Optional[Any] = Field(default=None, description="JSON 请求体")
+
+    @field_validator('path')
+    @classmethod
+    def validate_path(cls, v: str) -> str:
+        """验证路径格式"""
+        if not v.startswith('/'):
+            raise ValueError('path must start with /')
+        return v
+
+
+class BatchRequest(BaseModel):
+    """批量请求"""
+
+    requests: List[BatchItem] = Field(..., min_length=1, description="子请求列表")
+    timeout_ms: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="整个批次的截止时间（毫秒），默认使用全局 TIMEOUT"
+    )
+    stream: bool = Field(
+        default=False,
+        description="是否按完成顺序逐条返回（application/x-ndjson）"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "requests": [
+                    {"id": "a", "path": "/api/a-stock"},
+                    {"id": "hk", "path": "/api/hk-stock"},
+                    {"id": "notice", "method": "GET", "path": "/api/rss-notice/check"}
+                ],
+                "timeout_ms": 2000
+            }
+        }
+    }
+
+    @model_validator(mode='after')
+    def assign_ids(self) -> 'BatchRequest':
+        """未指定 id 的子请求以序号作为 id，id 不能重复"""
+        ids = set()
+        for index, item in enumerate(self.requests):
+            if item.id is None:
+                item.id = str(index)
+            if item.id in ids:
+                raise ValueError(f'duplicate request id: {item.id}')
+            ids.add(item.id)
+        return self
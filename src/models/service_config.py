@@ -2,22 +2,221 @@
 服务配置数据模型
 """
 
-from pydantic import BaseModel, Field, field_validator
+import importlib.util
+import re
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Dict, List, Optional, Literal
 from urllib.parse import urlparse
 
+# 路由路径中的参数段，如 {stock_code}
+_PARAM_SEGMENT = re.compile(r"^\{([A-Za-z_][A-Za-z0-9_]*)\}$")
+
+# 同机部署服务的 Unix 域套接字地址前缀，如 unix:///var/run/news.sock
+UNIX_SCHEME = "unix://"
+
+
+def _path_params(path: str, field: str) -> tuple[List[str], bool]:
+    """解析路由路径模板，返回参数名列表与是否以 /* 结尾
+
+    Raises:
+        ValueError: 参数段格式错误、参数重复或 * 不在末尾
+    """
+    segments = [segment for segment in path.strip('/').split('/') if segment]
+    params: List[str] = []
+    for index, segment in enumerate(segments):
+        if segment == '*':
+            if index != len(segments) - 1:
+                raise ValueError(f'{field}: * is only allowed as the last segment')
+            return params, True
+        match = _PARAM_SEGMENT.match(segment)
+        if match:
+            if match.group(1) in params:
+                raise ValueError(f'{field}: duplicate parameter {segment}')
+            params.append(match.group(1))
+        elif '{' in segment or '}' in segment or '*' in segment:
+            raise ValueError(f'{field}: invalid segment {segment!r}, use {{name}} or a trailing /*')
+    return params, False
+
+
+class CacheConfig(BaseModel):
+    """路由响应缓存配置"""
+
+    ttl: float = Field(default=5.0, gt=0, description="缓存有效期（秒）")
+    stale_while_revalidate: float = Field(
+        default=0.0,
+        ge=0,
+        description="过期后仍可返回旧数据并后台刷新的时间窗口（秒）"
+    )
+    max_entries: int = Field(default=1000, ge=1, description="最大缓存条目数")
+    max_bytes: int = Field(
+        default=32 * 1024 * 1024,
+        ge=1,
+        description="缓存最大占用字节数"
+    )
+
+
+class MemoizeConfig(BaseModel):
+    """请求体记忆化配置：请求体相同的调用复用已保存的响应"""
+
+    ttl: float = Field(default=3600.0, gt=0, description="结果有效期（秒）")
+    max_entries: int = Field(default=1000, ge=1, description="内存中最多保存的结果数")
+    max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        ge=1,
+        description="内存中结果最大占用字节数"
+    )
+    disk_max_bytes: int = Field(
+        default=1024 * 1024 * 1024,
+        ge=1,
+        description="磁盘层（MEMOIZE_STORE 为 sqlite 时）中该路由结果最大占用字节数"
+    )
+
+
+class TimeoutConfig(BaseModel):
+    """路由超时配置（秒），未配置的阶段使用全局 TIMEOUT"""
+
+    connect: Optional[float] = Field(default=None, gt=0, description="建立连接超时")
+    read: Optional[float] = Field(default=None, gt=0, description="读取响应超时")
+    write: Optional[float] = Field(default=None, gt=0, description="发送请求超时")
+    pool: Optional[float] = Field(default=None, gt=0, description="等待连接池空闲连接超时")
+    total: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="请求总耗时上限（含重试），默认不限制"
+    )
+
+
+class RetryConfig(BaseModel):
+    """路由重试配置"""
+
+    attempts: int = Field(default=3, ge=1, description="最大尝试次数（含首次请求）")
+    backoff_base: float = Field(default=0.05, ge=0, description="退避基数（秒），按 2^n 增长并加全抖动")
+    backoff_max: float = Field(default=1.0, ge=0, description="单次退避上限（秒）")
+    retry_on_status: List[int] = Field(
+        default_factory=lambda: [502, 503, 504],
+        description="需要重试的上游状态码"
+    )
+    retry_non_idempotent: bool = Field(
+        default=False,
+        description="是否允许重试 POST/PUT/PATCH（默认只重试 GET/DELETE）"
+    )
+
+
+class HedgeConfig(BaseModel):
+    """对冲请求配置：首个请求超过延迟阈值未返回时，向另一个实例发送第二个请求"""
+
+    percentile: float = Field(
+        default=0.95,
+        gt=0,
+        lt=1,
+        description="按路由历史延迟的该分位数作为对冲延迟"
+    )
+    initial_delay: float = Field(
+        default=0.1,
+        gt=0,
+        description="样本不足时使用的对冲延迟（秒）"
+    )
+    min_delay: float = Field(default=0.01, ge=0, description="对冲延迟下限（秒）")
+    min_samples: int = Field(default=20, ge=1, description="计算分位数所需的最少样本数")
+
+
+class RateLimitConfig(BaseModel):
+    """限流配置：每个 period 秒允许 requests 个请求"""
+
+    requests: int = Field(..., ge=1, description="每个周期允许的请求数")
+    period: float = Field(default=1.0, gt=0, description="周期（秒）")
+    algorithm: Literal["token_bucket", "sliding_window"] = Field(
+        default="token_bucket",
+        description="限流算法：令牌桶或滑动窗口"
+    )
+    burst: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="令牌桶容量（允许的突发请求数），默认等于 requests"
+    )
+    key: Literal["ip", "api_key", "global"] = Field(
+        default="ip",
+        description="限流维度：客户端 IP、API Key 或整个路由/服务共享"
+    )
+    api_key_header: str = Field(
+        default="X-API-Key",
+        description="key 为 api_key 时读取的请求头，缺失时按客户端 IP 限流"
+    )
+
+
+class AsyncJobConfig(BaseModel):
+    """异步任务模式配置：网关立即返回 202 与任务 ID，在后台调用上游并保存结果"""
+
+    result_ttl: float = Field(default=600.0, gt=0, description="任务结束后结果保留时间（秒）")
+
 
 class RouteItem(BaseModel):
     """路由配置项"""
 
-    path: str = Field(..., description="网关路由路径（客户端访问的路径）")
+    path: str = Field(
+        ...,
+        description="网关路由路径（客户端访问的路径），支持 {param} 路径参数与末尾 /* 前缀匹配"
+    )
     method: Literal["GET", "POST", "PUT", "DELETE", "PATCH"] = Field(
         default="GET",
         description="HTTP 方法"
     )
     backend_path: Optional[str] = Field(
         default=None,
-        description="后端服务路径，默认与 path 相同"
+        description="后端服务路径，默认与 path 相同；可引用 path 中的 {param} 与末尾 /*"
+    )
+    mode: Literal["buffer", "stream"] = Field(
+        default="buffer",
+        description="转发模式：buffer 读取完整响应后转发（JSON 字节原样转发），stream 原样流式透传请求体与响应体"
+    )
+    cache: Optional[CacheConfig] = Field(
+        default=None,
+        description="响应缓存配置，仅支持 buffer 模式的 GET 路由"
+    )
+    coalesce: bool = Field(
+        default=False,
+        description="是否合并相同的并发请求（仅支持 buffer 模式的 GET 路由）"
+    )
+    etag: bool = Field(
+        default=False,
+        description="是否为响应提供 ETag 并以 304 响应条件请求（仅支持 buffer 模式的 GET 路由）"
+    )
+    timeout: Optional[TimeoutConfig] = Field(
+        default=None,
+        description="路由超时配置，默认使用全局 TIMEOUT"
+    )
+    memoize: Optional[MemoizeConfig] = Field(
+        default=None,
+        description="按请求体记忆化响应（仅支持 buffer 模式的 POST/PUT/PATCH 路由）"
+    )
+    async_job: Optional[AsyncJobConfig] = Field(
+        default=None,
+        description="异步任务模式配置（仅 buffer 模式），默认同步转发"
+    )
+    retry: Optional[RetryConfig] = Field(
+        default=None,
+        description="重试配置（仅 buffer 模式）"
+    )
+    hedge: Optional[HedgeConfig] = Field(
+        default=None,
+        description="对冲请求配置（仅 buffer 模式的幂等请求）"
+    )
+    rate_limit: Optional[RateLimitConfig] = Field(
+        default=None,
+        description="路由限流配置，默认不限流"
+    )
+    access_log_sample: float = Field(
+        default=1.0,
+        ge=0,
+        le=1,
+        description="访问日志采样比例，5xx 响应总是记录"
+    )
+    compress: bool = Field(
+        default=True,
+        description=(
+            "是否按 Accept-Encoding 压缩响应（stream 模式以及未开启缓存、请求合并、记忆化、etag 与异步任务的"
+            " buffer 模式路由原样透传上游已压缩的响应）"
+        )
     )
 
     model_config = {
@@ -25,7 +224,8 @@ class RouteItem(BaseModel):
             "example": {
                 "path": "/api/news-analysis",
                 "method": "POST",
-                "backend_path": "/api/analyze"
+                "backend_path": "/api/analyze",
+                "mode": "buffer"
             }
         }
     }
@@ -46,11 +246,248 @@ class RouteItem(BaseModel):
             raise ValueError('backend_path must start with /')
         return v
 
+    @model_validator(mode='after')
+    def validate_path_template(self) -> 'RouteItem':
+        """后端路径只能引用网关路径中的参数，/* 只能对应网关路径的前缀匹配"""
+        params, wildcard = _path_params(self.path, 'path')
+        if self.backend_path is not None:
+            backend_params, backend_wildcard = _path_params(self.backend_path, 'backend_path')
+            unknown = set(backend_params) - set(params)
+            if unknown:
+                raise ValueError(f'backend_path references unknown parameters: {sorted(unknown)}')
+            if backend_wildcard and not wildcard:
+                raise ValueError('backend_path may only end with /* when path ends with /*')
+        return self
+
+    @model_validator(mode='after')
+    def validate_cache(self) -> 'RouteItem':
+        """缓存只能用于 buffer 模式的 GET 路由"""
+        if self.cache is not None:
+            if self.method != "GET":
+                raise ValueError('cache is only supported for GET routes')
+            if self.mode != "buffer":
+                raise ValueError('cache is not supported in stream mode')
+        return self
+
+    @model_validator(mode='after')
+    def validate_retry(self) -> 'RouteItem':
+        """重试与对冲需要完整缓冲请求体，不支持 stream 模式"""
+        if self.mode == "stream" and (self.retry is not None or self.hedge is not None):
+            raise ValueError('retry and hedge are not supported in stream mode')
+        return self
+
+    @model_validator(mode='after')
+    def validate_async_job(self) -> 'RouteItem':
+        """异步任务在后台读取完整响应，不支持 stream 模式；每次提交都是新任务，不与缓存、合并同用"""
+        if self.async_job is not None:
+            if self.mode != "buffer":
+                raise ValueError('async_job is not supported in stream mode')
+            if self.cache is not None or self.coalesce:
+                raise ValueError('async_job cannot be combined with cache or coalesce')
+        return self
+
+    @model_validator(mode='after')
+    def validate_memoize(self) -> 'RouteItem':
+        """记忆化按请求体区分结果，只用于带请求体的 buffer 模式路由；GET 路由使用 cache"""
+        if self.memoize is not None:
+            if self.method not in ("POST", "PUT", "PATCH"):
+                raise ValueError('memoize is only supported for POST, PUT and PATCH routes')
+            if self.mode != "buffer":
+                raise ValueError('memoize is not supported in stream mode')
+            if self.async_job is not None:
+                raise ValueError('memoize cannot be combined with async_job')
+        return self
+
+    @model_validator(mode='after')
+    def validate_etag(self) -> 'RouteItem':
+        """条件请求只能用于 buffer 模式的 GET 路由"""
+        if self.etag:
+            if self.method != "GET":
+                raise ValueError('etag is only supported for GET routes')
+            if self.mode != "buffer":
+                raise ValueError('etag is not supported in stream mode')
+        return self
+
+    @model_validator(mode='after')
+    def validate_coalesce(self) -> 'RouteItem':
+        """请求合并只能用于 buffer 模式的 GET 路由"""
+        if self.coalesce:
+            if self.method != "GET":
+                raise ValueError('coalesce is only supported for GET routes')
+            if self.mode != "buffer":
+                raise ValueError('coalesce is not supported in stream mode')
+        return self
+
+
+def unix_socket_path(url: str) -> Optional[str]:
+    """unix:// 地址对应的套接字文件路径，其他地址返回 None"""
+    if url.startswith(UNIX_SCHEME):
+        return url[len(UNIX_SCHEME):]
+    return None
+
+
+def _validate_service_url(v: str) -> str:
+    """验证服务 URL 格式"""
+    socket_path = unix_socket_path(v)
+    if socket_path is not None:
+        if not socket_path.startswith('/') or '?' in socket_path or '#' in socket_path:
+            raise ValueError('unix socket URL must be unix:///absolute/path.sock')
+        return v
+
+    if not v.startswith(('http://', 'https://')):
+        raise ValueError('URL must start with http://, https:// or unix://')
+
+    # 检查是否包含主机
+    parsed = urlparse(v)
+    if not parsed.netloc:
+        raise ValueError('Invalid URL format')
+
+    return v
+
+
+class EndpointConfig(BaseModel):
+    """上游实例配置"""
+
+    url: str = Field(..., description="实例 URL")
+    weight: int = Field(default=1, ge=1, description="权重（weighted 策略使用）")
+
+    @field_validator('url')
+    @classmethod
+    def validate_url(cls, v: str) -> str:
+        """验证 URL 格式"""
+        return _validate_service_url(v)
+
+
+class PoolConfig(BaseModel):
+    """上游连接池配置"""
+
+    max_connections: int = Field(
+        default=100,
+        ge=1,
+        description="最大连接数（含活跃与空闲）"
+    )
+    max_keepalive_connections: int = Field(
+        default=20,
+        ge=0,
+        description="最大保持的空闲长连接数"
+    )
+    keepalive_expiry: float = Field(
+        default=5.0,
+        ge=0,
+        description="空闲连接过期时间（秒）"
+    )
+
+
+class HealthCheckConfig(BaseModel):
+    """主动健康检查配置"""
+
+    enabled: bool = Field(default=True, description="是否启用后台健康检查")
+    interval: float = Field(default=10.0, gt=0, description="检查间隔（秒）")
+    timeout: float = Field(default=2.0, gt=0, description="单次检查超时（秒）")
+    healthy_threshold: int = Field(
+        default=2,
+        ge=1,
+        description="连续成功多少次后标记为健康"
+    )
+    unhealthy_threshold: int = Field(
+        default=3,
+        ge=1,
+        description="连续失败多少次后标记为不健康"
+    )
+
+
+class CircuitBreakerConfig(BaseModel):
+    """熔断器配置（按实例生效）"""
+
+    enabled: bool = Field(default=False, description="是否启用熔断")
+    consecutive_failures: int = Field(
+        default=5,
+        ge=1,
+        description="连续失败多少次后熔断"
+    )
+    error_rate_threshold: float = Field(
+        default=0.5,
+        gt=0,
+        le=1,
+        description="滑动窗口内错误率达到该值后熔断"
+    )
+    window_size: int = Field(default=50, ge=1, description="错误率滑动窗口大小（请求数）")
+    min_requests: int = Field(
+        default=20,
+        ge=1,
+        description="窗口内至少多少个请求才按错误率判断"
+    )
+    slow_call_threshold: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="响应耗时超过该值（秒）视为失败，默认不按延迟判断"
+    )
+    open_duration: float = Field(default=10.0, gt=0, description="首次熔断的隔离时长（秒）")
+    max_open_duration: float = Field(
+        default=120.0,
+        gt=0,
+        description="连续熔断时隔离时长指数退避的上限（秒）"
+    )
+    half_open_requests: int = Field(
+        default=3,
+        ge=1,
+        description="半开状态放行的探测请求数，全部成功后恢复"
+    )
+
+
+class ConcurrencyConfig(BaseModel):
+    """服务并发限制与准入控制配置"""
+
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="向该服务同时发出的最大请求数，默认不限制"
+    )
+    max_queue: int = Field(default=100, ge=0, description="超出并发限制时的最大排队数")
+    queue_timeout: float = Field(default=1.0, ge=0, description="排队等待超时（秒）")
+    shed_status: Literal[429, 503] = Field(default=503, description="拒绝请求时的状态码")
+    retry_after: int = Field(default=1, ge=0, description="拒绝响应的 Retry-After（秒）")
+    adaptive: Optional[Literal["aimd", "gradient"]] = Field(
+        default=None,
+        description="按观测延迟自适应调整并发限制的算法，默认固定限制"
+    )
+    min_concurrency: int = Field(default=1, ge=1, description="自适应限制的下限")
+    latency_threshold: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="AIMD：延迟超过该值（秒）视为拥塞并降低限制"
+    )
+
+    @model_validator(mode='after')
+    def validate_adaptive(self) -> 'ConcurrencyConfig':
+        """自适应限制以 max_concurrency 作为上限和初始值"""
+        if self.adaptive is not None and self.max_concurrency is None:
+            raise ValueError('adaptive concurrency requires max_concurrency')
+        return self
+
 
 class ServiceItem(BaseModel):
     """单个服务配置"""
 
-    url: str = Field(..., description="服务 URL")
+    url: Optional[str] = Field(
+        default=None,
+        description="服务 URL（单实例），配置 endpoints 时默认为第一个实例"
+    )
+    endpoints: List[EndpointConfig] = Field(
+        default_factory=list,
+        description="上游实例列表，未配置时使用 url 作为唯一实例"
+    )
+    load_balancer: Literal["round_robin", "weighted", "least_outstanding", "p2c"] = Field(
+        default="round_robin",
+        description="负载均衡策略"
+    )
+    protocol: Literal["http1", "h2", "h2c"] = Field(
+        default="http1",
+        description=(
+            "上游 HTTP 版本：http1；h2 通过 TLS ALPN 协商 HTTP/2（仅 https 实例）；"
+            "h2c 以明文 HTTP/2 直连（http 或 unix 实例，上游须支持先验知识 HTTP/2）"
+        )
+    )
     enabled: bool = Field(default=True, description="是否启用")
     health_path: str = Field(
         default="/health",
@@ -60,13 +497,42 @@ class ServiceItem(BaseModel):
         default_factory=list,
         description="路由配置列表"
     )
+    pool: PoolConfig = Field(
+        default_factory=PoolConfig,
+        description="上游连接池配置"
+    )
+    health_check: HealthCheckConfig = Field(
+        default_factory=HealthCheckConfig,
+        description="后台健康检查配置"
+    )
+    circuit_breaker: CircuitBreakerConfig = Field(
+        default_factory=CircuitBreakerConfig,
+        description="熔断器配置"
+    )
+    concurrency: ConcurrencyConfig = Field(
+        default_factory=ConcurrencyConfig,
+        description="并发限制与准入控制配置"
+    )
+    rate_limit: Optional[RateLimitConfig] = Field(
+        default=None,
+        description="服务限流配置（该服务所有路由共享），默认不限流"
+    )
 
     model_config = {
         "json_schema_extra": {
             "example": {
-                "url": "http://news-analysis-service:8030",
+                "endpoints": [
+                    {"url": "http://news-analysis-service-1:8030", "weight": 2},
+                    {"url": "http://news-analysis-service-2:8030", "weight": 1}
+                ],
+                "load_balancer": "weighted",
                 "enabled": True,
                 "health_path": "/health",
+                "pool": {
+                    "max_connections": 100,
+                    "max_keepalive_connections": 20,
+                    "keepalive_expiry": 5.0
+                },
                 "routes": [
                     {
                         "path": "/api/news-analysis",
@@ -80,17 +546,41 @@ class ServiceItem(BaseModel):
 
     @field_validator('url')
     @classmethod
-    def validate_url(cls, v: str) -> str:
+    def validate_url(cls, v: Optional[str]) -> Optional[str]:
         """验证 URL 格式"""
-        if not v.startswith(('http://', 'https://')):
-            raise ValueError('URL must start with http:// or https://')
+        if v is None:
+            return v
+        return _validate_service_url(v)
 
-        # 检查是否包含主机
-        parsed = urlparse(v)
-        if not parsed.netloc:
-            raise ValueError('Invalid URL format')
+    @model_validator(mode='after')
+    def normalize_endpoints(self) -> 'ServiceItem':
+        """url 与 endpoints 至少配置一个，并互相补全"""
+        if not self.endpoints:
+            if self.url is None:
+                raise ValueError('either url or endpoints must be configured')
+            self.endpoints = [EndpointConfig(url=self.url)]
+        elif self.url is None:
+            self.url = self.endpoints[0].url
+        return self
 
-        return v
+    @model_validator(mode='after')
+    def validate_protocol(self) -> 'ServiceItem':
+        """HTTP/2 依赖可选的 h2 包，且 h2 只能经 TLS 协商"""
+        if self.protocol == "http1":
+            return self
+        if importlib.util.find_spec("h2") is None:
+            raise ValueError(f'protocol {self.protocol} requires the h2 package (pip install "httpx[http2]")')
+        if self.protocol == "h2":
+            for endpoint in self.endpoints:
+                if not endpoint.url.startswith('https://'):
+                    raise ValueError(f'protocol h2 requires https:// endpoints, use h2c for {endpoint.url}')
+        elif any(endpoint.url.startswith('https://') for endpoint in self.endpoints):
+            raise ValueError('protocol h2c is only for http:// or unix:// endpoints, use h2 for https://')
+        return self
+
+    def transport_options(self) -> Dict[str, bool]:
+        """httpx 传输层的 HTTP 版本参数"""
+        return {"http1": self.protocol != "h2c", "http2": self.protocol != "http1"}
 
     @field_validator('health_path')
     @classmethod
@@ -175,9 +665,21 @@ class ServicesConfig(BaseModel):
             List[tuple]: [(service_name, path, method, backend_path), ...]
         """
         routes = []
-        for service_name, service in self.services.items():
-            if service.enabled:
-                for route in service.routes:
-                    backend_path = route.backend_path or route.path
-                    routes.append((service_name, route.path, route.method, backend_path))
+        for service_name, route in self.get_route_items():
+            backend_path = route.backend_path or route.path
+            routes.append((service_name, route.path, route.method, backend_path))
         return routes
+
+    def get_route_items(self) -> List[tuple[str, RouteItem]]:
+        """
+        获取所有启用服务的路由配置项
+
+        Returns:
+            List[tuple]: [(service_name, RouteItem), ...]
+        """
+        return [
+            (service_name, route)
+            for service_name, service in self.services.items()
+            if service.enabled
+            for route in service.routes
+        ]
@@ -0,0 +1,143 @@
+"""
+网关运行状态路由
+
+暴露连接池等内部运行指标，便于容量评估。
+会改变网关状态或暴露请求明细的操作（手动重载配置、查看最近的 trace）需要 ADMIN_TOKEN 鉴权
+"""
+
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from src.config import config
+from src.utils.batch import batch_executor
+from src.utils.circuit_breaker import breaker_registry
+from src.utils.concurrency import limiter_registry
+from src.utils.conditional import conditional_stats
+from src.utils.config_reloader import config_reloader
+from src.utils.http_client import client_registry
+from src.utils.jobs import job_manager
+from src.utils.load_balancer import balancer_registry
+from src.utils.memoize import memo_registry
+from src.utils.rate_limit import rate_limiter_registry
+from src.utils.response_cache import cache_registry
+from src.utils.retry import retry_executor
+from src.utils.single_flight import single_flight_registry
+from src.utils.tracing import MemorySpanExporter, tracer
+
+router = APIRouter(prefix="/gateway")
+
+
+def require_admin_token(authorization: Optional[str] = Header(default=None)):
+    """校验管理令牌（Authorization: Bearer <ADMIN_TOKEN>）
+
+    Raises:
+        HTTPException: 未配置 ADMIN_TOKEN（403）或令牌缺失、错误（401）时
+    """
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="未配置 ADMIN_TOKEN，管理操作已禁用"
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="管理令牌无效",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@router.get("/pools")
+async def get_pool_stats() -> dict:
+    """上游连接池使用情况"""
+    return {"pools": client_registry.get_stats()}
+
+
+@router.get("/cache")
+async def get_cache_stats() -> dict:
+    """路由响应缓存命中情况"""
+    return {"caches": cache_registry.get_stats()}
+
+
+@router.get("/conditional")
+async def get_conditional_stats() -> dict:
+    """条件请求统计（not_modified 为返回 304 的次数，bytes_saved 为未发送的响应体字节数）"""
+    return {"conditional": conditional_stats.get_stats()}
+
+
+@router.get("/memoize")
+async def get_memoize_stats() -> dict:
+    """请求体记忆化统计（命中率、节省的上游响应字节数等）"""
+    return {"memoize": memo_registry.get_stats()}
+
+
+@router.get("/coalescing")
+async def get_coalescing_stats() -> dict:
+    """请求合并统计（coalesced 即节省的上游调用数）"""
+    return {"coalescing": single_flight_registry.get_stats()}
+
+
+@router.get("/upstreams")
+async def get_upstream_stats() -> dict:
+    """各服务上游实例的负载均衡统计"""
+    return {"upstreams": balancer_registry.get_stats()}
+
+
+@router.get("/breakers")
+async def get_breaker_stats() -> dict:
+    """各实例熔断器状态与状态切换计数"""
+    return {"breakers": breaker_registry.get_stats()}
+
+
+@router.get("/retries")
+async def get_retry_stats() -> dict:
+    """重试、对冲与重试预算统计"""
+    return {"retries": retry_executor.get_stats()}
+
+
+@router.get("/concurrency")
+async def get_concurrency_stats() -> dict:
+    """各服务并发限制、排队深度与拒绝计数"""
+    return {"concurrency": limiter_registry.get_stats()}
+
+
+@router.get("/rate-limits")
+async def get_rate_limit_stats() -> dict:
+    """各路由/服务限流器的放行与拒绝计数"""
+    return {"rate_limits": rate_limiter_registry.get_stats()}
+
+
+@router.post("/reload", dependencies=[Depends(require_admin_token)])
+async def reload_config() -> dict:
+    """重新加载 services.yaml，配置无效时返回 400 并保持当前配置"""
+    try:
+        return await config_reloader.reload()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/reload")
+async def get_reload_stats() -> dict:
+    """配置重载次数与最近一次失败原因"""
+    return {"reload": config_reloader.get_stats()}
+
+
+@router.get("/batch")
+async def get_batch_stats() -> dict:
+    """批量请求统计（子请求数、批次截止时间导致的超时数）"""
+    return {"batch": batch_executor.get_stats()}
+
+
+@router.get("/jobs")
+async def get_job_stats() -> dict:
+    """异步任务统计（排队、执行中与结果存储）"""
+    return {"jobs": job_manager.get_stats()}
+
+
+@router.get("/traces", dependencies=[Depends(require_admin_token)])
+async def get_traces(limit: int = 20) -> dict:
+    """追踪统计；使用 memory 导出器时附带最近的 trace"""
+    traces = tracer.exporter.recent(limit) if isinstance(tracer.exporter, MemorySpanExporter) else []
+    return {"tracing": tracer.get_stats(), "traces": traces}
@@ -0,0 +1,34 @@
+"""
+批量请求路由
+
+POST /gateway/batch 并发执行多个子请求，合并返回或按完成顺序流式返回
+"""
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from src.config import config
+from src.models.batch import BatchRequest
+from src.utils.batch import batch_executor
+from src.utils.json_codec import FastJSONResponse
+
+router = APIRouter(prefix="/gateway")
+
+
+@router.post("/batch")
+async def batch(request: Request, body: BatchRequest):
+    """执行批量请求
+
+    每个子请求的结果包含 id、status、headers、body（JSON 响应解析为对象，其他为文本）与 elapsed_ms；
+    stream 为 true 时以 application/x-ndjson 按完成顺序逐行返回
+    """
+    batch_id, deadline = batch_executor.prepare(request, body)
+    headers = {config.REQUEST_ID_HEADER: batch_id}
+    if body.stream:
+        return StreamingResponse(
+            batch_executor.stream(request, body, batch_id, deadline),
+            media_type="application/x-ndjson",
+            headers=headers
+        )
+    results = await batch_executor.run(request, body, batch_id, deadline)
+    return FastJSONResponse({"results": results}, headers=headers)
@@ -5,6 +5,7 @@
 from datetime import datetime
 from fastapi import APIRouter
 
+from src.utils.health_checker import health_checker
 from src.utils.logger import setup_logger
 
 router = APIRouter()
@@ -18,5 +19,6 @@ async def health_check() -> dict:
         "status": "ok",
         "service": "api-gateway",
         "version": "2.0.0",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "upstreams": health_checker.get_status()
     }
@@ -0,0 +1,34 @@
+"""
+异步任务查询路由
+
+- GET /gateway/jobs/{job_id}：任务状态
+- GET /gateway/jobs/{job_id}/result：任务结果（结束前返回 202）
+
+两个接口都支持 wait 参数长轮询：最多等待 wait 秒（不超过 JOB_LONG_POLL_MAX），任务结束时立即返回
+"""
+
+from fastapi import APIRouter, HTTPException, Query, Response, status
+
+from src.utils.jobs import Job, job_manager, job_result_response, job_status_response
+
+router = APIRouter(prefix="/gateway")
+
+
+async def _get_job(job_id: str, wait: float) -> Job:
+    """查询任务，不存在或已过期时返回 404"""
+    job = await job_manager.get(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="任务不存在或已过期")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(default=0.0, ge=0)) -> Response:
+    """任务状态"""
+    return job_status_response(await _get_job(job_id, wait))
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, wait: float = Query(default=0.0, ge=0)) -> Response:
+    """任务结果：结束后返回上游响应，未结束返回 202 与任务状态"""
+    return job_result_response(await _get_job(job_id, wait))
@@ -0,0 +1,19 @@
+"""
+Prometheus 指标路由
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.utils.metrics import metrics_registry
+
+router = APIRouter()
+
+# Prometheus 文本格式版本（charset 由 PlainTextResponse 追加）
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Prometheus 抓取端点"""
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,344 @@
+"""
+生产启动器
+
+python -m src.server 以多个 uvicorn worker 进程运行网关：
+- worker 数默认等于可用 CPU 数（考虑 CPU 亲和性与 cgroup 配额），事件循环与 HTTP 解析器优先使用 uvloop、httptools
+- 监听队列长度、keep-alive 超时、每个 worker 的并发上限与优雅退出超时可配置
+- 默认由主进程创建监听套接字后启动 worker（pre-fork，共享同一个 accept 队列）；
+  SERVER_REUSEPORT=true 时每个 worker 各自绑定 SO_REUSEPORT 套接字，由内核在 worker 间均衡分配连接
+- 主进程监管 worker：异常退出时重新拉起；收到 SIGHUP 时逐个滚动重启 worker（新 worker 就绪后才让旧 worker 优雅退出），
+  用于发布新代码与配置；收到 SIGTERM / SIGINT 时所有 worker 优雅退出
+"""
+
+import importlib.util
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, wait
+from typing import List, Optional
+
+from src.config import config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(level=config.LOG_LEVEL)
+
+# 网关 ASGI 应用
+APP = "src.main:app"
+# 等待新 worker 就绪的最长时间（秒），包括启动时的服务可达性检查
+READY_TIMEOUT = 60.0
+# worker 优雅退出超时之外额外等待的时间（秒），用于执行 lifespan shutdown
+SHUTDOWN_MARGIN = 10.0
+# 连续多少个 worker 未就绪即退出时放弃（通常是配置错误），避免无限重启
+MAX_STARTUP_FAILURES = 5
+# worker 异常退出后重新拉起前的等待时间（秒）
+RESPAWN_DELAY = 1.0
+
+
+def cpu_count() -> int:
+    """可用 CPU 数：CPU 亲和性与 cgroup CPU 配额（容器限制）中较小者"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - 非 Linux 平台
+        count = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2：cpu.max 为 "<配额> <周期>" 或 "max <周期>"
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        count = min(count, max(1, math.ceil(quota)))
+    return max(1, count)
+
+
+def worker_count(setting: str) -> int:
+    """解析 WORKERS：auto 或正整数
+
+    Raises:
+        ValueError: 格式错误
+    """
+    if setting.strip().lower() == "auto":
+        return cpu_count()
+    workers = int(setting)
+    if workers < 1:
+        raise ValueError(f"WORKERS 必须为正整数或 auto: {setting}")
+    return workers
+
+
+@dataclass
+class ServerOptions:
+    """启动参数"""
+
+    host: str
+    port: int
+    workers: int
+    backlog: int
+    keepalive_timeout: int
+    limit_concurrency: Optional[int]
+    graceful_timeout: int
+    reuseport: bool
+    loop: str
+    http: str
+    log_level: str
+
+    @classmethod
+    def from_config(cls) -> "ServerOptions":
+        """由环境变量配置生成启动参数，已安装 uvloop / httptools 时使用"""
+        return cls(
+            host=config.HOST,
+            port=config.PORT,
+            workers=worker_count(config.WORKERS),
+            backlog=config.SERVER_BACKLOG,
+            keepalive_timeout=config.KEEPALIVE_TIMEOUT,
+            limit_concurrency=config.LIMIT_CONCURRENCY or None,
+            graceful_timeout=config.GRACEFUL_TIMEOUT,
+            reuseport=config.SERVER_REUSEPORT,
+            loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+            http="httptools" if importlib.util.find_spec("httptools") else "h11",
+            log_level=config.LOG_LEVEL.lower()
+        )
+
+
+def bind_socket(host: str, port: int, backlog: int, reuseport: bool) -> socket.socket:
+    """创建监听套接字
+
+    Args:
+        host: 监听地址
+        port: 端口
+        backlog: 监听队列长度
+        reuseport: 是否设置 SO_REUSEPORT（多个进程各自绑定同一端口）
+
+    Returns:
+        socket.socket: 已开始监听的套接字
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("当前平台不支持 SO_REUSEPORT")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(options: ServerOptions, sock: Optional[socket.socket], ready: Connection):
+    """worker 进程入口：运行 uvicorn，完成启动（含 lifespan startup）后通知主进程"""
+    import uvicorn
+
+    class Server(uvicorn.Server):
+        async def startup(self, sockets: Optional[List[socket.socket]] = None):
+            await super().startup(sockets)
+            if self.started:
+                ready.send(os.getpid())
+                ready.close()
+
+    # 滚动重启由主进程的 SIGHUP 触发，worker 自身忽略 SIGHUP
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    if sock is None:
+        sock = bind_socket(options.host, options.port, options.backlog, reuseport=True)
+
+    server = Server(uvicorn.Config(
+        APP,
+        host=options.host,
+        port=options.port,
+        loop=options.loop,
+        http=options.http,
+        backlog=options.backlog,
+        timeout_keep_alive=options.keepalive_timeout,
+        limit_concurrency=options.limit_concurrency,
+        timeout_graceful_shutdown=options.graceful_timeout,
+        log_level=options.log_level,
+        # 网关路由的访问日志由 gateway.access 输出
+        access_log=False
+    ))
+    server.run(sockets=[sock])
+
+
+class Worker:
+    """主进程中的 worker 记录"""
+
+    def __init__(self, process: multiprocessing.Process, ready: Connection):
+        self.process = process
+        self.ready_conn: Optional[Connection] = ready
+        self.ready = False
+
+    def poll_ready(self):
+        """读取就绪通知（worker 未就绪即退出时管道关闭）"""
+        if self.ready_conn is None:
+            return
+        try:
+            self.ready_conn.recv()
+            self.ready = True
+        except EOFError:
+            pass
+        self.ready_conn.close()
+        self.ready_conn = None
+
+
+class Supervisor:
+    """worker 进程监管"""
+
+    def __init__(self, options: ServerOptions):
+        self.options = options
+        self.workers: List[Worker] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._socket: Optional[socket.socket] = None
+        self._signals: List[int] = []
+        self._startup_failures = 0
+
+    def run(self) -> int:
+        """启动 worker 并监管，直到收到退出信号
+
+        Returns:
+            int: 进程退出码
+        """
+        options = self.options
+        if not options.reuseport:
+            self._socket = bind_socket(options.host, options.port, options.backlog, reuseport=False)
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, lambda signum, frame: self._signals.append(signum))
+
+        logger.info(
+            f"🚀 启动 {options.workers} 个 worker: {options.host}:{options.port} "
+            f"[{'SO_REUSEPORT' if options.reuseport else 'pre-fork'}, {options.loop}, {options.http}, "
+            f"backlog={options.backlog}, keep-alive={options.keepalive_timeout}s, "
+            f"limit_concurrency={options.limit_concurrency or '不限制'}, graceful={options.graceful_timeout}s]"
+        )
+        for _ in range(options.workers):
+            self.workers.append(self._spawn())
+
+        try:
+            while True:
+                self._wait(1.0)
+                while self._signals:
+                    signum = self._signals.pop(0)
+                    if signum == signal.SIGHUP:
+                        self._rolling_restart()
+                    else:
+                        return 0
+                if not self._reap():
+                    return 1
+        finally:
+            self._shutdown()
+
+    def _spawn(self) -> Worker:
+        """启动一个 worker 进程"""
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_run_worker, args=(self.options, self._socket, sender), name="gateway-worker"
+        )
+        process.start()
+        sender.close()
+        logger.info(f"worker {process.pid} 已启动")
+        return Worker(process, receiver)
+
+    def _wait(self, timeout: float):
+        """等待 worker 退出或就绪通知"""
+        waitables = [worker.process.sentinel for worker in self.workers]
+        waitables.extend(worker.ready_conn for worker in self.workers if worker.ready_conn is not None)
+        for ready in wait(waitables, timeout):
+            for worker in self.workers:
+                if worker.ready_conn is ready:
+                    worker.poll_ready()
+                    if worker.ready:
+                        self._startup_failures = 0
+                        logger.info(f"worker {worker.process.pid} 已就绪")
+
+    def _reap(self) -> bool:
+        """重新拉起异常退出的 worker
+
+        Returns:
+            bool: 是否继续运行（连续启动失败过多时为 False）
+        """
+        for index, worker in enumerate(self.workers):
+            if worker.process.is_alive():
+                continue
+            worker.poll_ready()
+            if not worker.ready:
+                self._startup_failures += 1
+                if self._startup_failures >= MAX_STARTUP_FAILURES:
+                    logger.error(f"❌ worker 连续 {self._startup_failures} 次启动失败，停止运行")
+                    return False
+            logger.warning(f"worker {worker.process.pid} 已退出（退出码 {worker.process.exitcode}），重新启动")
+            time.sleep(RESPAWN_DELAY)
+            self.workers[index] = self._spawn()
+        return True
+
+    def _rolling_restart(self):
+        """逐个替换 worker：新 worker 就绪后旧 worker 才优雅退出，任何时刻都有 worker 在接受连接"""
+        logger.info("🔄 开始滚动重启 worker")
+        for old in list(self.workers):
+            if signal.SIGTERM in self._signals or signal.SIGINT in self._signals:
+                return
+            new = self._spawn()
+            self.workers.append(new)
+            deadline = time.monotonic() + READY_TIMEOUT
+            while new.ready_conn is not None and new.process.is_alive() and time.monotonic() < deadline:
+                self._wait(min(1.0, deadline - time.monotonic()))
+            if not new.ready:
+                logger.error(f"❌ 新 worker {new.process.pid} 未能就绪，停止滚动重启，保留现有 worker")
+                self.workers.remove(new)
+                self._stop([new])
+                return
+            self.workers.remove(old)
+            self._stop([old])
+        logger.info("✅ 滚动重启完成")
+
+    def _stop(self, workers: List[Worker]):
+        """向 worker 发送 SIGTERM 并等待其优雅退出，超时后强制结束"""
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + self.options.graceful_timeout + SHUTDOWN_MARGIN
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"worker {worker.process.pid} 未在超时内退出，强制结束")
+                worker.process.kill()
+                worker.process.join()
+            if worker.ready_conn is not None:
+                worker.ready_conn.close()
+                worker.ready_conn = None
+
+    def _shutdown(self):
+        """所有 worker 优雅退出并关闭监听套接字"""
+        logger.info("正在停止所有 worker...")
+        self._stop(self.workers)
+        self.workers = []
+        if self._socket is not None:
+            self._socket.close()
+        logger.info("👋 所有 worker 已停止")
+
+
+def serve() -> int:
+    """按环境变量配置启动网关
+
+    Returns:
+        int: 进程退出码
+    """
+    return Supervisor(ServerOptions.from_config()).run()
+
+
+if __name__ == "__main__":
+    sys.exit(serve())
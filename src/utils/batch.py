@@ -0,0 +1,303 @@
+"""
+批量请求
+
+一次请求携带多个子请求，网关并发执行后合并返回：
+- 每个子请求构造为独立的 Request，经路由分发器走与普通请求相同的代理路径
+  （限流、缓存、重试、熔断、服务并发限制、指标与访问日志均照常生效）
+- 整个批次共用一个截止时间，子请求把剩余时间经截止时间头带给路由，超时的子请求单独返回 504
+- 同一批次对同一服务的并发数不超过 BATCH_SERVICE_CONCURRENCY 与服务当前并发限制，
+  其余子请求在批次内排队，不会一次占满服务的并发名额或因服务排队已满被拒绝
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from fastapi import HTTPException, Request, Response, status
+
+from src.config import config
+from src.models.batch import BatchItem, BatchRequest
+from src.models.service_config import TimeoutConfig
+from src.utils.concurrency import limiter_registry
+from src.utils.deadline import Deadline
+from src.utils.json_codec import is_json, json_codec
+from src.utils.logger import setup_logger
+from src.utils.route_table import route_dispatcher
+from src.utils.tracing import request_id_from
+
+logger = setup_logger()
+
+# 不从批量请求继承到子请求的请求头
+_DROPPED_HEADERS = {
+    b"content-length", b"content-type", b"transfer-encoding", b"accept-encoding", b"expect",
+}
+# 不放入子请求结果的响应头
+_OMITTED_RESPONSE_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection"}
+# 复制给子请求的 ASGI scope 字段
+_SCOPE_KEYS = ("type", "asgi", "http_version", "scheme", "server", "client", "root_path", "app")
+
+
+@dataclass
+class BatchStats:
+    """批量请求计数"""
+
+    batches: int = 0
+    streamed: int = 0
+    items: int = 0
+    timeouts: int = 0
+    errors: int = 0
+
+
+class BatchExecutor:
+    """批量请求执行器"""
+
+    def __init__(self):
+        self.stats = BatchStats()
+
+    def prepare(self, request: Request, batch: BatchRequest) -> Tuple[str, Deadline]:
+        """校验批次并计算批次 ID 与截止时间
+
+        Args:
+            request: 批量请求
+            batch: 请求体
+
+        Returns:
+            Tuple[str, Deadline]: 批次 ID（子请求 ID 以其为前缀）与截止时间
+
+        Raises:
+            HTTPException: 子请求过多（413）、截止时间头格式错误（400）或已过期（504）
+        """
+        if len(batch.requests) > config.BATCH_MAX_REQUESTS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"批量请求最多包含 {config.BATCH_MAX_REQUESTS} 个子请求"
+            )
+        timeout_ms = min(batch.timeout_ms or config.TIMEOUT * 1000, config.TIMEOUT * 1000)
+        deadline = Deadline.from_request(request, TimeoutConfig(total=timeout_ms / 1000))
+
+        batch_id = request_id_from(request.headers)
+
+        self.stats.batches += 1
+        self.stats.items += len(batch.requests)
+        if batch.stream:
+            self.stats.streamed += 1
+        return batch_id, deadline
+
+    async def run(self, request: Request, batch: BatchRequest, batch_id: str, deadline: Deadline) -> List[dict]:
+        """并发执行所有子请求
+
+        Returns:
+            List[dict]: 按子请求顺序排列的结果
+        """
+        semaphores: Dict[Optional[str], asyncio.Semaphore] = {}
+        return list(await asyncio.gather(*(
+            self._execute(request, index, item, batch_id, deadline, semaphores)
+            for index, item in enumerate(batch.requests)
+        )))
+
+    async def stream(
+        self,
+        request: Request,
+        batch: BatchRequest,
+        batch_id: str,
+        deadline: Deadline
+    ) -> AsyncIterator[bytes]:
+        """按完成顺序逐条产出结果（每行一个 JSON）"""
+        semaphores: Dict[Optional[str], asyncio.Semaphore] = {}
+        tasks = [
+            asyncio.create_task(self._execute(request, index, item, batch_id, deadline, semaphores))
+            for index, item in enumerate(batch.requests)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield json_codec.dumps(await task) + b"\n"
+        finally:
+            # 客户端提前断开时取消未完成的子请求
+            for task in tasks:
+                task.cancel()
+
+    def get_stats(self) -> dict:
+        """批量请求统计"""
+        return {
+            **asdict(self.stats),
+            "max_requests": config.BATCH_MAX_REQUESTS,
+            "service_concurrency": config.BATCH_SERVICE_CONCURRENCY
+        }
+
+    async def _execute(
+        self,
+        parent: Request,
+        index: int,
+        item: BatchItem,
+        batch_id: str,
+        deadline: Deadline,
+        semaphores: Dict[Optional[str], asyncio.Semaphore]
+    ) -> dict:
+        """执行单个子请求，异常转换为该子请求的错误结果"""
+        start = time.perf_counter()
+        path = urlsplit(item.path).path
+        entry, _, _, _ = route_dispatcher.table.match(item.method, path)
+        # 未匹配的子请求由分发器返回 404/405，不占用服务并发名额
+        service_name = entry.service_name if entry is not None else None
+        semaphore = semaphores.get(service_name)
+        if semaphore is None:
+            semaphore = semaphores[service_name] = asyncio.Semaphore(_service_concurrency(service_name))
+
+        headers: Dict[str, str] = {}
+        try:
+            remaining = deadline.remaining()
+            status_code, headers, body = await asyncio.wait_for(
+                self._dispatch(parent, index, item, batch_id, deadline, semaphore),
+                timeout=max(remaining, 0) if remaining is not None else None
+            )
+        except HTTPException as e:
+            status_code = e.status_code
+            headers = {name.lower(): value for name, value in (e.headers or {}).items()}
+            body = {"error": e.detail}
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            status_code = status.HTTP_504_GATEWAY_TIMEOUT
+            body = {"error": "批量请求已超过截止时间"}
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error(f"批量子请求处理失败: {item.method} {item.path}: {e}", exc_info=True)
+            status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+            body = {"error": "内部服务错误"}
+
+        return {
+            "id": item.id,
+            "status": status_code,
+            "headers": headers,
+            "body": body,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+    async def _dispatch(
+        self,
+        parent: Request,
+        index: int,
+        item: BatchItem,
+        batch_id: str,
+        deadline: Deadline,
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[int, Dict[str, str], object]:
+        """排队取得服务名额后经路由分发器处理子请求，读取完整响应"""
+        async with semaphore:
+            sub_request = _sub_request(parent, index, item, batch_id, deadline)
+            response = await route_dispatcher.dispatch(sub_request)
+            body = await _read_body(response)
+
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name not in _OMITTED_RESPONSE_HEADERS
+        }
+        return response.status_code, headers, _decode_body(response.headers.get("content-type"), body)
+
+
+def _service_concurrency(service_name: Optional[str]) -> int:
+    """批次内对该服务的并发上限"""
+    limit = config.BATCH_SERVICE_CONCURRENCY
+    limiter = limiter_registry.get(service_name) if service_name is not None else None
+    if limiter is not None:
+        limit = min(limit, max(1, int(limiter.limit)))
+    return limit
+
+
+def _sub_request(parent: Request, index: int, item: BatchItem, batch_id: str, deadline: Deadline) -> Request:
+    """由批量请求与子请求描述构造独立的 Request"""
+    split = urlsplit(item.path)
+    query = split.query
+    if item.query:
+        extra = urlencode(_query_pairs(item.query))
+        query = f"{query}&{extra}" if query else extra
+
+    body = b"" if item.body is None else json_codec.dumps(item.body)
+    overridden = {name.lower().encode("latin-1") for name in item.headers}
+    own_headers = {
+        config.REQUEST_ID_HEADER.lower().encode("latin-1"),
+        config.DEADLINE_HEADER.lower().encode("latin-1"),
+    }
+    headers = [
+        (name, value) for name, value in parent.scope["headers"]
+        if name not in _DROPPED_HEADERS and name not in overridden and name not in own_headers
+    ]
+    headers.extend(
+        (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in item.headers.items()
+    )
+    # 子请求响应需要解码后合并，不让路由压缩；上游也按 identity 返回
+    headers.append((b"accept-encoding", b"identity"))
+    if config.REQUEST_ID_HEADER.lower().encode("latin-1") not in overridden:
+        headers.append((config.REQUEST_ID_HEADER.lower().encode("latin-1"), f"{batch_id}.{index}".encode("latin-1")))
+    remaining = deadline.remaining()
+    if remaining is not None:
+        headers.append((
+            config.DEADLINE_HEADER.lower().encode("latin-1"),
+            str(max(1, int(remaining * 1000))).encode("latin-1")
+        ))
+    if body:
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+    scope = {key: parent.scope[key] for key in _SCOPE_KEYS if key in parent.scope}
+    scope.update(
+        method=item.method,
+        path=split.path,
+        raw_path=split.path.encode("utf-8"),
+        query_string=query.encode("latin-1"),
+        headers=headers,
+        path_params={}
+    )
+
+    sent = False
+
+    async def receive() -> dict:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # 请求体已读完；子请求没有独立的连接，不会收到断开消息
+        await asyncio.Future()
+
+    return Request(scope, receive)
+
+
+def _query_pairs(query: Dict[str, object]) -> List[Tuple[str, str]]:
+    """查询参数展开为键值对：列表值重复同名参数，布尔值转为 true/false"""
+    pairs = []
+    for key, value in query.items():
+        for element in value if isinstance(value, list) else [value]:
+            pairs.append((key, str(element).lower() if isinstance(element, bool) else str(element)))
+    return pairs
+
+
+async def _read_body(response: Response) -> bytes:
+    """读取完整响应体（流式响应逐块读取），并执行响应的后台任务（释放上游连接、结束追踪等）"""
+    body = getattr(response, "body", None)
+    try:
+        if body is None:
+            chunks = []
+            async for chunk in response.body_iterator:
+                chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode(response.charset))
+            body = b"".join(chunks)
+    finally:
+        if response.background is not None:
+            await response.background()
+    return body
+
+
+def _decode_body(content_type: Optional[str], body: bytes) -> object:
+    """JSON 响应解析为对象，其他响应作为文本"""
+    if not body:
+        return None
+    if is_json(content_type):
+        try:
+            return json_codec.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", errors="replace")
+
+
+# 全局批量请求执行器
+batch_executor = BatchExecutor()
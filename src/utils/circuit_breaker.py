@@ -0,0 +1,204 @@
+"""
+上游熔断器
+
+按实例统计连续失败、滑动窗口错误率与慢调用，触发后隔离实例一段时间（指数退避），
+到期后进入半开状态放行少量探测请求，全部成功则恢复
+"""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set
+
+from src.models.service_config import CircuitBreakerConfig, ServicesConfig
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """单个上游实例的熔断器"""
+
+    def __init__(self, name: str, breaker_config: CircuitBreakerConfig):
+        """
+        Args:
+            name: 名称（服务名与实例 URL，用于日志）
+            breaker_config: 熔断配置
+        """
+        self.name = name
+        self.config = breaker_config
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self.transitions: Dict[str, int] = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self._window: Deque[bool] = deque(maxlen=breaker_config.window_size)
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+
+    def is_available(self) -> bool:
+        """当前是否可以向该实例发送请求（无副作用）"""
+        if not self.config.enabled or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() >= self.open_until
+        return self._half_open_in_flight < self.config.half_open_requests
+
+    def on_request(self):
+        """请求发出前调用，占用半开状态的探测名额"""
+        if not self.config.enabled:
+            return
+        if self.state == OPEN and time.monotonic() >= self.open_until:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight += 1
+
+    def release(self):
+        """请求被取消（如客户端断开）时归还半开探测名额，不计入结果"""
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def record(self, status_code: Optional[int], latency: float):
+        """记录一次调用结果
+
+        Args:
+            status_code: 上游状态码，请求异常时为 None
+            latency: 调用耗时（秒）
+        """
+        if not self.config.enabled:
+            return
+
+        slow = (
+            self.config.slow_call_threshold is not None
+            and latency > self.config.slow_call_threshold
+        )
+        failed = status_code is None or status_code >= 500 or slow
+
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if failed:
+                self._trip()
+            else:
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.config.half_open_requests:
+                    self._transition(CLOSED)
+            return
+
+        self._window.append(failed)
+        if not failed:
+            self.consecutive_failures = 0
+            return
+
+        self.consecutive_failures += 1
+        if self.state == CLOSED and self._should_trip():
+            self._trip()
+
+    def to_dict(self) -> dict:
+        """导出状态与计数"""
+        failures = sum(self._window)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "window_error_rate": round(failures / len(self._window), 4) if self._window else 0.0,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions),
+            "open_remaining": max(0.0, round(self.open_until - time.monotonic(), 3))
+            if self.state == OPEN else 0.0
+        }
+
+    def _should_trip(self) -> bool:
+        """是否达到熔断条件"""
+        if self.consecutive_failures >= self.config.consecutive_failures:
+            return True
+        if len(self._window) >= self.config.min_requests:
+            error_rate = sum(self._window) / len(self._window)
+            return error_rate >= self.config.error_rate_threshold
+        return False
+
+    def _trip(self):
+        """熔断：隔离实例，隔离时长按连续熔断次数指数退避"""
+        self.trips += 1
+        duration = min(
+            self.config.open_duration * (2 ** (self.trips - 1)),
+            self.config.max_open_duration
+        )
+        self.open_until = time.monotonic() + duration
+        self._transition(OPEN)
+        logger.warning(f"⚡ 熔断器打开: {self.name}，隔离 {duration:.1f}s")
+
+    def _transition(self, state: str):
+        """切换状态并记录"""
+        previous = self.state
+        self.state = state
+        self.transitions[state] += 1
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+
+        if state == CLOSED:
+            self.trips = 0
+            self.consecutive_failures = 0
+            self._window.clear()
+
+        if state != OPEN:
+            logger.info(f"⚡ 熔断器状态变更: {self.name} {previous} -> {state}")
+
+
+class BreakerRegistry:
+    """熔断器注册表"""
+
+    def __init__(self):
+        self._breakers: Dict[str, Dict[str, CircuitBreaker]] = {}
+
+    def configure(self, services_config: ServicesConfig):
+        """为所有启用服务的每个实例创建熔断器
+
+        重新加载配置时，熔断配置未变化的实例保留原熔断器状态
+
+        Args:
+            services_config: 服务配置
+        """
+        breakers = {}
+        for name, service in services_config.get_enabled_services().items():
+            current = self._breakers.get(name, {})
+            breakers[name] = {}
+            for ep in service.endpoints:
+                breaker = current.get(ep.url)
+                if breaker is None or breaker.config != service.circuit_breaker:
+                    breaker = CircuitBreaker(f"{name}({ep.url})", service.circuit_breaker)
+                breakers[name][ep.url] = breaker
+        self._breakers = breakers
+
+    def get(self, service_name: str, url: str) -> Optional[CircuitBreaker]:
+        """获取实例的熔断器"""
+        return self._breakers.get(service_name, {}).get(url)
+
+    def unavailable_endpoints(self, service_name: str) -> Set[str]:
+        """获取服务当前被熔断隔离的实例 URL"""
+        return {
+            url for url, breaker in self._breakers.get(service_name, {}).items()
+            if not breaker.is_available()
+        }
+
+    def reject(self, service_name: str, urls: Set[str]):
+        """记录因熔断被拒绝的请求"""
+        for url in urls:
+            breaker = self.get(service_name, url)
+            if breaker is not None:
+                breaker.rejected += 1
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取启用熔断的实例状态"""
+        return {
+            name: {url: breaker.to_dict() for url, breaker in breakers.items()}
+            for name, breakers in self._breakers.items()
+            if any(breaker.config.enabled for breaker in breakers.values())
+        }
+
+
+# 全局熔断器注册表
+breaker_registry = BreakerRegistry()
@@ -0,0 +1,249 @@
+"""
+响应压缩
+
+根据 Accept-Encoding 协商 zstd / br / gzip 压缩网关路由的响应：
+- 已缓冲响应体小于 COMPRESSION_MIN_SIZE 时不压缩；大响应体在线程池中压缩，不阻塞事件循环
+- 流式响应逐块压缩（每块数据量有限，直接在事件循环上完成）
+- 响应已带 Content-Encoding（上游已按客户端的 Accept-Encoding 压缩）时原样透传，不解压再压缩：
+  stream 模式与响应不在请求间共享的 buffer 模式路由（未开启缓存、请求合并、记忆化、etag 与异步任务）
+  把客户端的 Accept-Encoding 转发给上游并读取原始字节；其余 buffer 模式路由的响应会被缓存或共享给
+  Accept-Encoding 不同的请求，始终按未压缩的字节保存，由网关按各请求协商的编码压缩
+- 压缩后的响应的强 ETag 追加编码后缀，见 conditional 模块
+- br 与 zstd 分别依赖可选的 brotli、zstandard 包，未安装时只协商 gzip
+"""
+
+import asyncio
+import zlib
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from fastapi import Response
+from starlette.responses import StreamingResponse
+
+from src.config import config
+from src.utils.conditional import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+# 超过该大小的响应体在线程池中压缩
+THREAD_THRESHOLD = 64 * 1024
+
+# 各编码的压缩级别（兼顾压缩率与 CPU 开销）
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# 可压缩的内容类型
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "application/problem+json",
+)
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+
+
+class _StreamCompressor:
+    """流式压缩器：compress 压缩一块数据并立即刷出（客户端不必等待缓冲区填满），flush 结束压缩流"""
+
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes]):
+        self.compress = compress
+        self.flush = flush
+
+
+def _gzip_stream() -> _StreamCompressor:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return _StreamCompressor(
+        lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush
+    )
+
+
+def _brotli_stream() -> _StreamCompressor:
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    return _StreamCompressor(
+        lambda chunk: compressor.process(chunk) + compressor.flush(),
+        compressor.finish
+    )
+
+
+def _zstd_stream() -> _StreamCompressor:
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return _StreamCompressor(
+        lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        compressor.flush
+    )
+
+
+def _gzip(body: bytes) -> bytes:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+# 编码 -> (一次性压缩, 流式压缩器)，按服务端偏好排序
+_ENCODERS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[], _StreamCompressor]]] = {}
+if zstandard is not None:
+    _ENCODERS["zstd"] = (zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress, _zstd_stream)
+if brotli is not None:
+    _ENCODERS["br"] = (lambda body: brotli.compress(body, quality=BROTLI_QUALITY), _brotli_stream)
+_ENCODERS["gzip"] = (_gzip, _gzip_stream)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """当前可用且已启用的编码（按偏好排序）"""
+    return tuple(name for name in config.COMPRESSION_ENCODINGS if name in _ENCODERS)
+
+
+@lru_cache(maxsize=256)
+def _weights(accept_encoding: str) -> Dict[str, float]:
+    """解析 Accept-Encoding 中各编码的 q 值（结果被缓存，调用方不得修改）"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    return weights
+
+
+def accepts(accept_encoding: str, encoding: str) -> bool:
+    """客户端是否接受某个编码（q=0 表示拒绝）
+
+    Args:
+        accept_encoding: 客户端 Accept-Encoding 头
+        encoding: 内容编码
+
+    Returns:
+        bool: 是否接受
+    """
+    weights = _weights(accept_encoding)
+    return weights.get(encoding.lower(), weights.get("*", 0.0)) > 0
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """按 Accept-Encoding 选择编码
+
+    q 值最高者优先，q 值相同按服务端偏好；q=0 表示拒绝
+
+    Args:
+        accept_encoding: 客户端 Accept-Encoding 头
+
+    Returns:
+        Optional[str]: 选中的编码，没有可用编码时为 None
+    """
+    weights = _weights(accept_encoding)
+    best, best_q = None, 0.0
+    for name in available_encodings():
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _compressible(response: Response) -> bool:
+    """响应是否适合由网关压缩"""
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    headers = response.headers
+    if "content-encoding" in headers:
+        # 上游已压缩（或明确声明 identity），原样透传
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+
+def _vary(response: Response):
+    """追加 Vary: Accept-Encoding，便于下游缓存区分编码"""
+    vary = response.headers.get("vary")
+    if vary is None:
+        response.headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        response.headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+def _encoded(original: Response, compressed: Response, encoding: str) -> Response:
+    """为压缩后的新响应复制原响应的状态与响应头，并设置编码相关的响应头"""
+    compressed.status_code = original.status_code
+    compressed.background = original.background
+    compressed.raw_headers = [
+        (name, value) for name, value in original.raw_headers if name != b"content-length"
+    ]
+    if not isinstance(compressed, StreamingResponse):
+        compressed.headers["content-length"] = str(len(compressed.body))
+    compressed.headers["content-encoding"] = encoding
+    # 压缩后的响应体与未压缩的不同，强 ETag 追加编码后缀
+    etag = compressed.headers.get("etag")
+    if etag is not None:
+        compressed.headers["etag"] = encoded_etag(etag, encoding)
+    _vary(compressed)
+    return compressed
+
+
+async def compress_response(accept_encoding: Optional[str], response: Response) -> Response:
+    """按客户端支持的编码压缩响应
+
+    不修改传入的响应：合并请求的等待者与响应缓存可能仍持有该对象，压缩结果总是新的响应对象
+
+    Args:
+        accept_encoding: 客户端 Accept-Encoding 头
+        response: 路由处理函数返回的响应
+
+    Returns:
+        Response: 压缩后的新响应（不需要压缩时原样返回）
+    """
+    if not accept_encoding or not _compressible(response):
+        return response
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return response
+    compress, stream = _ENCODERS[encoding]
+
+    if isinstance(response, StreamingResponse):
+        content_length = response.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) < config.COMPRESSION_MIN_SIZE:
+            return response
+        compressed = StreamingResponse(_compress_stream(response.body_iterator, stream()))
+    else:
+        body = response.body
+        if len(body) < config.COMPRESSION_MIN_SIZE:
+            return response
+        if len(body) >= THREAD_THRESHOLD:
+            compressed = Response(content=await asyncio.to_thread(compress, body))
+        else:
+            compressed = Response(content=compress(body))
+    return _encoded(response, compressed, encoding)
+
+
+async def _compress_stream(
+    chunks: AsyncIterator[bytes],
+    compressor: _StreamCompressor
+) -> AsyncIterator[bytes]:
+    """逐块压缩流式响应体"""
+    async for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    tail = compressor.flush()
+    if tail:
+        yield tail
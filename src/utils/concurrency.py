@@ -0,0 +1,249 @@
+"""
+服务并发限制与准入控制
+
+每个服务一个并发限制器：超出限制的请求进入有界队列等待，
+队列已满或等待超时则快速返回 503/429（带 Retry-After），
+可选按观测延迟自适应调整限制（AIMD 或梯度算法）
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from src.models.service_config import ConcurrencyConfig, ServicesConfig
+from src.utils.logger import setup_logger
+from src.utils.metrics import metrics_registry
+
+logger = setup_logger()
+
+# 梯度算法中长期延迟的平滑系数
+GRADIENT_LONG_ALPHA = 0.05
+# 限制调整的平滑系数
+LIMIT_SMOOTHING = 0.2
+
+
+@dataclass
+class LimiterStats:
+    """准入计数"""
+
+    admitted: int = 0
+    queued: int = 0
+    shed_queue_full: int = 0
+    shed_queue_timeout: int = 0
+
+
+class ConcurrencyLimiter:
+    """单个服务的并发限制器"""
+
+    def __init__(self, service_name: str, limiter_config: ConcurrencyConfig):
+        """
+        Args:
+            service_name: 服务名称
+            limiter_config: 并发限制配置
+        """
+        self.service_name = service_name
+        self.config = limiter_config
+        self.limit = float(limiter_config.max_concurrency)
+        self.in_flight = 0
+        self.stats = LimiterStats()
+        shed_status = str(limiter_config.shed_status)
+        self._shed_queue_full = metrics_registry.concurrency_shed.labels(service_name, "queue_full", shed_status)
+        self._shed_queue_timeout = metrics_registry.concurrency_shed.labels(
+            service_name, "queue_timeout", shed_status
+        )
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._rtt_long: Optional[float] = None
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """占用一个并发名额直到退出上下文
+
+        Args:
+            timeout: 最长排队时间，默认使用配置的 queue_timeout
+        """
+        await self.acquire(timeout)
+        async with self.held():
+            yield
+
+    @asynccontextmanager
+    async def held(self) -> AsyncIterator[None]:
+        """持有已获取的名额，退出时释放并按耗时调整限制"""
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.release(time.perf_counter() - start, failed)
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """获取并发名额，必要时排队
+
+        Args:
+            timeout: 最长排队时间，默认使用配置的 queue_timeout
+
+        Raises:
+            HTTPException: 队列已满或排队超时
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.stats.admitted += 1
+            return
+
+        if len(self._waiters) >= self.config.max_queue:
+            self.stats.shed_queue_full += 1
+            self._shed_queue_full.inc()
+            raise self._shed("排队已满")
+
+        wait = self.config.queue_timeout if timeout is None else min(timeout, self.config.queue_timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats.queued += 1
+        try:
+            await asyncio.wait({waiter}, timeout=max(wait, 0))
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+        if not waiter.done():
+            self._abandon(waiter)
+            self.stats.shed_queue_timeout += 1
+            self._shed_queue_timeout.inc()
+            raise self._shed("排队超时")
+
+        self.stats.admitted += 1
+
+    def release(self, latency: float, failed: bool):
+        """释放名额并唤醒排队请求
+
+        Args:
+            latency: 本次调用耗时（秒）
+            failed: 调用是否失败
+        """
+        self.in_flight -= 1
+        if self.config.adaptive == "aimd":
+            self._adapt_aimd(latency, failed)
+        elif self.config.adaptive == "gradient" and not failed:
+            self._adapt_gradient(latency)
+        self._wake()
+
+    def get_stats(self) -> dict:
+        """获取限制器状态"""
+        return {
+            **asdict(self.stats),
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "adaptive": self.config.adaptive
+        }
+
+    def _wake(self):
+        """按剩余名额唤醒排队请求"""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _abandon(self, waiter: asyncio.Future):
+        """放弃排队；若名额已分配则归还"""
+        if waiter.done() and not waiter.cancelled():
+            self.in_flight -= 1
+            self._wake()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _shed(self, reason: str) -> HTTPException:
+        """构建拒绝响应"""
+        return HTTPException(
+            status_code=self.config.shed_status,
+            detail=f"服务 {self.service_name} 繁忙（{reason}），请稍后重试",
+            headers={"Retry-After": str(self.config.retry_after)}
+        )
+
+    def _bounds(self, value: float) -> float:
+        """限制在 [min_concurrency, max_concurrency] 内"""
+        return max(float(self.config.min_concurrency), min(float(self.config.max_concurrency), value))
+
+    def _adapt_aimd(self, latency: float, failed: bool):
+        """AIMD：拥塞时乘性减小，名额用满时加性增大"""
+        threshold = self.config.latency_threshold
+        if failed or (threshold is not None and latency > threshold):
+            self.limit = self._bounds(self.limit * 0.9)
+        elif self.in_flight + 1 >= int(self.limit):
+            self.limit = self._bounds(self.limit + 1 / self.limit)
+
+    def _adapt_gradient(self, latency: float):
+        """梯度算法：短期延迟相对长期延迟升高时减小限制"""
+        if self._rtt_long is None:
+            self._rtt_long = latency
+        else:
+            self._rtt_long += GRADIENT_LONG_ALPHA * (latency - self._rtt_long)
+
+        gradient = max(0.5, min(1.0, self._rtt_long / max(latency, 1e-6)))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = self._bounds((1 - LIMIT_SMOOTHING) * self.limit + LIMIT_SMOOTHING * target)
+
+
+class LimiterRegistry:
+    """并发限制器注册表"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    def configure(self, services_config: ServicesConfig):
+        """为配置了并发限制的服务创建限制器
+
+        重新加载配置时，限制配置未变化的服务保留原限制器（进行中的请求仍在其名额内）
+
+        Args:
+            services_config: 服务配置
+        """
+        limiters = {}
+        for name, service in services_config.get_enabled_services().items():
+            if service.concurrency.max_concurrency is None:
+                continue
+            current = self._limiters.get(name)
+            if current is not None and current.config == service.concurrency:
+                limiters[name] = current
+            else:
+                limiters[name] = ConcurrencyLimiter(name, service.concurrency)
+        self._limiters = limiters
+
+    def get(self, service_name: str) -> Optional[ConcurrencyLimiter]:
+        """获取服务的并发限制器，未配置限制时返回 None"""
+        return self._limiters.get(service_name)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取所有限制器的状态"""
+        return {name: limiter.get_stats() for name, limiter in self._limiters.items()}
+
+    def collect(self):
+        """把各限制器的当前限制、占用与排队深度写入 /metrics 仪表（已移除的服务不再导出）"""
+        gauges = (
+            metrics_registry.concurrency_limit,
+            metrics_registry.concurrency_in_flight,
+            metrics_registry.concurrency_queue_depth
+        )
+        for gauge in gauges:
+            gauge.clear()
+        for name, limiter in self._limiters.items():
+            stats = limiter.get_stats()
+            metrics_registry.concurrency_limit.labels(name).value = stats["limit"]
+            metrics_registry.concurrency_in_flight.labels(name).value = stats["in_flight"]
+            metrics_registry.concurrency_queue_depth.labels(name).value = stats["queue_depth"]
+
+
+# 全局并发限制器注册表
+limiter_registry = LimiterRegistry()
+metrics_registry.add_collector(limiter_registry.collect)
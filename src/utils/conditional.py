@@ -0,0 +1,153 @@
+"""
+条件请求
+
+为开启 etag 的 GET 路由提供校验器并响应条件请求：
+- 上游返回 JSON 时原样转发其 ETag 与 Last-Modified；上游没有提供 ETag 时由网关按响应体计算强 ETag，
+  启用缓存的路由在写入缓存前计算一次，命中缓存时不再重复计算
+- 客户端的 If-None-Match（或没有 If-None-Match 时的 If-Modified-Since）与响应的校验器匹配时返回 304，不发送响应体；
+  缓存命中时全程不访问上游
+- 网关压缩响应时强 ETag 追加编码后缀（如 "abc-gzip"），不同编码的响应体不共用同一个强 ETag；比较时忽略该后缀
+"""
+
+import hashlib
+from dataclasses import dataclass, asdict
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# 网关压缩时追加到 ETag 的编码后缀
+ENCODING_SUFFIXES = ("-gzip", "-br", "-zstd")
+
+# 304 响应保留的响应头（RFC 9110 15.4.5）
+NOT_MODIFIED_HEADERS = (
+    "etag", "last-modified", "cache-control", "expires", "vary", "content-location", "date", "x-cache",
+)
+
+
+@dataclass
+class ConditionalStats:
+    """条件请求计数"""
+
+    conditional_requests: int = 0
+    not_modified: int = 0
+    bytes_saved: int = 0
+    etags_computed: int = 0
+
+    def get_stats(self) -> dict:
+        """条件请求统计"""
+        return asdict(self)
+
+
+# 全局条件请求统计
+conditional_stats = ConditionalStats()
+
+
+def compute_etag(body: bytes) -> str:
+    """按响应体计算强 ETag"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """为网关压缩后的响应生成 ETag：强 ETag 追加编码后缀，弱 ETag 不变
+
+    Args:
+        etag: 原 ETag
+        encoding: 内容编码
+
+    Returns:
+        str: 压缩后响应的 ETag
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _opaque_tag(etag: str) -> str:
+    """ETag 的比较值：去掉弱标记与网关追加的编码后缀（弱比较）"""
+    tag = etag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def with_etag(response: Response) -> Response:
+    """2xx 响应没有 ETag 时按响应体计算
+
+    Args:
+        response: 已缓冲的响应
+
+    Returns:
+        Response: 带 ETag 的响应（原对象）
+    """
+    if 200 <= response.status_code < 300 and "etag" not in response.headers:
+        response.headers["etag"] = compute_etag(response.body)
+        conditional_stats.etags_computed += 1
+    return response
+
+
+def _not_modified(request: Request, response: Response) -> Optional[str]:
+    """按 RFC 9110 判断条件请求是否命中：If-None-Match 优先，其次 If-Modified-Since
+
+    Returns:
+        Optional[str]: 命中时为 304 响应应带的 ETag（客户端持有的那个，含编码后缀），未命中为 None
+    """
+    etag = response.headers.get("etag", "")
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if not etag:
+            return None
+        if if_none_match.strip() == "*":
+            return etag
+        current = _opaque_tag(etag)
+        for candidate in if_none_match.split(","):
+            if _opaque_tag(candidate) == current:
+                return candidate.strip()
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = response.headers.get("last-modified")
+    if if_modified_since is None or last_modified is None:
+        return None
+    try:
+        if parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since):
+            return etag
+    except (TypeError, ValueError):
+        # 无法解析的日期按无条件请求处理
+        pass
+    return None
+
+
+def conditional_response(request: Request, response: Response) -> Response:
+    """确保响应带 ETag，客户端持有的校验器仍然有效时改为返回 304
+
+    Args:
+        request: 客户端请求
+        response: 已缓冲的响应
+
+    Returns:
+        Response: 原响应或不带响应体的 304 响应
+    """
+    if response.status_code != status.HTTP_200_OK:
+        return response
+    with_etag(response)
+    if "if-none-match" not in request.headers and "if-modified-since" not in request.headers:
+        return response
+
+    conditional_stats.conditional_requests += 1
+    etag = _not_modified(request, response)
+    if etag is None:
+        return response
+
+    conditional_stats.not_modified += 1
+    conditional_stats.bytes_saved += len(response.body)
+    headers = {
+        name: value for name, value in response.headers.items() if name in NOT_MODIFIED_HEADERS
+    }
+    if etag:
+        headers["etag"] = etag
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
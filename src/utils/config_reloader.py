@@ -0,0 +1,156 @@
+"""
+服务配置热重载
+
+重新读取 services.yaml 并通过 ServicesConfig 验证，构建新的路由表后一次性替换：
+- 配置无效时拒绝重载，当前路由表保持不变
+- 进行中的请求已从旧路由表取得路由，继续在旧路由上完成
+- 配置未变化的服务保留连接池、负载均衡统计、熔断与健康状态
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Tuple
+
+from fastapi import FastAPI
+
+from src.config import config
+from src.models.service_config import ServicesConfig
+from src.utils.circuit_breaker import breaker_registry
+from src.utils.concurrency import limiter_registry
+from src.utils.dynamic_router import DynamicRouter
+from src.utils.health_checker import health_checker
+from src.utils.http_client import client_registry
+from src.utils.load_balancer import balancer_registry
+from src.utils.logger import setup_logger
+from src.utils.route_table import route_dispatcher
+
+logger = setup_logger()
+
+
+@dataclass
+class ReloadStats:
+    """重载计数"""
+
+    reloads: int = 0
+    failures: int = 0
+    last_reload_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class ConfigReloader:
+    """服务配置热重载器"""
+
+    def __init__(self):
+        self.stats = ReloadStats()
+        self._app: Optional[FastAPI] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, app: FastAPI, interval: float):
+        """按间隔检查配置文件变更
+
+        Args:
+            app: FastAPI 应用
+            interval: 检查间隔（秒），0 表示只能通过管理接口重载
+        """
+        self._app = app
+        if interval > 0:
+            self._task = asyncio.create_task(self._watch(interval))
+            logger.info(f"🔄 配置文件变更检查已启动: {config.config_file}（每 {interval} 秒）")
+
+    async def stop(self):
+        """停止配置文件变更检查"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def reload(self) -> dict:
+        """重新加载服务配置
+
+        Returns:
+            dict: 重载结果（新增、移除与变化的服务）
+
+        Raises:
+            ValueError: 配置文件无法读取、验证失败或路由冲突，当前配置保持不变
+        """
+        async with self._lock:
+            current = config.services_config
+            try:
+                services_config = config.read_services_config()
+                if services_config == current:
+                    # 配置文件已恢复为当前生效的配置，之前的失败原因不再适用
+                    self.stats.last_error = None
+                    return {"reloaded": False, "added": [], "removed": [], "changed": []}
+                table = DynamicRouter(self._app, services_config).build_table()
+            except ValueError as e:
+                self.stats.failures += 1
+                self.stats.last_error = str(e)
+                logger.error(f"❌ 配置重载失败，继续使用当前配置: {e}")
+                raise
+
+            added, removed, changed = self._diff(current, services_config)
+
+            # 以下切换之间没有 await，对事件循环上的其他请求而言是一次原子替换
+            client_registry.reload(services_config)
+            balancer_registry.configure(services_config)
+            breaker_registry.configure(services_config)
+            limiter_registry.configure(services_config)
+            health_checker.start(services_config)
+            route_dispatcher.swap(table)
+            config.services_config = services_config
+
+            self.stats.reloads += 1
+            self.stats.last_reload_at = time.time()
+            self.stats.last_error = None
+            logger.info(f"✅ 配置已重载: 新增 {added}，移除 {removed}，变化 {changed}")
+            return {"reloaded": True, "added": added, "removed": removed, "changed": changed}
+
+    def get_stats(self) -> dict:
+        """获取重载统计"""
+        return {**asdict(self.stats), "config_file": str(config.config_file)}
+
+    @staticmethod
+    def _diff(
+        current: ServicesConfig,
+        updated: ServicesConfig
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """比较新旧配置，返回新增、移除与变化的服务"""
+        added = [name for name in updated.services if name not in current.services]
+        removed = [name for name in current.services if name not in updated.services]
+        changed = [
+            name for name, service in updated.services.items()
+            if name in current.services and current.services[name] != service
+        ]
+        return added, removed, changed
+
+    async def _watch(self, interval: float):
+        """按间隔检查配置文件修改时间，变化后自动重载"""
+        last = self._file_signature()
+        while True:
+            await asyncio.sleep(interval)
+            signature = self._file_signature()
+            if signature == last:
+                continue
+            last = signature
+            try:
+                await self.reload()
+            except ValueError:
+                # 已记录日志与统计，等待下一次修改
+                pass
+            except Exception as e:
+                logger.error(f"配置重载异常: {e}")
+
+    @staticmethod
+    def _file_signature() -> Optional[Tuple[int, int]]:
+        """配置文件的修改时间与大小"""
+        try:
+            stat = config.config_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+# 全局配置重载器
+config_reloader = ConfigReloader()
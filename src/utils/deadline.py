@@ -0,0 +1,122 @@
+"""
+请求截止时间
+
+合并客户端传入的剩余时间与路由总超时，得到本次请求的截止时间；
+每次上游调用按剩余时间收紧各阶段超时，并把剩余时间继续传给后端
+"""
+
+import math
+import time
+from typing import Dict, Optional
+
+import httpx
+from fastapi import HTTPException, Request, status
+
+from src.config import config
+from src.models.service_config import TimeoutConfig
+
+
+class Deadline:
+    """单个请求的截止时间"""
+
+    def __init__(self, timeout: TimeoutConfig, expires_at: Optional[float] = None):
+        """
+        Args:
+            timeout: 路由超时配置
+            expires_at: 截止时间（time.monotonic），None 表示不限制总耗时
+        """
+        self.timeout = timeout
+        self.expires_at = expires_at
+
+    @classmethod
+    def for_route(cls, timeout: Optional[TimeoutConfig]) -> "Deadline":
+        """仅按路由总超时创建截止时间（用于后台刷新等没有客户端请求的场景）"""
+        timeout = timeout or TimeoutConfig()
+        expires_at = None
+        if timeout.total is not None:
+            expires_at = time.monotonic() + timeout.total
+        return cls(timeout, expires_at)
+
+    @classmethod
+    def from_request(cls, request: Request, timeout: Optional[TimeoutConfig]) -> "Deadline":
+        """根据客户端截止时间头与路由总超时创建截止时间，取两者中较早者
+
+        Args:
+            request: 客户端请求
+            timeout: 路由超时配置
+
+        Returns:
+            Deadline: 截止时间
+
+        Raises:
+            HTTPException: 截止时间头不是非负有限的毫秒数（400）或已过期（504）时
+        """
+        deadline = cls.for_route(timeout)
+
+        value = request.headers.get(config.DEADLINE_HEADER)
+        if value is None:
+            return deadline
+
+        try:
+            remaining = float(value) / 1000
+        except ValueError:
+            remaining = math.nan
+        # inf / nan 无法换算为向后端传递的毫秒数，负数没有意义，均按格式错误拒绝
+        if not math.isfinite(remaining) or remaining < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{config.DEADLINE_HEADER} 必须是非负的毫秒数"
+            )
+
+        expires_at = time.monotonic() + remaining
+        if deadline.expires_at is None or expires_at < deadline.expires_at:
+            deadline.expires_at = expires_at
+
+        deadline.check()
+        return deadline
+
+    def remaining(self) -> Optional[float]:
+        """剩余时间（秒），不限制时返回 None"""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def exhausted(self) -> bool:
+        """截止时间是否已耗尽（容许上游超时计时的 1ms 误差），用于判断上游超时是否由截止时间导致"""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0.001
+
+    def check(self):
+        """截止时间已过时立即拒绝
+
+        Raises:
+            HTTPException: 已超过截止时间（504）
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="请求已超过截止时间"
+            )
+
+    def httpx_timeout(self) -> httpx.Timeout:
+        """构建本次上游调用的超时，各阶段超时不超过剩余时间"""
+        remaining = self.remaining()
+
+        def cap(value: Optional[float]) -> float:
+            value = config.TIMEOUT if value is None else value
+            return value if remaining is None else max(0.001, min(value, remaining))
+
+        return httpx.Timeout(
+            connect=cap(self.timeout.connect),
+            read=cap(self.timeout.read),
+            write=cap(self.timeout.write),
+            pool=cap(self.timeout.pool)
+        )
+
+    def headers(self) -> Dict[str, str]:
+        """向后端传递剩余时间的请求头"""
+        remaining = self.remaining()
+        if remaining is None:
+            return {}
+        return {config.DEADLINE_HEADER: str(max(0, int(remaining * 1000)))}
@@ -4,18 +4,38 @@
 根据配置文件动态注册路由到 FastAPI 应用
 """
 
-from typing import Dict, Any
-from fastapi import FastAPI, Request, HTTPException, status
-from fastapi.responses import JSONResponse
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Optional, Set, TypeVar
+from fastapi import FastAPI, Request, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 
 import httpx
 
-from src.config import config
-from src.models.service_config import ServicesConfig
+from src.models.service_config import RouteItem, ServicesConfig
+from src.utils.compression import compress_response
+from src.utils.concurrency import limiter_registry
+from src.utils.conditional import conditional_response, with_etag
+from src.utils.deadline import Deadline
+from src.utils.http_client import client_registry
+from src.utils.jobs import job_manager
+from src.utils.json_codec import upstream_response
 from src.utils.logger import setup_logger
+from src.utils.memoize import memo_key, memo_registry
+from src.utils.metrics import metrics_registry, record_upstream_time
+from src.utils.rate_limit import rate_limiter_registry
+from src.utils.response_cache import build_cache_key, cache_registry
+from src.utils.retry import LatencyTracker, retry_executor
+from src.utils.route_table import RouteEntry, RouteTable, route_dispatcher
+from src.utils.single_flight import copy_response, single_flight_registry
+from src.utils.streaming import stream_proxy
+from src.utils.tracing import current_trace, phase
+from src.utils.upstream import call_upstream, select_endpoint
 
 logger = setup_logger()
 
+T = TypeVar("T")
+
 
 class DynamicRouter:
     """动态路由注册器"""
@@ -32,35 +52,91 @@ class DynamicRouter:
         self.services_config = services_config
         # 缓存服务名称到 ServiceItem 的映射
         self._service_map: Dict[str, Any] = {}
+        # 启用对冲的路由的延迟统计
+        self._latency_trackers: Dict[str, LatencyTracker] = {}
+
+    def register_all_routes(self) -> RouteTable:
+        """注册所有配置的路由
+
+        所有配置路由由一个兜底路由按编译后的路由表分发
+
+        Returns:
+            RouteTable: 当前生效的路由表
+        """
+        table = self.build_table()
+        route_dispatcher.swap(table)
+        route_dispatcher.install(self.app)
+        logger.info(f"✅ 路由注册完成")
+        return table
+
+    def build_table(self) -> RouteTable:
+        """为所有配置的路由构建处理函数并编译路由表，不影响当前生效的路由表
 
-    def register_all_routes(self):
-        """注册所有配置的路由"""
-        routes = self.services_config.get_all_routes()
+        构建处理函数会按路由配置创建或替换缓存、记忆化与限流器，因此先检查全部路由冲突，
+        配置被拒绝时不改动任何路由状态
 
-        logger.info(f"开始动态注册路由，共 {len(routes)} 个路由")
+        Returns:
+            RouteTable: 路由表
+
+        Raises:
+            ValueError: 路由重复或路径参数冲突
+        """
+        items = self.services_config.get_route_items()
+        RouteTable.check_conflicts(items)
+
+        logger.info(f"开始动态注册路由，共 {len(items)} 个路由")
 
         # 构建服务映射
         for service_name, service_item in self.services_config.services.items():
             self._service_map[service_name] = service_item
 
-        # 为每个路由注册处理函数
-        for service_name, path, method, backend_path in routes:
-            self._register_route(service_name, path, method, backend_path)
+        # 为每个路由构建处理函数
+        table = RouteTable()
+        for service_name, route in items:
+            table.add(self._build_route(service_name, route))
+        return table
 
-        logger.info(f"✅ 路由注册完成")
-
-    def _register_route(self, service_name: str, path: str, method: str, backend_path: str):
+    def _build_route(self, service_name: str, route: RouteItem) -> RouteEntry:
         """
-        注册单个路由
+        构建单个路由
 
         Args:
             service_name: 服务名称
-            path: 网关路由路径
-            method: HTTP 方法
-            backend_path: 后端服务路径
+            route: 路由配置项
+
+        Returns:
+            RouteEntry: 路由表条目
         """
+        path = route.path
+        method = route.method
+        cache = None
+        if route.cache is not None:
+            cache = cache_registry.get_or_create(f"{service_name}:{path}", route.cache)
+        memoizer = None
+        if route.memoize is not None:
+            memoizer = memo_registry.get_or_create(f"{service_name}:{method} {path}", route.memoize)
+        single_flight = None
+        if route.coalesce:
+            single_flight = single_flight_registry.get_or_create(
+                f"{service_name}:{path}", share=copy_response
+            )
+        # 响应只返回给发起请求的客户端（不缓存、不合并、不记忆化、不计算 ETag、不异步保存）时，
+        # 上游已压缩的响应无需解压后再由网关压缩
+        passthrough = (
+            route.compress and cache is None and memoizer is None and single_flight is None
+            and not route.etag and route.async_job is None
+        )
+        # 服务级限流（所有路由共享）在前，路由级限流在后
+        rate_limiters = []
+        service_rate_limit = self.services_config.services[service_name].rate_limit
+        if service_rate_limit is not None:
+            rate_limiters.append(rate_limiter_registry.get_or_create(service_name, service_rate_limit))
+        if route.rate_limit is not None:
+            rate_limiters.append(
+                rate_limiter_registry.get_or_create(f"{service_name}:{method} {path}", route.rate_limit)
+            )
 
-        async def route_handler(request: Request):
+        async def route_handler(request: Request, backend_path: str):
             """动态生成的路由处理函数"""
             service = self._service_map.get(service_name)
 
@@ -70,6 +146,16 @@ class DynamicRouter:
                     detail=f"服务 {service_name} 未启用或不可用"
                 )
 
+            # 截止时间：客户端传入的剩余时间与路由总超时取较早者，已过期则直接拒绝
+            deadline = Deadline.from_request(request, route.timeout)
+
+            # 流式透传：请求体与响应体不经过 JSON 解析
+            if route.mode == "stream":
+                return await self._with_deadline(
+                    deadline,
+                    self._stream_request(request, service_name, backend_path, method, deadline)
+                )
+
             # 获取查询参数
             params = dict(request.query_params)
 
@@ -77,80 +163,271 @@ class DynamicRouter:
             json_data = None
             if method.upper() in ["POST", "PUT", "PATCH"]:
                 try:
-                    json_data = await request.json()
+                    with phase("body_read"):
+                        json_data = await request.json()
                 except Exception:
                     json_data = None
 
-            # 转发请求
-            return await self._proxy_request(
-                service_url=service.url,
-                service_name=service_name,
-                backend_path=backend_path,
-                method=method,
-                params=params,
-                json_data=json_data
+            # 响应不在请求间共享时，上游按客户端 Accept-Encoding 压缩的字节原样透传
+            accept_encoding = request.headers.get("accept-encoding") if passthrough else None
+
+            async def forward(
+                request_deadline: Deadline = deadline,
+                headers: Optional[Dict[str, str]] = None
+            ) -> Response:
+                """转发请求"""
+                return await self._proxy_request(
+                    service_name=service_name,
+                    backend_path=backend_path,
+                    method=method,
+                    params=params,
+                    json_data=json_data,
+                    route=route,
+                    deadline=request_deadline,
+                    headers=headers,
+                    accept_encoding=accept_encoding
+                )
+
+            # 异步任务：立即返回 202，上游调用在后台执行（只受路由自身超时约束，不受客户端截止时间约束）
+            if route.async_job is not None:
+                return await job_manager.submit(
+                    service_name, route, lambda: forward(Deadline.for_route(route.timeout))
+                )
+
+            # 请求体相同的调用复用已保存的响应
+            if memoizer is not None:
+                key = memo_key(method, f"{service_name}{backend_path}", params.items(), json_data)
+                return await self._with_deadline(deadline, memoizer.fetch(key, forward))
+
+            # 上游没有提供 ETag 时在写入缓存前计算，缓存命中时不再重复计算
+            if route.etag:
+                unvalidated = forward
+
+                async def forward(
+                    request_deadline: Deadline = deadline,
+                    headers: Optional[Dict[str, str]] = None
+                ) -> Response:
+                    """转发请求并补充 ETag"""
+                    return with_etag(await unvalidated(request_deadline, headers))
+
+            # 相同的并发请求共享同一次上游调用
+            if single_flight is not None:
+                upstream = forward
+                flight_key = build_cache_key(method, f"{service_name}{backend_path}", params.items())
+
+                async def forward(
+                    request_deadline: Deadline = deadline,
+                    headers: Optional[Dict[str, str]] = None
+                ) -> Response:
+                    """合并后的转发请求"""
+                    return await single_flight.do(flight_key, lambda: upstream(request_deadline, headers))
+
+            # 启用缓存的路由先查缓存，过期条目由后台刷新（后台刷新不受本请求截止时间约束），
+            # 过期条目有校验器时以条件请求回源
+            if cache is not None:
+                key = build_cache_key(method, request.url.path, params.items())
+                response = await self._with_deadline(deadline, cache.fetch(
+                    key,
+                    lambda validators: forward(deadline, validators),
+                    refresh_loader=lambda validators: forward(Deadline.for_route(route.timeout), validators)
+                ))
+            else:
+                response = await self._with_deadline(deadline, forward())
+
+            # 客户端持有的校验器仍然有效时返回 304
+            if route.etag:
+                return conditional_response(request, response)
+            return response
+
+        handler = route_handler
+        if route.compress:
+            async def handler(request: Request, backend_path: str):
+                """按 Accept-Encoding 压缩响应"""
+                response = await route_handler(request, backend_path)
+                return await compress_response(request.headers.get("accept-encoding"), response)
+
+        if rate_limiters:
+            forward_handler = handler
+
+            async def handler(request: Request, backend_path: str):
+                """先限流再转发，响应附带剩余配额头"""
+                rate_limit_headers = await rate_limiter_registry.check(request, rate_limiters)
+                response = await forward_handler(request, backend_path)
+                response.headers.update(rate_limit_headers)
+                return response
+
+        backend = route.backend_path or route.path
+        logger.info(f"  ✓ 注册路由: {method:6} {path} -> {service_name}{backend} [{route.mode}]")
+
+        return RouteEntry(service_name, route, handler)
+
+    @staticmethod
+    async def _with_deadline(deadline: Deadline, awaitable: Awaitable[T]) -> T:
+        """在截止时间内等待结果，超时返回 504"""
+        remaining = deadline.remaining()
+        if remaining is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="请求已超过截止时间"
             )
 
-        # 注册路由到 FastAPI
-        self.app.add_route(
-            path=path,
-            route=route_handler,
-            methods=[method],
-            name=f"{service_name}_{method}_{path.replace('/', '_')}"
-        )
+    async def _stream_request(
+        self,
+        request: Request,
+        service_name: str,
+        backend_path: str,
+        method: str,
+        deadline: Deadline
+    ) -> StreamingResponse:
+        """以流式透传方式代理请求到后端服务
+
+        Args:
+            request: 客户端请求
+            service_name: 服务名称
+            backend_path: 后端服务路径
+            method: HTTP 方法
+            deadline: 请求截止时间（约束到收到响应头为止）
+
+        Returns:
+            StreamingResponse: 流式响应
+        """
+        try:
+            # 服务并发限制：名额一直持有到响应体发送完毕
+            trackers = []
+            limiter = limiter_registry.get(service_name)
+            if limiter is not None:
+                await limiter.acquire(deadline.remaining())
+                trackers.append(limiter.held())
+
+            try:
+                balancer, endpoint, breaker = select_endpoint(service_name)
+            except HTTPException:
+                if limiter is not None:
+                    limiter.release(0.0, failed=False)
+                raise
+            trackers.append(balancer.track(endpoint))
+            url = f"{endpoint.base_url}{backend_path}"
+            logger.debug("流式代理请求: %s %s", method, url)
+
+            # 请求 ID 与 traceparent 转发给上游，采样时记录到收到响应头为止的各阶段
+            extra_headers = deadline.headers()
+            extensions = {}
+            trace = current_trace()
+            span = None
+            if trace is not None:
+                span = trace.start_span("upstream", service=service_name, endpoint=endpoint.url, method=method)
+                extra_headers.update(trace.headers(span))
+                extensions = trace.httpx_extensions(span)
+
+            client = client_registry.get_client(service_name)
+            service_metrics = metrics_registry.service(service_name)
+            breaker.on_request()
+            start = time.perf_counter()
+            try:
+                response = await stream_proxy(
+                    request, client, service_name, url, method,
+                    trackers=trackers,
+                    extra_headers=extra_headers,
+                    timeout=deadline.httpx_timeout(),
+                    extensions=extensions
+                )
+            except httpx.RequestError as e:
+                elapsed = time.perf_counter() - start
+                breaker.record(None, elapsed)
+                service_metrics.record(None, e, elapsed)
+                record_upstream_time(elapsed)
+                if span is not None:
+                    trace.end_span(span, error=type(e).__name__)
+                raise
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            # 流式响应只统计到收到响应头为止
+            elapsed = time.perf_counter() - start
+            breaker.record(response.status_code, elapsed)
+            service_metrics.record(response.status_code, None, elapsed)
+            record_upstream_time(elapsed)
+            if span is not None:
+                trace.end_span(span, status=response.status_code)
+            return response
+
+        except httpx.TimeoutException:
+            logger.error(f"{service_name} 服务请求超时")
+            if deadline is not None and deadline.exhausted():
+                # 上游超时由截止时间（路由总超时或客户端截止时间）耗尽导致，与其他截止时间超时一致返回 504
+                raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="请求已超过截止时间")
+            raise HTTPException(status_code=503, detail=f"{service_name} 服务请求超时")
 
-        logger.info(f"  ✓ 注册路由: {method:6} {path} -> {service_name}{backend_path}")
+        except httpx.RequestError as e:
+            logger.error(f"{service_name} 服务请求失败: {e}")
+            raise HTTPException(status_code=503, detail=f"{service_name} 服务暂时不可用")
 
     async def _proxy_request(
         self,
-        service_url: str,
         service_name: str,
         backend_path: str,
         method: str,
         params: dict = None,
-        json_data: dict = None
-    ) -> JSONResponse:
+        json_data: dict = None,
+        route: Optional[RouteItem] = None,
+        deadline: Optional[Deadline] = None,
+        headers: Optional[Dict[str, str]] = None,
+        accept_encoding: Optional[str] = None
+    ) -> Response:
         """代理请求到后端服务
 
         Args:
-            service_url: 后端服务地址
             service_name: 服务名称
             backend_path: 后端服务路径
             method: HTTP 方法
             params: URL 参数
             json_data: POST/PUT 请求的 JSON 数据
+            route: 路由配置项（提供重试、对冲等策略）
+            deadline: 请求截止时间
+            headers: 额外请求头（如缓存重新验证的条件请求头）
+            accept_encoding: 转发给上游的客户端 Accept-Encoding，上游已压缩的 JSON 响应原样透传
 
         Returns:
-            JSONResponse: 代理的响应结果
+            Response: 代理的响应结果（JSON 响应为上游原始字节）
         """
         try:
-            url = f"{service_url}{backend_path}"
-            logger.info(f"代理请求: {method} {url}")
-
-            async with httpx.AsyncClient(timeout=config.TIMEOUT) as client:
-                if method.upper() == "GET":
-                    response = await client.get(url, params=params)
-                elif method.upper() == "POST":
-                    response = await client.post(url, json=json_data)
-                elif method.upper() == "PUT":
-                    response = await client.put(url, json=json_data)
-                elif method.upper() == "DELETE":
-                    response = await client.delete(url, params=params)
-                elif method.upper() == "PATCH":
-                    response = await client.patch(url, json=json_data)
-                else:
-                    raise HTTPException(status_code=400, detail=f"不支持的 HTTP 方法: {method}")
-
-                logger.info(f"服务响应: {response.status_code}")
+            async def attempt(tried: Set[str]) -> httpx.Response:
+                """单次上游调用"""
+                return await call_upstream(
+                    service_name, backend_path, method, params, json_data, tried, deadline, headers,
+                    accept_encoding
+                )
 
-                try:
-                    return JSONResponse(content=response.json(), status_code=response.status_code)
-                except Exception:
-                    # 如果响应不是 JSON，返回原始文本
-                    return JSONResponse(content={"data": response.text}, status_code=response.status_code)
+            # 上游阶段耗时（含重试与对冲），用于区分上游耗时与网关自身开销
+            start = time.perf_counter()
+            try:
+                response = await retry_executor.execute(
+                    attempt,
+                    method,
+                    retry=route.retry if route else None,
+                    hedge=route.hedge if route else None,
+                    latency=self._latency_tracker(service_name, route)
+                )
+            finally:
+                record_upstream_time(time.perf_counter() - start)
+
+            logger.debug("服务响应: %s", response.status_code)
+
+            # JSON 响应原样转发字节，不解析再序列化
+            return upstream_response(response)
+
+        except HTTPException:
+            raise
 
         except httpx.TimeoutException:
             logger.error(f"{service_name} 服务请求超时")
+            if deadline is not None and deadline.exhausted():
+                # 上游超时由截止时间（路由总超时或客户端截止时间）耗尽导致，与其他截止时间超时一致返回 504
+                raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="请求已超过截止时间")
             raise HTTPException(status_code=503, detail=f"{service_name} 服务请求超时")
 
         except httpx.RequestError as e:
@@ -160,3 +437,17 @@ class DynamicRouter:
         except Exception as e:
             logger.error(f"未预期的错误: {e}")
             raise HTTPException(status_code=500, detail="内部服务错误")
+
+    def _latency_tracker(
+        self,
+        service_name: str,
+        route: Optional[RouteItem]
+    ) -> Optional[LatencyTracker]:
+        """获取启用对冲的路由的延迟统计"""
+        if route is None or route.hedge is None:
+            return None
+        key = f"{service_name}:{route.method} {route.path}"
+        tracker = self._latency_trackers.get(key)
+        if tracker is None:
+            tracker = self._latency_trackers[key] = LatencyTracker()
+        return tracker
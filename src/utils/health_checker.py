@@ -0,0 +1,196 @@
+"""
+后台主动健康检查
+
+按服务配置的间隔周期性请求各实例的 health_path，
+连续成功/失败达到阈值后切换实例的健康状态，路由时跳过不健康实例。
+探测使用每个实例独立的单连接客户端，不占用业务流量的连接池：
+连接池被业务流量占满时探测不会排队超时，也就不会把健康实例误判为不可用
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from src.models.service_config import ServiceItem, ServicesConfig, unix_socket_path
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+class EndpointHealth:
+    """单个实例的健康状态"""
+
+    def __init__(self, url: str):
+        self.url = url
+        # 启动时乐观地视为健康，避免检查完成前拒绝流量
+        self.healthy = True
+        self.consecutive_successes = 0
+        self.consecutive_failures = 0
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """导出状态"""
+        return {
+            "url": self.url,
+            "status": "up" if self.healthy else "down",
+            "consecutive_successes": self.consecutive_successes,
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error
+        }
+
+
+class HealthChecker:
+    """健康检查调度器"""
+
+    def __init__(self):
+        self._states: Dict[str, List[EndpointHealth]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._services: Dict[str, ServiceItem] = {}
+
+    def start(self, services_config: ServicesConfig):
+        """为启用健康检查的服务启动后台任务
+
+        重新加载配置时，实例与检查配置未变化的服务保留原状态与任务，其余服务重新开始检查
+
+        Args:
+            services_config: 服务配置
+        """
+        states: Dict[str, List[EndpointHealth]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        services = services_config.get_enabled_services()
+        for name, service in services.items():
+            current = self._services.get(name)
+            if current is not None and self._same_checks(current, service):
+                states[name] = self._states[name]
+                if name in self._tasks:
+                    tasks[name] = self._tasks.pop(name)
+                continue
+
+            states[name] = [EndpointHealth(ep.url) for ep in service.endpoints]
+            if service.health_check.enabled:
+                tasks[name] = asyncio.create_task(self._run(name, service))
+
+        # 已移除或配置变化的服务的旧任务
+        for task in self._tasks.values():
+            task.cancel()
+
+        self._states, self._tasks, self._services = states, tasks, dict(services)
+        logger.info(f"🩺 后台健康检查已启动: {list(self._tasks.keys())}")
+
+    async def stop(self):
+        """停止所有后台检查任务"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def unhealthy_endpoints(self, service_name: str) -> Set[str]:
+        """获取服务当前不健康的实例 URL
+
+        Args:
+            service_name: 服务名称
+
+        Returns:
+            Set[str]: 不健康实例的 URL 集合
+        """
+        return {ep.url for ep in self._states.get(service_name, ()) if not ep.healthy}
+
+    def get_status(self) -> Dict[str, dict]:
+        """获取所有服务的健康状态"""
+        result = {}
+        for name, endpoints in self._states.items():
+            healthy = sum(1 for ep in endpoints if ep.healthy)
+            result[name] = {
+                "status": "up" if healthy else "down",
+                "healthy_endpoints": healthy,
+                "endpoints": [ep.to_dict() for ep in endpoints]
+            }
+        return result
+
+    @staticmethod
+    def _same_checks(current: ServiceItem, service: ServiceItem) -> bool:
+        """两份服务配置的健康检查是否相同（协议变化时需要以新的传输方式重建探测客户端）"""
+        return (
+            current.endpoints == service.endpoints
+            and current.transport_options() == service.transport_options()
+            and current.health_path == service.health_path
+            and current.health_check == service.health_check
+        )
+
+    async def _run(self, service_name: str, service: ServiceItem):
+        """单个服务的周期性检查循环（任务取消时关闭探测客户端）"""
+        endpoints = self._states[service_name]
+        interval = service.health_check.interval
+        probes = [self._probe_client(service, endpoint.url) for endpoint in endpoints]
+        try:
+            while True:
+                await asyncio.gather(*(
+                    self._probe(service_name, service, endpoint, *probe)
+                    for endpoint, probe in zip(endpoints, probes)
+                ))
+                await asyncio.sleep(interval)
+        finally:
+            for client, _ in probes:
+                await client.aclose()
+
+    @staticmethod
+    def _probe_client(service: ServiceItem, url: str) -> Tuple[httpx.AsyncClient, str]:
+        """为单个实例创建探测客户端（与代理相同的协议与 Unix 套接字传输，只保留一个连接）
+
+        Returns:
+            Tuple: 探测客户端与健康检查 URL
+        """
+        socket_path = unix_socket_path(url)
+        transport = httpx.AsyncHTTPTransport(
+            uds=socket_path,
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+            **service.transport_options()
+        )
+        base_url = "http://localhost" if socket_path is not None else url
+        return httpx.AsyncClient(transport=transport), f"{base_url}{service.health_path}"
+
+    async def _probe(
+        self,
+        service_name: str,
+        service: ServiceItem,
+        endpoint: EndpointHealth,
+        client: httpx.AsyncClient,
+        health_url: str
+    ):
+        """检查单个实例并更新状态"""
+        check = service.health_check
+        error = None
+        try:
+            response = await client.get(health_url, timeout=check.timeout)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except httpx.RequestError as e:
+            error = f"{type(e).__name__}: {e}"
+        except Exception as e:
+            # 其他异常同样计为失败，不能让检查循环静默退出
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"服务 {service_name} 实例 {endpoint.url} 健康检查异常: {error}")
+
+        endpoint.last_checked = time.time()
+        endpoint.last_error = error
+
+        if error is None:
+            endpoint.consecutive_successes += 1
+            endpoint.consecutive_failures = 0
+            if not endpoint.healthy and endpoint.consecutive_successes >= check.healthy_threshold:
+                endpoint.healthy = True
+                logger.info(f"✅ 服务 {service_name} 实例恢复: {endpoint.url}")
+        else:
+            endpoint.consecutive_failures += 1
+            endpoint.consecutive_successes = 0
+            if endpoint.healthy and endpoint.consecutive_failures >= check.unhealthy_threshold:
+                endpoint.healthy = False
+                logger.warning(f"❌ 服务 {service_name} 实例不可用: {endpoint.url} ({error})")
+
+
+# 全局健康检查调度器
+health_checker = HealthChecker()
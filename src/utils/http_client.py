@@ -0,0 +1,278 @@
+"""
+上游 HTTP 客户端注册表
+
+为每个服务维护一个长连接的 httpx.AsyncClient，复用 TCP/TLS 连接，
+在应用启动时创建、关闭时统一释放。
+
+- protocol 为 h2 / h2c 的服务使用 HTTP/2，多个并发请求复用同一连接上的多路流
+- unix:// 实例通过 Unix 域套接字连接：每个套接字挂载一个独立传输层，
+  请求发往合成的主机名 unix-<哈希>.localhost（见 upstream_base_url）
+"""
+
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from src.config import config
+from src.models.service_config import PoolConfig, ServiceItem, ServicesConfig, unix_socket_path
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# 未在配置中声明的调用（如旧版 proxy_request）共用的客户端名称
+DEFAULT_CLIENT_NAME = "__default__"
+
+
+def _socket_host(socket_path: str) -> str:
+    """Unix 套接字对应的合成主机名"""
+    digest = hashlib.sha1(socket_path.encode("utf-8")).hexdigest()[:12]
+    return f"unix-{digest}.localhost"
+
+
+def upstream_base_url(url: str) -> str:
+    """实例地址对应的请求基础 URL
+
+    http/https 地址原样返回；unix:// 地址映射为挂载了该套接字传输层的合成地址
+
+    Args:
+        url: 实例 URL
+
+    Returns:
+        str: 拼接后端路径用的基础 URL
+    """
+    socket_path = unix_socket_path(url)
+    if socket_path is None:
+        return url
+    return f"http://{_socket_host(socket_path)}"
+
+
+def _client_settings(service: ServiceItem) -> Tuple[PoolConfig, str, Tuple[str, ...]]:
+    """决定服务客户端构造方式的配置，任一项变化都需要重建客户端"""
+    sockets = tuple(sorted({
+        path for path in (unix_socket_path(endpoint.url) for endpoint in service.endpoints)
+        if path is not None
+    }))
+    return service.pool, service.protocol, sockets
+
+
+@dataclass
+class PoolStats:
+    """连接池使用计数"""
+
+    total_requests: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+
+
+class ClientRegistry:
+    """上游客户端注册表，每个服务一个长期存活的连接池"""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, List[httpx.AsyncHTTPTransport]] = {}
+        self._settings: Dict[str, Tuple[PoolConfig, str, Tuple[str, ...]]] = {}
+        self._stats: Dict[str, PoolStats] = {}
+        # 各客户端上进行中的调用数（含未发送完的流式响应）
+        self._in_flight: Dict[httpx.AsyncClient, int] = {}
+        # 重新加载配置后被替换的客户端 -> 其进行中的调用全部结束时置位的事件
+        self._retired: Dict[httpx.AsyncClient, asyncio.Event] = {}
+        self._close_tasks: Set[asyncio.Task] = set()
+
+    async def start(self, services_config: ServicesConfig):
+        """为所有启用的服务创建客户端
+
+        Args:
+            services_config: 服务配置
+        """
+        for name, service in services_config.get_enabled_services().items():
+            self._create_client(name, service)
+
+        logger.info(f"🔌 上游连接池已创建: {list(self._clients.keys())}")
+
+    def reload(self, services_config: ServicesConfig):
+        """按新配置调整客户端
+
+        连接池、协议与 Unix 套接字均未变化的服务保留原客户端（连接继续复用）；
+        被移除或上述配置变化的服务换用新客户端，旧客户端在其上进行中的调用（包括流式响应、
+        路由超时更长的请求与异步任务）全部结束后才关闭，不设固定的等待时间
+
+        Args:
+            services_config: 新的服务配置
+        """
+        services = services_config.get_enabled_services()
+        retired = []
+        for name in list(self._clients):
+            if name == DEFAULT_CLIENT_NAME:
+                continue
+            service = services.get(name)
+            if service is None or _client_settings(service) != self._settings.get(name):
+                retired.append(self._clients.pop(name))
+                self._transports.pop(name, None)
+                self._settings.pop(name, None)
+
+        for name, service in services.items():
+            if name not in self._clients:
+                self._create_client(name, service)
+
+        for client in retired:
+            idle = asyncio.Event()
+            if not self._in_flight.get(client):
+                idle.set()
+            self._retired[client] = idle
+            task = asyncio.create_task(self._close_when_idle(client, idle))
+            self._close_tasks.add(task)
+            task.add_done_callback(self._close_tasks.discard)
+
+    async def aclose(self):
+        """关闭所有客户端，释放连接"""
+        for task in list(self._close_tasks):
+            task.cancel()
+        for client in self._retired:
+            await client.aclose()
+        self._retired.clear()
+        self._in_flight.clear()
+
+        for name, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"关闭 {name} 连接池失败: {e}")
+
+        self._clients.clear()
+        self._transports.clear()
+        logger.info("🔌 上游连接池已关闭")
+
+    def get_client(self, service_name: str) -> httpx.AsyncClient:
+        """获取服务对应的客户端
+
+        未注册的服务使用共享的默认客户端（按需创建）
+
+        Args:
+            service_name: 服务名称
+
+        Returns:
+            httpx.AsyncClient: 长连接客户端
+        """
+        client = self._clients.get(service_name)
+        if client is None:
+            client = self._clients.get(DEFAULT_CLIENT_NAME)
+            if client is None:
+                client = self._create_client(DEFAULT_CLIENT_NAME)
+        return client
+
+    @asynccontextmanager
+    async def track(self, service_name: str, client: httpx.AsyncClient) -> AsyncIterator[None]:
+        """统计一次上游调用的并发占用，调用结束前重新加载配置也不会关闭其使用的客户端
+
+        Args:
+            service_name: 服务名称
+            client: 本次调用使用的客户端（get_client 的返回值）
+        """
+        key = service_name if service_name in self._clients else DEFAULT_CLIENT_NAME
+        stats = self._stats.setdefault(key, PoolStats())
+        stats.total_requests += 1
+        stats.in_flight += 1
+        if stats.in_flight > stats.peak_in_flight:
+            stats.peak_in_flight = stats.in_flight
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            yield
+        finally:
+            stats.in_flight -= 1
+            remaining = self._in_flight.get(client, 1) - 1
+            if remaining > 0:
+                self._in_flight[client] = remaining
+            else:
+                self._in_flight.pop(client, None)
+                idle = self._retired.get(client)
+                if idle is not None:
+                    idle.set()
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取各连接池使用情况
+
+        Returns:
+            Dict[str, dict]: 服务名称 -> 计数与连接状态
+        """
+        result = {}
+        for name, stats in self._stats.items():
+            result[name] = {**asdict(stats), **self._pool_state(name)}
+        for name in self._clients:
+            if name not in result:
+                result[name] = {**asdict(PoolStats()), **self._pool_state(name)}
+        return result
+
+    async def _close_when_idle(self, client: httpx.AsyncClient, idle: asyncio.Event):
+        """等待旧客户端上进行中的调用全部结束后关闭"""
+        await idle.wait()
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"关闭旧连接池失败: {e}")
+        self._retired.pop(client, None)
+
+    def _create_client(self, name: str, service: Optional[ServiceItem] = None) -> httpx.AsyncClient:
+        """创建带连接池限制的客户端
+
+        Args:
+            name: 服务名称
+            service: 服务配置，为 None 时使用默认连接池配置与 HTTP/1.1
+        """
+        if service is None:
+            settings = (PoolConfig(), "http1", ())
+            options = {"http1": True, "http2": False}
+        else:
+            settings = _client_settings(service)
+            options = service.transport_options()
+        pool, protocol, sockets = settings
+        limits = httpx.Limits(
+            max_connections=pool.max_connections,
+            max_keepalive_connections=pool.max_keepalive_connections,
+            keepalive_expiry=pool.keepalive_expiry
+        )
+        transport = httpx.AsyncHTTPTransport(limits=limits, **options)
+        # 每个 Unix 套接字一个传输层（连接池按套接字独立计算）
+        mounts = {
+            f"http://{_socket_host(path)}": httpx.AsyncHTTPTransport(limits=limits, uds=path, **options)
+            for path in sockets
+        }
+        client = httpx.AsyncClient(timeout=config.TIMEOUT, transport=transport, mounts=mounts)
+
+        self._clients[name] = client
+        self._transports[name] = [transport, *mounts.values()]
+        self._settings[name] = settings
+        self._stats.setdefault(name, PoolStats())
+        if protocol != "http1" or sockets:
+            logger.info(f"🔌 {name} 上游传输: {protocol}, Unix 套接字: {list(sockets)}")
+        return client
+
+    def _pool_state(self, name: str) -> dict:
+        """读取 httpcore 连接池中的连接状态（尽力而为，多个传输层时合计）"""
+        pools = [
+            pool for pool in (getattr(transport, "_pool", None) for transport in self._transports.get(name, []))
+            if pool is not None
+        ]
+        if not pools:
+            return {}
+
+        connections = [conn for pool in pools for conn in getattr(pool, "connections", [])]
+        idle = sum(1 for conn in connections if conn.is_idle())
+        queued = sum(
+            1 for pool in pools for req in getattr(pool, "_requests", [])
+            if getattr(req, "connection", None) is None
+        )
+        return {
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "queued_requests": queued,
+            "max_connections": getattr(pools[0], "_max_connections", None)
+        }
+
+
+# 全局客户端注册表
+client_registry = ClientRegistry()
@@ -0,0 +1,438 @@
+"""
+异步任务
+
+配置了 async_job 的路由不再让客户端在整个上游调用期间占用连接：
+- 网关读取请求后立即返回 202 与任务 ID，上游调用交给有界的后台 worker 池执行
+- 结果（状态码、内容类型、响应体）保存在带 TTL 的存储中，客户端轮询或长轮询状态接口获取
+- 存储可替换：memory（进程内，有条目数与字节数上限）或 sqlite:///path（同一主机的多个 worker 共享，
+  任务提交到哪个 worker 都可以从任一 worker 查询）
+"""
+
+import asyncio
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Response, status
+
+from src.config import config
+from src.models.service_config import RouteItem
+from src.utils.json_codec import FastJSONResponse, json_codec
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+# 未结束的任务在存储中的保留时间（秒），防止异常退出的 worker 留下的任务永久占用存储
+PENDING_TTL = 24 * 3600
+# 共享存储中等待其他 worker 执行的任务时的轮询间隔（秒）
+POLL_INTERVAL = 0.25
+# 存储每写入多少次清理一次过期任务
+SWEEP_INTERVAL = 256
+
+# 后台执行的上游调用
+JobRunner = Callable[[], Awaitable[Response]]
+
+
+@dataclass
+class Job:
+    """异步任务状态与结果"""
+
+    id: str
+    service: str
+    route: str
+    method: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: float = 0.0
+    result_status: Optional[int] = None
+    result_type: Optional[str] = None
+    result_body: Optional[bytes] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if not self.expires_at:
+            self.expires_at = self.created_at + PENDING_TTL
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def meta(self) -> dict:
+        """除响应体外的字段（共享存储中以 JSON 保存）"""
+        data = asdict(self)
+        del data["result_body"]
+        return data
+
+    def to_dict(self) -> dict:
+        """状态接口返回的任务描述"""
+        data = self.meta()
+        del data["result_type"]
+        data["job_id"] = data.pop("id")
+        data["status_url"] = f"/gateway/jobs/{self.id}"
+        data["result_url"] = f"/gateway/jobs/{self.id}/result"
+        return data
+
+
+class JobStore(ABC):
+    """任务存储接口"""
+
+    @abstractmethod
+    async def put(self, job: Job):
+        """保存任务（覆盖同 ID 的旧状态）"""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        """读取未过期的任务，不存在时返回 None"""
+
+    async def aclose(self):
+        """释放存储资源"""
+
+
+class MemoryJobStore(JobStore):
+    """进程内任务存储（仅当前 worker 可见）
+
+    超过条目数或字节数上限时按结束时间淘汰最早结束的任务；未结束的任务不淘汰
+    （其数量受队列容量与 worker 数限制）
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._jobs: Dict[str, Job] = {}
+        # 已结束的任务，按结束先后排列
+        self._finished: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+        self.evictions = 0
+
+    async def put(self, job: Job):
+        self._jobs[job.id] = job
+        self._writes += 1
+        if self._writes % SWEEP_INTERVAL == 0:
+            self._sweep(time.time())
+        if job.finished and job.id not in self._finished:
+            size = len(job.result_body or b"")
+            self._finished[job.id] = size
+            self._bytes += size
+            self._evict()
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.expires_at <= time.time():
+            self._remove(job_id)
+            return None
+        return job
+
+    def _sweep(self, now: float):
+        """清理过期任务"""
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.expires_at <= now]:
+            self._remove(job_id)
+
+    def _evict(self):
+        """超出上限时淘汰最早结束的任务"""
+        while self._finished and (len(self._jobs) > self.max_entries or self._bytes > self.max_bytes):
+            job_id = next(iter(self._finished))
+            self._remove(job_id)
+            self.evictions += 1
+
+    def _remove(self, job_id: str):
+        self._jobs.pop(job_id, None)
+        self._bytes -= self._finished.pop(job_id, 0)
+
+
+class SqliteJobStore(JobStore):
+    """SQLite 任务存储，同一主机上的多个 worker 共享同一数据库文件
+
+    数据库调用在线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 数据库文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, meta TEXT NOT NULL, body BLOB, expires_at REAL NOT NULL)"
+        )
+
+    async def put(self, job: Job):
+        await asyncio.to_thread(self._put, job)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def aclose(self):
+        with self._lock:
+            self._conn.close()
+
+    def _put(self, job: Job):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, meta, body, expires_at) VALUES (?, ?, ?, ?)",
+                (job.id, json.dumps(job.meta()), job.result_body, job.expires_at)
+            )
+            self._writes += 1
+            if self._writes % SWEEP_INTERVAL == 0:
+                self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),))
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT meta, body FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(**json.loads(row[0]), result_body=row[1])
+
+
+def create_store(url: str) -> JobStore:
+    """根据 JOB_STORE 创建任务存储
+
+    Args:
+        url: memory 或 sqlite:///path
+
+    Returns:
+        JobStore: 任务存储
+
+    Raises:
+        ValueError: 不支持的存储类型
+    """
+    if url == "memory":
+        return MemoryJobStore(config.JOB_MAX_RESULTS, config.JOB_MAX_RESULT_BYTES)
+    if url.startswith("sqlite://"):
+        return SqliteJobStore(url[len("sqlite://"):])
+    raise ValueError(f"不支持的任务存储: {url}")
+
+
+@dataclass
+class JobStats:
+    """异步任务计数"""
+
+    submitted: int = 0
+    rejected: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    running: int = 0
+
+
+class JobManager:
+    """异步任务管理器：有界队列 + 固定数量的后台 worker"""
+
+    def __init__(self):
+        self.store: JobStore = MemoryJobStore(config.JOB_MAX_RESULTS, config.JOB_MAX_RESULT_BYTES)
+        self.stats = JobStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # 当前进程中未结束任务的完成事件（长轮询使用）
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def start(self, store_url: str, workers: int, queue_size: int):
+        """创建任务存储并启动后台 worker
+
+        Args:
+            store_url: 存储地址，见 create_store
+            workers: 并发执行的任务数
+            queue_size: 排队任务上限
+        """
+        self.store = create_store(store_url)
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        logger.info(f"异步任务: {workers} 个 worker，队列上限 {queue_size}，存储 {store_url}")
+
+    async def stop(self):
+        """停止 worker，未执行完的任务标记为失败"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                job, _, ttl = self._queue.get_nowait()
+                await self._finish(job, ttl, status.HTTP_503_SERVICE_UNAVAILABLE, {"error": "网关已停止，任务未执行"})
+        await self.store.aclose()
+
+    async def submit(self, service_name: str, route: RouteItem, run: JobRunner) -> Response:
+        """提交任务
+
+        Args:
+            service_name: 服务名称
+            route: 路由配置（需配置 async_job）
+            run: 在后台执行的上游调用
+
+        Returns:
+            Response: 202 与任务描述，Location 指向状态接口
+
+        Raises:
+            HTTPException: 未启动或队列已满（503）
+        """
+        if self._queue is None or self._queue.full():
+            self.stats.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="异步任务队列已满，请稍后重试",
+                headers={"Retry-After": "1"}
+            )
+
+        # 任务 ID 即查询凭据，使用不可预测的随机值
+        job = Job(secrets.token_hex(16), service_name, route.path, route.method)
+        await self.store.put(job)
+        self._events[job.id] = asyncio.Event()
+        self._queue.put_nowait((job, run, route.async_job.result_ttl))
+        self.stats.submitted += 1
+
+        return _status_response(job, status.HTTP_202_ACCEPTED)
+
+    async def get(self, job_id: str, wait: float = 0.0) -> Optional[Job]:
+        """查询任务，wait > 0 时长轮询等待任务结束
+
+        Args:
+            job_id: 任务 ID
+            wait: 最长等待时间（秒），不超过 JOB_LONG_POLL_MAX
+
+        Returns:
+            Optional[Job]: 任务（等待超时时为未结束的状态），不存在或已过期时为 None
+        """
+        job = await self.store.get(job_id)
+        wait = min(wait, config.JOB_LONG_POLL_MAX)
+        if job is None or job.finished or wait <= 0:
+            return job
+
+        deadline = time.monotonic() + wait
+        event = self._events.get(job_id)
+        if event is not None:
+            # 任务在当前进程执行，等待完成事件
+            try:
+                await asyncio.wait_for(event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            return await self.store.get(job_id)
+
+        # 任务由其他 worker 执行（共享存储），定期重新读取
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            await asyncio.sleep(min(POLL_INTERVAL, remaining))
+            job = await self.store.get(job_id)
+            if job is None or job.finished:
+                return job
+
+    def get_stats(self) -> dict:
+        """异步任务统计"""
+        stats = {
+            **asdict(self.stats),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._workers),
+            "store": type(self.store).__name__
+        }
+        if isinstance(self.store, MemoryJobStore):
+            stats["evictions"] = self.store.evictions
+        return stats
+
+    async def _worker(self):
+        """从队列取出任务并执行"""
+        while True:
+            job, run, ttl = await self._queue.get()
+            try:
+                await self._run(job, run, ttl)
+            except Exception as e:
+                logger.error(f"异步任务 {job.id} 保存结果失败: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job, run: JobRunner, ttl: float):
+        """执行一个任务并保存结果"""
+        job.status = RUNNING
+        job.started_at = time.time()
+        await self.store.put(job)
+        self.stats.running += 1
+        try:
+            response = await run()
+        except HTTPException as e:
+            await self._finish(job, ttl, e.status_code, {"error": e.detail})
+        except asyncio.CancelledError:
+            await self._finish(job, ttl, status.HTTP_503_SERVICE_UNAVAILABLE, {"error": "网关已停止，任务未完成"})
+            raise
+        except Exception as e:
+            logger.error(f"异步任务 {job.id} 执行失败: {e}", exc_info=True)
+            await self._finish(job, ttl, status.HTTP_500_INTERNAL_SERVER_ERROR, {"error": "内部服务错误"})
+        else:
+            job.status = SUCCEEDED
+            job.result_status = response.status_code
+            job.result_type = response.headers.get("content-type")
+            job.result_body = response.body
+            await self._finish(job, ttl)
+        finally:
+            self.stats.running -= 1
+
+    async def _finish(self, job: Job, ttl: float, error_status: Optional[int] = None, error: Optional[dict] = None):
+        """标记任务结束、保存结果并唤醒长轮询"""
+        if error_status is not None:
+            job.status = FAILED
+            job.result_status = error_status
+            job.result_type = "application/json"
+            job.result_body = json_codec.dumps(error)
+        if job.status == SUCCEEDED:
+            self.stats.succeeded += 1
+        else:
+            self.stats.failed += 1
+        job.finished_at = time.time()
+        job.expires_at = job.finished_at + ttl
+        try:
+            await self.store.put(job)
+        finally:
+            event = self._events.pop(job.id, None)
+            if event is not None:
+                event.set()
+
+
+def _status_response(job: Job, status_code: int) -> Response:
+    """任务描述响应，未结束时附带 Retry-After 建议轮询间隔"""
+    headers = {"Location": f"/gateway/jobs/{job.id}"}
+    if not job.finished:
+        headers["Retry-After"] = "1"
+    return FastJSONResponse(job.to_dict(), status_code=status_code, headers=headers)
+
+
+def job_status_response(job: Job) -> Response:
+    """状态接口响应"""
+    return _status_response(job, status.HTTP_200_OK)
+
+
+def job_result_response(job: Job) -> Response:
+    """结果接口响应：已结束返回上游响应（状态码、内容类型与响应体原样），未结束返回 202 与任务描述"""
+    if not job.finished:
+        return _status_response(job, status.HTTP_202_ACCEPTED)
+    return Response(
+        content=job.result_body or b"",
+        status_code=job.result_status,
+        media_type=job.result_type,
+        headers={"X-Job-ID": job.id, "X-Job-Status": job.status}
+    )
+
+
+# 全局异步任务管理器
+job_manager = JobManager()
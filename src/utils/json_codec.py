@@ -0,0 +1,158 @@
+"""
+JSON 编解码
+
+- 上游返回 JSON 时原样转发响应字节，不解析也不重新序列化
+- 网关自行构建的 JSON（错误响应、管理接口、非 JSON 上游响应的包装等）使用可替换的编解码器：
+  默认 orjson（已安装时），否则回退到标准库 json
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from src.config import config
+from src.utils.logger import setup_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+logger = setup_logger()
+
+
+class JSONCodec:
+    """JSON 编解码器"""
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+        """
+        Args:
+            name: 名称
+            dumps: 序列化为 UTF-8 字节（紧凑格式、不转义非 ASCII 字符）
+            loads: 解析字节或字符串，格式错误时抛出 ValueError
+        """
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+
+def _stdlib_dumps(content: Any) -> bytes:
+    """与 Starlette JSONResponse 相同的输出格式"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+STDLIB_CODEC = JSONCodec("stdlib", _stdlib_dumps, json.loads)
+
+CODECS: Dict[str, JSONCodec] = {"stdlib": STDLIB_CODEC}
+
+if orjson is not None:
+    def _orjson_dumps(content: Any) -> bytes:
+        """orjson 不支持的类型（如超过 64 位的整数）回退到标准库"""
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return _stdlib_dumps(content)
+
+    CODECS["orjson"] = JSONCodec("orjson", _orjson_dumps, orjson.loads)
+
+
+def create_codec(name: str) -> JSONCodec:
+    """根据 JSON_CODEC 选择编解码器
+
+    Args:
+        name: auto（orjson 可用时使用 orjson）、orjson 或 stdlib
+
+    Returns:
+        JSONCodec: 编解码器
+
+    Raises:
+        ValueError: 不支持或未安装的编解码器
+    """
+    if name == "auto":
+        return CODECS.get("orjson", STDLIB_CODEC)
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"不支持或未安装的 JSON 编解码器: {name}")
+    return codec
+
+
+# 当前编解码器
+json_codec = create_codec(config.JSON_CODEC)
+
+
+class FastJSONResponse(JSONResponse):
+    """使用当前编解码器序列化的 JSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps(content)
+
+
+def is_json(content_type: Optional[str]) -> bool:
+    """内容类型是否为 JSON（application/json 或 +json 后缀）"""
+    if not content_type:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type == "application/json" or media_type.endswith("+json")
+
+
+# 随原样转发的响应体一起转发的上游校验器
+VALIDATOR_HEADERS = ("etag", "last-modified")
+
+# httpx 响应扩展中保存上游原始（未解压）响应体的键，见 upstream 模块
+RAW_CONTENT = "gateway.raw_content"
+
+
+def upstream_response(response: httpx.Response) -> Response:
+    """由上游响应构建网关响应
+
+    JSON 响应原样转发字节及其 ETag、Last-Modified，上游已按客户端接受的编码压缩时
+    连同 Content-Encoding 一起转发压缩后的字节；其他响应沿用原先的处理：内容可解析为 JSON 时按 JSON 返回，
+    否则包装为 {"data": 文本}（响应体已改变，不转发上游校验器）。
+    条件请求的 304 响应只保留校验器
+
+    Args:
+        response: 上游响应（响应体已读取）
+
+    Returns:
+        Response: 网关响应
+    """
+    content_type = response.headers.get("content-type")
+    validators = {name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers}
+    if response.status_code == 304:
+        return Response(status_code=304, headers=validators)
+    raw_content = response.extensions.get(RAW_CONTENT)
+    if raw_content is not None:
+        headers = {
+            **validators,
+            "content-encoding": response.headers["content-encoding"],
+            "vary": "Accept-Encoding"
+        }
+        return Response(
+            content=raw_content,
+            status_code=response.status_code,
+            headers=headers,
+            media_type=content_type
+        )
+    if is_json(content_type):
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            headers=validators,
+            media_type=content_type
+        )
+
+    try:
+        content = json_codec.loads(response.content)
+    except ValueError:
+        # 如果响应不是 JSON，返回原始文本
+        return FastJSONResponse(content={"data": response.text}, status_code=response.status_code)
+    return FastJSONResponse(content=content, status_code=response.status_code)
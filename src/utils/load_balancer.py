@@ -0,0 +1,196 @@
+"""
+上游负载均衡
+
+为多实例服务选择上游实例，支持轮询、加权轮询、最少并发与基于延迟的 P2C 策略，
+各实例的并发数与延迟统计保存在内存中
+"""
+
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Collection, Dict, List, Optional
+
+from src.models.service_config import EndpointConfig, ServicesConfig
+from src.utils.http_client import upstream_base_url
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# 延迟指数加权移动平均的平滑系数
+LATENCY_EWMA_ALPHA = 0.3
+
+
+class EndpointState:
+    """单个上游实例的运行状态"""
+
+    def __init__(self, endpoint: EndpointConfig):
+        self.url = endpoint.url
+        # 拼接后端路径用的地址（unix:// 实例映射为合成主机名）
+        self.base_url = upstream_base_url(endpoint.url)
+        self.weight = endpoint.weight
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.ewma_latency = 0.0
+        # 平滑加权轮询的当前权重
+        self.current_weight = 0
+
+    def record(self, latency: float, failed: bool):
+        """记录一次调用结果"""
+        self.requests += 1
+        if failed:
+            self.failures += 1
+        if self.ewma_latency == 0.0:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += LATENCY_EWMA_ALPHA * (latency - self.ewma_latency)
+
+    def to_dict(self) -> dict:
+        """导出统计"""
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 3)
+        }
+
+
+class LoadBalancer:
+    """单个服务的负载均衡器"""
+
+    def __init__(self, service_name: str, endpoints: List[EndpointConfig], strategy: str):
+        """
+        Args:
+            service_name: 服务名称
+            endpoints: 上游实例配置
+            strategy: 负载均衡策略
+        """
+        self.service_name = service_name
+        self.strategy = strategy
+        self.endpoints = [EndpointState(endpoint) for endpoint in endpoints]
+        self._rr_index = 0
+
+    def matches(self, endpoints: List[EndpointConfig], strategy: str) -> bool:
+        """实例列表与策略是否与给定配置一致"""
+        return strategy == self.strategy and [
+            (ep.url, ep.weight) for ep in self.endpoints
+        ] == [(ep.url, ep.weight) for ep in endpoints]
+
+    def select(self, exclude: Collection[str] = ()) -> Optional[EndpointState]:
+        """选择一个上游实例
+
+        Args:
+            exclude: 需要跳过的实例 URL
+
+        Returns:
+            Optional[EndpointState]: 选中的实例，没有可用实例时返回 None
+        """
+        candidates = [ep for ep in self.endpoints if ep.url not in exclude]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.strategy == "weighted":
+            return self._select_weighted(candidates)
+        if self.strategy == "least_outstanding":
+            return self._select_least_outstanding(candidates)
+        if self.strategy == "p2c":
+            return self._select_p2c(candidates)
+        return self._select_round_robin(candidates)
+
+    @asynccontextmanager
+    async def track(self, endpoint: EndpointState) -> AsyncIterator[None]:
+        """统计一次上游调用的并发与延迟
+
+        Args:
+            endpoint: 被调用的实例
+        """
+        endpoint.in_flight += 1
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            endpoint.in_flight -= 1
+            endpoint.record(time.perf_counter() - start, failed)
+
+    def get_stats(self) -> dict:
+        """获取均衡器统计"""
+        return {
+            "strategy": self.strategy,
+            "endpoints": [ep.to_dict() for ep in self.endpoints]
+        }
+
+    def _select_round_robin(self, candidates: List[EndpointState]) -> EndpointState:
+        """轮询"""
+        endpoint = candidates[self._rr_index % len(candidates)]
+        self._rr_index += 1
+        return endpoint
+
+    @staticmethod
+    def _select_weighted(candidates: List[EndpointState]) -> EndpointState:
+        """平滑加权轮询（与 nginx 相同的算法，避免连续命中同一实例）"""
+        total = 0
+        best = candidates[0]
+        for ep in candidates:
+            ep.current_weight += ep.weight
+            total += ep.weight
+            if ep.current_weight > best.current_weight:
+                best = ep
+        best.current_weight -= total
+        return best
+
+    def _select_least_outstanding(self, candidates: List[EndpointState]) -> EndpointState:
+        """最少进行中请求，并发相同时轮询"""
+        lowest = min(ep.in_flight for ep in candidates)
+        return self._select_round_robin([ep for ep in candidates if ep.in_flight == lowest])
+
+    @staticmethod
+    def _select_p2c(candidates: List[EndpointState]) -> EndpointState:
+        """随机取两个实例，选择延迟 ×（并发 + 1）较小者"""
+        first, second = random.sample(candidates, 2)
+
+        def cost(ep: EndpointState) -> float:
+            return ep.ewma_latency * (ep.in_flight + 1)
+
+        return first if cost(first) <= cost(second) else second
+
+
+class BalancerRegistry:
+    """负载均衡器注册表"""
+
+    def __init__(self):
+        self._balancers: Dict[str, LoadBalancer] = {}
+
+    def configure(self, services_config: ServicesConfig):
+        """为所有启用的服务创建负载均衡器
+
+        重新加载配置时，实例与策略未变化的服务保留原均衡器及其延迟、并发统计
+
+        Args:
+            services_config: 服务配置
+        """
+        balancers = {}
+        for name, service in services_config.get_enabled_services().items():
+            current = self._balancers.get(name)
+            if current is not None and current.matches(service.endpoints, service.load_balancer):
+                balancers[name] = current
+            else:
+                balancers[name] = LoadBalancer(name, service.endpoints, service.load_balancer)
+        self._balancers = balancers
+
+    def get(self, service_name: str) -> Optional[LoadBalancer]:
+        """获取服务的负载均衡器"""
+        return self._balancers.get(service_name)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取所有负载均衡器的统计"""
+        return {name: balancer.get_stats() for name, balancer in self._balancers.items()}
+
+
+# 全局负载均衡器注册表
+balancer_registry = BalancerRegistry()
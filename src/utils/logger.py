@@ -1,11 +1,138 @@
 """
 日志工具
 
-配置统一格式的日志记录器
+配置统一格式的日志记录器：
+- 日志记录只放入内存队列，由后台线程格式化并批量写入 stdout，事件循环不会被 stdout 写入阻塞
+- 默认输出 JSON（每行一条），LOG_FORMAT=text 时使用原先的文本格式
+- 队列满时丢弃新记录并计数，而不是阻塞请求处理
 """
 
-import sys
+import json
 import logging
+import queue
+import sys
+import threading
+import time
+from typing import List, Optional, TextIO
+
+from src.config import config
+
+# 文本格式
+TEXT_FORMAT = '[%(asctime)s] [%(levelname)s] %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 后台线程单次最多合并写入的记录数
+BATCH_SIZE = 512
+
+# 队列中的停止标记
+_STOP = object()
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON 格式：固定字段加上 extra={"fields": {...}} 传入的结构化字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                    + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class AsyncLogHandler(logging.Handler):
+    """队列日志处理器
+
+    emit 只把记录放入队列；格式化（包括 % 参数拼接与异常堆栈）和写入都在后台线程中完成。
+    记录在写出前不会被复制，日志参数应为不可变值
+    """
+
+    def __init__(self, stream: TextIO, formatter: logging.Formatter, maxsize: int):
+        """
+        Args:
+            stream: 输出流
+            formatter: 格式化器
+            maxsize: 队列容量
+        """
+        super().__init__()
+        self.stream = stream
+        self.setFormatter(formatter)
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """写出队列中剩余的记录后停止后台线程"""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=1.0)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=5.0)
+        super().close()
+
+    def _run(self):
+        """后台线程：批量取出记录，格式化后一次写入"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines: List[str] = []
+            stop = False
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                    continue
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+
+_handler: Optional[AsyncLogHandler] = None
+
+
+def _get_handler() -> AsyncLogHandler:
+    """所有网关日志记录器共享的队列处理器"""
+    global _handler
+    if _handler is None:
+        if config.LOG_FORMAT == "text":
+            formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+        else:
+            formatter = JsonFormatter()
+        _handler = AsyncLogHandler(sys.stdout, formatter, config.LOG_QUEUE_SIZE)
+    return _handler
+
+
+def dropped_records() -> int:
+    """队列满时被丢弃的日志记录数"""
+    return _handler.dropped if _handler is not None else 0
 
 
 def setup_logger(name: str = "gateway", level: str = "INFO") -> logging.Logger:
@@ -25,14 +152,7 @@ def setup_logger(name: str = "gateway", level: str = "INFO") -> logging.Logger:
     if logger.handlers:
         return logger
 
-    # 文本格式（输出到 stdout，Docker 自动收集）
-    formatter = logging.Formatter(
-        '[%(asctime)s] [%(levelname)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    # 输出到 stdout（Docker 自动收集），写入由后台线程完成
+    logger.addHandler(_get_handler())
 
     return logger
@@ -0,0 +1,364 @@
+"""
+请求体记忆化
+
+同一输入总是得到同一结果的 POST 接口（如新闻分析）按请求体哈希复用已保存的响应：
+- 键由方法、后端路径、排序后的查询参数与规范化 JSON 请求体（键排序、紧凑格式）的 SHA-256 组成，
+  字段顺序与空白不同的相同请求命中同一结果
+- 内存层为 LRU，按条目数与字节数双重限额；MEMOIZE_STORE 为 sqlite:///path 时另有磁盘层，
+  重启后保留、同一主机的多个 worker 共享，按路由限制占用字节数
+- 键相同的并发请求共享同一次上游调用，只保存 2xx 响应
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Response
+
+from src.models.service_config import MemoizeConfig
+from src.utils.logger import setup_logger
+from src.utils.response_cache import ResponseLoader, build_cache_key
+from src.utils.single_flight import SingleFlight, copy_response
+
+logger = setup_logger()
+
+# 磁盘层每写入多少次清理一次过期结果
+SWEEP_INTERVAL = 256
+
+
+def memo_key(
+    method: str,
+    path: str,
+    query_items: Iterable[Tuple[str, str]],
+    body: Any
+) -> str:
+    """构建记忆化键
+
+    Args:
+        method: HTTP 方法
+        path: 服务名与后端路径
+        query_items: 查询参数键值对
+        body: 解析后的 JSON 请求体
+
+    Returns:
+        str: 记忆化键
+    """
+    canonical = json.dumps(
+        body, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
+    digest = hashlib.sha256(canonical).hexdigest()
+    return f"{build_cache_key(method, path, query_items)}#{digest}"
+
+
+@dataclass
+class MemoEntry:
+    """已保存的响应"""
+
+    body: bytes
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        """条目占用字节数（近似）"""
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+
+@dataclass
+class MemoStats:
+    """记忆化计数"""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    bytes_saved: int = 0
+    disk_errors: int = 0
+
+
+class MemoDiskStore:
+    """SQLite 磁盘层，所有记忆化路由共用同一数据库文件
+
+    数据库调用在线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 数据库文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memo ("
+            "name TEXT NOT NULL, key TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL, "
+            "body BLOB NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (name, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memo_stored_at ON memo (name, stored_at)")
+
+    async def get(self, name: str, key: str) -> Optional[MemoEntry]:
+        return await asyncio.to_thread(self._get, name, key)
+
+    async def put(self, name: str, key: str, entry: MemoEntry, max_bytes: int):
+        await asyncio.to_thread(self._put, name, key, entry, max_bytes)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, name: str, key: str) -> Optional[MemoEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, expires_at FROM memo WHERE name = ? AND key = ? AND expires_at > ?",
+                (name, key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in json.loads(row[1])]
+        return MemoEntry(body=row[2], status_code=row[0], headers=headers, expires_at=row[3])
+
+    def _put(self, name: str, key: str, entry: MemoEntry, max_bytes: int):
+        """写入结果，该路由占用超出 max_bytes 时删除最早写入的结果"""
+        headers = json.dumps([[k.decode("latin-1"), v.decode("latin-1")] for k, v in entry.headers])
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO memo (name, key, status, headers, body, size, stored_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, key, entry.status_code, headers, entry.body, entry.size, now, entry.expires_at)
+                )
+                self._writes += 1
+                if self._writes % SWEEP_INTERVAL == 0:
+                    self._conn.execute("DELETE FROM memo WHERE expires_at <= ?", (now,))
+
+                total = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM memo WHERE name = ?", (name,)
+                ).fetchone()[0]
+                if total > max_bytes:
+                    excess = total - max_bytes
+                    evicted = []
+                    for old_key, size in self._conn.execute(
+                        "SELECT key, size FROM memo WHERE name = ? ORDER BY stored_at", (name,)
+                    ):
+                        evicted.append((name, old_key))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    self._conn.executemany("DELETE FROM memo WHERE name = ? AND key = ?", evicted)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+class Memoizer:
+    """单个路由的请求体记忆化"""
+
+    def __init__(self, name: str, memo_config: MemoizeConfig, disk: Optional[MemoDiskStore] = None):
+        """
+        Args:
+            name: 名称（用于统计与磁盘层分区）
+            memo_config: 记忆化配置
+            disk: 磁盘层，为空时只使用内存层
+        """
+        self.name = name
+        self.config = memo_config
+        self.disk = disk
+        self.stats = MemoStats()
+        self._entries: "OrderedDict[str, MemoEntry]" = OrderedDict()
+        self._bytes = 0
+        self._flight: SingleFlight[Response] = SingleFlight(name, share=copy_response)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def fetch(self, key: str, loader: ResponseLoader) -> Response:
+        """读取已保存的响应，未命中时调用 loader 回源（键相同的并发请求只回源一次）
+
+        Args:
+            key: 记忆化键，见 memo_key
+            loader: 回源函数
+
+        Returns:
+            Response: 响应（带 X-Cache 头标识命中状态）
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.stats.memory_hits += 1
+                self.stats.bytes_saved += len(entry.body)
+                return self._to_response(entry, "HIT")
+            self._remove(key)
+
+        coalesced = self._flight.is_running(key)
+        response = await self._flight.do(key, lambda: self._load(key, loader))
+        if coalesced:
+            self.stats.coalesced += 1
+            self.stats.bytes_saved += len(response.body)
+        return response
+
+    def clear(self):
+        """清空内存层"""
+        self._entries.clear()
+        self._bytes = 0
+
+    async def aclose(self):
+        """等待未完成的磁盘写入"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """获取记忆化统计"""
+        hits = self.stats.memory_hits + self.stats.disk_hits + self.stats.coalesced
+        lookups = hits + self.stats.misses
+        return {
+            **asdict(self.stats),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "in_flight": self._flight.in_flight,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.config.max_entries,
+            "max_bytes": self.config.max_bytes,
+            "disk": self.disk is not None
+        }
+
+    async def _load(self, key: str, loader: ResponseLoader) -> Response:
+        """依次查询磁盘层与上游，结果写入内存层（回源结果另在后台写入磁盘层）"""
+        if self.disk is not None:
+            try:
+                entry = await self.disk.get(self.name, key)
+            except sqlite3.Error as e:
+                self.stats.disk_errors += 1
+                logger.warning(f"记忆化 {self.name} 读取磁盘层失败: {e}")
+                entry = None
+            if entry is not None:
+                self.stats.disk_hits += 1
+                self.stats.bytes_saved += len(entry.body)
+                self._store(key, entry)
+                return self._to_response(entry, "HIT")
+
+        self.stats.misses += 1
+        response = await loader()
+        if 200 <= response.status_code < 300:
+            entry = MemoEntry(
+                body=bytes(response.body),
+                status_code=response.status_code,
+                headers=list(response.raw_headers),
+                expires_at=time.time() + self.config.ttl
+            )
+            self._store(key, entry)
+            if self.disk is not None:
+                task = asyncio.create_task(self._persist(key, entry))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    async def _persist(self, key: str, entry: MemoEntry):
+        """后台写入磁盘层"""
+        try:
+            await self.disk.put(self.name, key, entry, self.config.disk_max_bytes)
+        except sqlite3.Error as e:
+            self.stats.disk_errors += 1
+            logger.warning(f"记忆化 {self.name} 写入磁盘层失败: {e}")
+
+    def _store(self, key: str, entry: MemoEntry):
+        """写入内存层，必要时按 LRU 淘汰"""
+        if entry.size > self.config.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+        while (
+            len(self._entries) > self.config.max_entries
+            or self._bytes > self.config.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.stats.evictions += 1
+
+    def _remove(self, key: str):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+    @staticmethod
+    def _to_response(entry: MemoEntry, state: str) -> Response:
+        """由已保存的结果构建响应"""
+        response = Response(content=entry.body, status_code=entry.status_code)
+        response.raw_headers = list(entry.headers)
+        response.headers["X-Cache"] = state
+        return response
+
+
+class MemoRegistry:
+    """请求体记忆化注册表"""
+
+    def __init__(self):
+        self.disk: Optional[MemoDiskStore] = None
+        self._memoizers: Dict[str, Memoizer] = {}
+
+    def start(self, store_url: str):
+        """创建磁盘层
+
+        Args:
+            store_url: memory（只用内存层）或 sqlite:///path
+
+        Raises:
+            ValueError: 不支持的存储类型
+        """
+        if store_url == "memory":
+            self.disk = None
+        elif store_url.startswith("sqlite://"):
+            self.disk = MemoDiskStore(store_url[len("sqlite://"):])
+        else:
+            raise ValueError(f"不支持的记忆化存储: {store_url}")
+        # 已创建的记忆化器（启动前注册的路由）改用新的磁盘层
+        for memoizer in self._memoizers.values():
+            memoizer.disk = self.disk
+        logger.info(f"记忆化存储: {store_url}")
+
+    async def aclose(self):
+        """等待未完成的磁盘写入并关闭磁盘层"""
+        await asyncio.gather(*(memoizer.aclose() for memoizer in self._memoizers.values()))
+        if self.disk is not None:
+            self.disk.close()
+
+    def get_or_create(self, name: str, memo_config: MemoizeConfig) -> Memoizer:
+        """获取或创建路由的记忆化器，配置变化时重新创建（磁盘层中的结果仍可命中）
+
+        Args:
+            name: 名称
+            memo_config: 记忆化配置
+
+        Returns:
+            Memoizer: 记忆化器
+        """
+        memoizer = self._memoizers.get(name)
+        if memoizer is None or memoizer.config != memo_config:
+            memoizer = Memoizer(name, memo_config, self.disk)
+            self._memoizers[name] = memoizer
+        return memoizer
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取所有记忆化器的统计"""
+        return {name: memoizer.get_stats() for name, memoizer in self._memoizers.items()}
+
+
+# 全局记忆化注册表
+memo_registry = MemoRegistry()
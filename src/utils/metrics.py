@@ -0,0 +1,504 @@
+"""
+Prometheus 格式指标
+
+- 计数器、仪表与直方图按标签值预先绑定子指标，记录路径只有整数/浮点运算与一次二分查找
+- 每个配置路由在构建路由表时绑定一组子指标，请求处理时不再拼接标签
+- 多个 uvicorn worker 时，各 worker 定期把自己的指标快照写入 METRICS_DIR，
+  /metrics 合并所有 worker 的快照（计数器与直方图累加；仪表只累加存活 worker 的值）
+"""
+
+import asyncio
+import bisect
+import contextvars
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from src.utils.logger import dropped_records, setup_logger
+
+logger = setup_logger()
+
+# 请求耗时分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 请求/响应体大小分桶（字节）
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# 状态码分类标签，按 status_code // 100 索引（上游请求失败、没有状态码时为 error）
+STATUS_CLASSES = ("error", "1xx", "2xx", "3xx", "4xx", "5xx")
+
+LabelValues = Tuple[str, ...]
+
+
+class CounterChild:
+    """绑定了标签值的计数器"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class GaugeChild:
+    """绑定了标签值的仪表"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class HistogramChild:
+    """绑定了标签值的直方图"""
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # 最后一个元素对应 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """指标族：同一名称、不同标签值的子指标集合"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+
+    def labels(self, *values: str):
+        """获取（必要时创建）标签值对应的子指标，调用方应保存返回值复用"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def snapshot(self) -> Dict[LabelValues, list]:
+        """导出当前值：计数器/仪表为 [value]，直方图为 [各桶计数..., sum]"""
+        raise NotImplementedError
+
+    def clear(self):
+        """移除所有子指标（导出时由采集函数整体重建的指标使用）"""
+        self._children.clear()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def snapshot(self) -> Dict[LabelValues, list]:
+        return {labels: [child.value] for labels, child in self._children.items()}
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def snapshot(self) -> Dict[LabelValues, list]:
+        return {labels: [child.value] for labels, child in self._children.items()}
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def snapshot(self) -> Dict[LabelValues, list]:
+        return {labels: [*child.counts, child.sum] for labels, child in self._children.items()}
+
+
+class RequestTiming:
+    """单个请求的上游耗时累计（通过上下文变量传给转发逻辑）"""
+
+    __slots__ = ("upstream",)
+
+    def __init__(self):
+        self.upstream = 0.0
+
+
+_current_timing: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar(
+    "request_timing", default=None
+)
+
+
+def record_upstream_time(elapsed: float):
+    """累计当前请求等待上游的时间（用于计算网关自身开销）"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.upstream += elapsed
+
+
+class RouteMetrics:
+    """单个路由预先绑定的子指标"""
+
+    def __init__(self, registry: "MetricsRegistry", service: str, route: str, method: str):
+        base = (service, route, method)
+        self._registry = registry
+        self._base = base
+        # 按状态码分类的子指标在首次出现该分类时绑定，避免导出大量全零序列
+        self._requests: List[Optional[CounterChild]] = [None] * len(STATUS_CLASSES)
+        self._duration: List[Optional[HistogramChild]] = [None] * len(STATUS_CLASSES)
+        self._upstream = registry.upstream_phase_duration.labels(*base)
+        self._overhead = registry.gateway_overhead.labels(*base)
+        self._in_flight = registry.in_flight.labels(*base)
+        self._request_size = registry.request_size.labels(*base)
+        self._response_size = registry.response_size.labels(*base)
+
+    def start(self) -> Tuple[RequestTiming, contextvars.Token]:
+        """请求开始：计入进行中请求，并为转发逻辑提供上游耗时累计"""
+        self._in_flight.inc()
+        timing = RequestTiming()
+        return timing, _current_timing.set(timing)
+
+    def finish(
+        self,
+        timing: RequestTiming,
+        token: contextvars.Token,
+        status_code: int,
+        elapsed: float,
+        request_size: Optional[int],
+        response_size: Optional[int]
+    ):
+        """请求结束：记录状态、耗时与大小"""
+        _current_timing.reset(token)
+        self._in_flight.dec()
+        index = status_code // 100 if 0 < status_code < 600 else 0
+        if self._requests[index] is None:
+            self._bind_status(index)
+        self._requests[index].inc()
+        self._duration[index].observe(elapsed)
+        self._upstream.observe(timing.upstream)
+        self._overhead.observe(max(0.0, elapsed - timing.upstream))
+        if request_size is not None:
+            self._request_size.observe(request_size)
+        if response_size is not None:
+            self._response_size.observe(response_size)
+
+    def _bind_status(self, index: int):
+        """绑定某个状态码分类的子指标"""
+        status_class = STATUS_CLASSES[index]
+        self._requests[index] = self._registry.requests.labels(*self._base, status_class)
+        self._duration[index] = self._registry.request_duration.labels(*self._base, status_class)
+
+
+class ServiceMetrics:
+    """单个服务预先绑定的上游调用子指标"""
+
+    def __init__(self, registry: "MetricsRegistry", service: str):
+        self._registry = registry
+        self._service = service
+        self._attempts: List[Optional[CounterChild]] = [None] * len(STATUS_CLASSES)
+        self._latency = registry.upstream_duration.labels(service)
+        self._errors = {
+            kind: registry.upstream_errors.labels(service, kind)
+            for kind in ("timeout", "connect", "network", "5xx")
+        }
+
+    def record(self, status_code: Optional[int], error: Optional[BaseException], elapsed: float):
+        """记录一次上游调用
+
+        Args:
+            status_code: 上游状态码，请求失败时为 None
+            error: 请求异常
+            elapsed: 调用耗时（秒）
+        """
+        self._latency.observe(elapsed)
+        index = status_code // 100 if status_code is not None and 0 < status_code < 600 else 0
+        attempts = self._attempts[index]
+        if attempts is None:
+            attempts = self._attempts[index] = self._registry.upstream_requests.labels(
+                self._service, STATUS_CLASSES[index]
+            )
+        attempts.inc()
+
+        if status_code is None:
+            if isinstance(error, httpx.TimeoutException):
+                self._errors["timeout"].inc()
+            elif isinstance(error, httpx.ConnectError):
+                self._errors["connect"].inc()
+            else:
+                self._errors["network"].inc()
+            return
+        if status_code >= 500:
+            self._errors["5xx"].inc()
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        route_labels = ("service", "route", "method")
+        self.requests = Counter(
+            "gateway_requests_total", "网关处理的请求数", route_labels + ("status",)
+        )
+        self.request_duration = Histogram(
+            "gateway_request_duration_seconds", "网关请求总耗时", route_labels + ("status",)
+        )
+        self.upstream_phase_duration = Histogram(
+            "gateway_request_upstream_seconds", "单个请求等待上游的耗时（含重试）", route_labels
+        )
+        self.gateway_overhead = Histogram(
+            "gateway_request_overhead_seconds", "单个请求在网关自身的耗时（总耗时减去上游耗时）", route_labels
+        )
+        self.in_flight = Gauge("gateway_requests_in_flight", "进行中的请求数", route_labels)
+        self.request_size = Histogram(
+            "gateway_request_size_bytes", "请求体大小（按 Content-Length）", route_labels, SIZE_BUCKETS
+        )
+        self.response_size = Histogram(
+            "gateway_response_size_bytes", "响应体大小", route_labels, SIZE_BUCKETS
+        )
+        self.unmatched = Counter("gateway_unmatched_requests_total", "未匹配任何路由的请求数", ("status",))
+        self.upstream_requests = Counter(
+            "gateway_upstream_requests_total", "上游调用次数（含重试与对冲）", ("service", "status")
+        )
+        self.upstream_duration = Histogram(
+            "gateway_upstream_duration_seconds", "单次上游调用耗时", ("service",)
+        )
+        self.upstream_errors = Counter(
+            "gateway_upstream_errors_total", "上游调用错误数（timeout / connect / network / 5xx）",
+            ("service", "type")
+        )
+        self.concurrency_limit = Gauge(
+            "gateway_concurrency_limit", "服务当前并发上限（自适应限制时为调整后的值）", ("service",)
+        )
+        self.concurrency_in_flight = Gauge(
+            "gateway_concurrency_in_flight", "服务占用的并发名额", ("service",)
+        )
+        self.concurrency_queue_depth = Gauge(
+            "gateway_concurrency_queue_depth", "等待并发名额的排队请求数", ("service",)
+        )
+        self.concurrency_shed = Counter(
+            "gateway_concurrency_shed_total", "并发限制拒绝的请求数（reason：queue_full / queue_timeout）",
+            ("service", "reason", "status")
+        )
+        self.log_dropped = Counter(
+            "gateway_log_records_dropped_total", "日志队列已满而被丢弃的日志记录数", ()
+        )
+        # 计数在日志处理器中累加，导出快照时同步
+        self._log_dropped = self.log_dropped.labels()
+        self._metrics: List[Metric] = [
+            self.requests, self.request_duration, self.upstream_phase_duration, self.gateway_overhead,
+            self.in_flight, self.request_size, self.response_size, self.unmatched,
+            self.upstream_requests, self.upstream_duration, self.upstream_errors,
+            self.concurrency_limit, self.concurrency_in_flight, self.concurrency_queue_depth, self.concurrency_shed,
+            self.log_dropped
+        ]
+        # 导出快照前调用的采集函数，把其他模块维护的状态同步到指标
+        self._collectors: List[Callable[[], None]] = []
+        self._routes: Dict[LabelValues, RouteMetrics] = {}
+        self._services: Dict[str, ServiceMetrics] = {}
+        self._directory: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def route(self, service: str, route: str, method: str) -> RouteMetrics:
+        """获取路由预先绑定的子指标（构建路由表时调用）"""
+        key = (service, route, method)
+        metrics = self._routes.get(key)
+        if metrics is None:
+            metrics = self._routes[key] = RouteMetrics(self, service, route, method)
+        return metrics
+
+    def service(self, service: str) -> ServiceMetrics:
+        """获取服务预先绑定的上游调用子指标"""
+        metrics = self._services.get(service)
+        if metrics is None:
+            metrics = self._services[service] = ServiceMetrics(self, service)
+        return metrics
+
+    def add_collector(self, collector: Callable[[], None]):
+        """注册导出快照前调用的采集函数
+
+        Args:
+            collector: 把当前状态写入指标的函数
+        """
+        self._collectors.append(collector)
+
+    def start(self, directory: str, interval: float):
+        """多 worker 模式：定期把本 worker 的快照写入共享目录
+
+        Args:
+            directory: 共享目录，为空时只导出当前进程的指标
+            interval: 写入间隔（秒）
+        """
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._task = asyncio.create_task(self._sync(interval))
+        logger.info(f"📈 多进程指标目录: {directory}")
+
+    async def stop(self):
+        """停止同步并写入最后一次快照"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._directory:
+            self._write_snapshot()
+
+    def render(self) -> str:
+        """导出 Prometheus 文本格式"""
+        merged = self._merged_snapshots()
+        lines: List[str] = []
+        for metric in self._metrics:
+            samples = merged.get(metric.name, {})
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, values in sorted(samples.items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if isinstance(metric, Histogram):
+                    lines.extend(self._render_histogram(metric, pairs, values))
+                else:
+                    lines.append(f"{metric.name}{self._format_labels(pairs)} {self._format_value(values[0])}")
+        lines.append("")
+        return "\n".join(lines)
+
+    def _render_histogram(
+        self,
+        metric: Histogram,
+        pairs: List[Tuple[str, str]],
+        values: list
+    ) -> Iterable[str]:
+        """导出单个直方图子指标（桶计数累加）"""
+        cumulative = 0
+        for bound, count in zip([*metric.buckets, float("inf")], values[:-1]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else self._format_value(bound)
+            yield f"{metric.name}_bucket{self._format_labels(pairs + [('le', le)])} {cumulative}"
+        yield f"{metric.name}_sum{self._format_labels(pairs)} {self._format_value(values[-1])}"
+        yield f"{metric.name}_count{self._format_labels(pairs)} {cumulative}"
+
+    @staticmethod
+    def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+        if not pairs:
+            return ""
+        escaped = (
+            name + '="' + value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+            for name, value in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    def _local_snapshot(self) -> Dict[str, Dict[LabelValues, list]]:
+        """当前进程的指标快照"""
+        self._log_dropped.value = dropped_records()
+        for collector in self._collectors:
+            collector()
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def _merged_snapshots(self) -> Dict[str, Dict[LabelValues, list]]:
+        """合并当前进程与其他 worker 的快照"""
+        merged = self._local_snapshot()
+        if not self._directory:
+            return merged
+
+        gauges = {metric.name for metric in self._metrics if metric.kind == "gauge"}
+        for pid, snapshot in self._read_snapshots():
+            alive = self._is_alive(pid)
+            for name, samples in snapshot.items():
+                if name in gauges and not alive:
+                    continue
+                target = merged.setdefault(name, {})
+                for labels, values in samples.items():
+                    current = target.get(labels)
+                    target[labels] = (
+                        list(values) if current is None else [a + b for a, b in zip(current, values)]
+                    )
+        return merged
+
+    def _read_snapshots(self) -> Iterable[Tuple[int, Dict[str, Dict[LabelValues, list]]]]:
+        """读取其他 worker 写入的快照"""
+        for filename in os.listdir(self._directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                pid = int(filename[:-len(".json")])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self._directory, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield pid, {
+                name: {tuple(sample["labels"]): sample["values"] for sample in samples}
+                for name, samples in data.items()
+            }
+
+    def _write_snapshot(self):
+        """原子写入本 worker 的快照"""
+        data = {
+            name: [{"labels": list(labels), "values": values} for labels, values in samples.items()]
+            for name, samples in self._local_snapshot().items()
+        }
+        path = os.path.join(self._directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"写入指标快照失败: {e}")
+
+    async def _sync(self, interval: float):
+        """定期写入快照"""
+        while True:
+            self._write_snapshot()
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        """worker 进程是否存活"""
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+
+# 全局指标注册表
+metrics_registry = MetricsRegistry()
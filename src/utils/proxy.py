@@ -5,10 +5,10 @@
 """
 
 import httpx
-from fastapi import HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import HTTPException, Response
 
-from src.config import config
+from src.utils.http_client import client_registry
+from src.utils.json_codec import upstream_response
 from src.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -21,7 +21,7 @@ async def proxy_request(
     method: str = "GET",
     params: dict = None,
     json_data: dict = None
-) -> JSONResponse:
+) -> Response:
     """代理请求到后端服务
 
     Args:
@@ -33,7 +33,7 @@ async def proxy_request(
         json_data: POST 请求的 JSON 数据
 
     Returns:
-        JSONResponse: 代理的响应结果
+        Response: 代理的响应结果
 
     Raises:
         HTTPException: 当服务请求失败时
@@ -41,7 +41,8 @@ async def proxy_request(
     try:
         logger.info(f"收到 {service_name} 服务请求: {method} {service_url}{path}")
 
-        async with httpx.AsyncClient(timeout=config.TIMEOUT) as client:
+        client = client_registry.get_client(service_name)
+        async with client_registry.track(service_name, client):
             if method.upper() == "GET":
                 response = await client.get(f"{service_url}{path}", params=params)
             elif method.upper() == "POST":
@@ -53,13 +54,10 @@ async def proxy_request(
             else:
                 raise HTTPException(status_code=400, detail=f"不支持的 HTTP 方法: {method}")
 
-            logger.info(f"{service_name} 服务响应状态码: {response.status_code}")
+        logger.info(f"{service_name} 服务响应状态码: {response.status_code}")
 
-            try:
-                return JSONResponse(content=response.json(), status_code=response.status_code)
-            except Exception:
-                # 如果响应不是 JSON，返回原始文本
-                return JSONResponse(content={"data": response.text}, status_code=response.status_code)
+        # JSON 响应原样转发字节，不解析再序列化
+        return upstream_response(response)
 
     except httpx.TimeoutException:
         logger.error(f"{service_name} 服务请求超时")
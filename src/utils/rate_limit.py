@@ -0,0 +1,392 @@
+"""
+请求限流
+
+按路由或服务配置令牌桶 / 滑动窗口限流，维度可以是客户端 IP、API Key 或整体共享；
+限流状态保存在可替换的存储中：
+- memory：进程内字典，读-改-写之间没有 await，在事件循环上天然原子，无需加锁
+- sqlite:///path：同一主机上多个 uvicorn worker 共享的文件存储，跨进程保持同一配额
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from src.config import config
+from src.models.service_config import RateLimitConfig
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# 内存存储每处理多少次更新清理一次过期键
+SWEEP_INTERVAL = 1024
+
+# 限流状态：由各算法自行解释的数字列表（便于序列化到共享存储）
+RateLimitState = List[float]
+
+
+@dataclass
+class RateLimitResult:
+    """单次限流判定结果"""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float
+    retry_after: float = 0.0
+
+    def headers(self) -> Dict[str, str]:
+        """标准限流响应头（IETF RateLimit 头草案）"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+# 限流算法：输入旧状态（不存在时为 None）与当前时间，返回新状态与判定结果
+RateLimitUpdate = Callable[[Optional[RateLimitState], float], Tuple[RateLimitState, RateLimitResult]]
+
+
+def token_bucket(rule: RateLimitConfig) -> RateLimitUpdate:
+    """令牌桶：以 requests/period 的速率补充令牌，容量为 burst"""
+    capacity = rule.burst or rule.requests
+    rate = rule.requests / rule.period
+
+    def apply(state: Optional[RateLimitState], now: float) -> Tuple[RateLimitState, RateLimitResult]:
+        tokens, updated = state if state else (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        result = RateLimitResult(
+            allowed=allowed,
+            limit=capacity,
+            remaining=int(tokens),
+            reset=(capacity - tokens) / rate,
+            retry_after=0.0 if allowed else (1 - tokens) / rate
+        )
+        return [tokens, now], result
+
+    return apply
+
+
+def sliding_window(rule: RateLimitConfig) -> RateLimitUpdate:
+    """滑动窗口（计数近似）：按上一窗口计数的剩余比例与当前窗口计数之和判断"""
+    limit = rule.requests
+    period = rule.period
+
+    def apply(state: Optional[RateLimitState], now: float) -> Tuple[RateLimitState, RateLimitResult]:
+        start = math.floor(now / period) * period
+        current = previous = 0.0
+        if state:
+            stored_start, stored_current, stored_previous = state
+            if stored_start == start:
+                current, previous = stored_current, stored_previous
+            elif stored_start == start - period:
+                previous = stored_current
+
+        elapsed = now - start
+        estimated = previous * (1 - elapsed / period) + current
+        allowed = estimated + 1 <= limit
+        retry_after = 0.0
+        if allowed:
+            current += 1
+            estimated += 1
+        elif current + 1 > limit or previous == 0:
+            retry_after = period - elapsed
+        else:
+            # 上一窗口的权重衰减到足以容纳一个请求所需的时间
+            retry_after = period * (1 - (limit - 1 - current) / previous) - elapsed
+
+        result = RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, int(limit - estimated)),
+            reset=period - elapsed,
+            retry_after=max(0.0, retry_after)
+        )
+        return [start, current, previous], result
+
+    return apply
+
+
+class RateLimitStore(ABC):
+    """限流状态存储接口
+
+    实现需保证 update 对同一个键的读-改-写是原子的
+    """
+
+    @abstractmethod
+    async def update(self, key: str, apply: RateLimitUpdate, ttl: float) -> RateLimitResult:
+        """读取键的状态，应用限流算法后写回
+
+        Args:
+            key: 限流键
+            apply: 限流算法
+            ttl: 状态保留时间（秒），过期后视为不存在
+
+        Returns:
+            RateLimitResult: 判定结果
+        """
+
+    async def aclose(self):
+        """释放存储资源"""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """进程内限流存储（仅对当前 worker 生效）"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[RateLimitState, float]] = {}
+        self._updates = 0
+
+    async def update(self, key: str, apply: RateLimitUpdate, ttl: float) -> RateLimitResult:
+        now = time.time()
+        entry = self._entries.get(key)
+        state = entry[0] if entry is not None and entry[1] > now else None
+        state, result = apply(state, now)
+        self._entries[key] = (state, now + ttl)
+
+        self._updates += 1
+        if self._updates % SWEEP_INTERVAL == 0:
+            self._sweep(now)
+        return result
+
+    def _sweep(self, now: float):
+        """清理过期键"""
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+
+class SqliteRateLimitStore(RateLimitStore):
+    """SQLite 限流存储，同一主机上的多个 worker 共享同一数据库文件
+
+    每次更新在 BEGIN IMMEDIATE 事务中完成，跨进程互斥；数据库调用在线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 数据库文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._updates = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    async def update(self, key: str, apply: RateLimitUpdate, ttl: float) -> RateLimitResult:
+        return await asyncio.to_thread(self._update, key, apply, ttl)
+
+    async def aclose(self):
+        with self._lock:
+            self._conn.close()
+
+    def _update(self, key: str, apply: RateLimitUpdate, ttl: float) -> RateLimitResult:
+        """在事务中完成读-改-写"""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state, expires_at FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                state = json.loads(row[0]) if row is not None and row[1] > now else None
+                state, result = apply(state, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, state, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(state), now + ttl)
+                )
+
+                self._updates += 1
+                if self._updates % SWEEP_INTERVAL == 0:
+                    self._conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+
+def create_store(url: str) -> RateLimitStore:
+    """根据 RATE_LIMIT_STORE 创建限流存储
+
+    Args:
+        url: memory 或 sqlite:///path
+
+    Returns:
+        RateLimitStore: 限流存储
+
+    Raises:
+        ValueError: 不支持的存储类型
+    """
+    if url == "memory":
+        return MemoryRateLimitStore()
+    if url.startswith("sqlite://"):
+        return SqliteRateLimitStore(url[len("sqlite://"):])
+    raise ValueError(f"不支持的限流存储: {url}")
+
+
+def client_ip(request: Request) -> str:
+    """获取客户端 IP，配置了 CLIENT_IP_HEADER 时取该头的第一个地址"""
+    if config.CLIENT_IP_HEADER:
+        value = request.headers.get(config.CLIENT_IP_HEADER)
+        if value:
+            return value.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+@dataclass
+class RateLimiterStats:
+    """限流计数"""
+
+    allowed: int = 0
+    throttled: int = 0
+
+
+class RateLimiter:
+    """单个路由或服务的限流器"""
+
+    def __init__(self, name: str, rule: RateLimitConfig, store: RateLimitStore):
+        """
+        Args:
+            name: 限流器名称（同时作为存储键前缀）
+            rule: 限流配置
+            store: 限流状态存储
+        """
+        self.name = name
+        self.rule = rule
+        self.store = store
+        self.stats = RateLimiterStats()
+        if rule.algorithm == "sliding_window":
+            self._apply = sliding_window(rule)
+            self._ttl = 2 * rule.period
+        else:
+            self._apply = token_bucket(rule)
+            self._ttl = (rule.burst or rule.requests) * rule.period / rule.requests
+
+    async def check(self, request: Request) -> RateLimitResult:
+        """消耗一次配额
+
+        Args:
+            request: 客户端请求
+
+        Returns:
+            RateLimitResult: 判定结果
+        """
+        result = await self.store.update(self._key(request), self._apply, self._ttl)
+        if result.allowed:
+            self.stats.allowed += 1
+        else:
+            self.stats.throttled += 1
+        return result
+
+    def get_stats(self) -> dict:
+        """获取限流统计"""
+        return {
+            **asdict(self.stats),
+            "requests": self.rule.requests,
+            "period": self.rule.period,
+            "algorithm": self.rule.algorithm,
+            "key": self.rule.key
+        }
+
+    def _key(self, request: Request) -> str:
+        """按限流维度构建存储键，API Key 只保存摘要"""
+        if self.rule.key == "global":
+            return self.name
+        if self.rule.key == "api_key":
+            api_key = request.headers.get(self.rule.api_key_header)
+            if api_key:
+                digest = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+                return f"{self.name}|key:{digest}"
+        return f"{self.name}|ip:{client_ip(request)}"
+
+
+class RateLimiterRegistry:
+    """限流器注册表"""
+
+    def __init__(self):
+        self.store: RateLimitStore = MemoryRateLimitStore()
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def start(self, store_url: str):
+        """创建限流存储
+
+        Args:
+            store_url: 存储地址，见 create_store
+        """
+        self.store = create_store(store_url)
+        logger.info(f"限流存储: {store_url}")
+
+    async def aclose(self):
+        """关闭限流存储"""
+        await self.store.aclose()
+
+    def get_or_create(self, name: str, rule: RateLimitConfig) -> RateLimiter:
+        """获取或创建限流器，配置变化时重新创建
+
+        Args:
+            name: 限流器名称
+            rule: 限流配置
+
+        Returns:
+            RateLimiter: 限流器
+        """
+        limiter = self._limiters.get(name)
+        if limiter is None or limiter.rule != rule:
+            limiter = RateLimiter(name, rule, self.store)
+            self._limiters[name] = limiter
+        return limiter
+
+    async def check(self, request: Request, limiters: Iterable[RateLimiter]) -> Dict[str, str]:
+        """依次检查多个限流器（如服务级与路由级）
+
+        Args:
+            request: 客户端请求
+            limiters: 需要检查的限流器
+
+        Returns:
+            Dict[str, str]: 剩余配额最少的限流器的响应头
+
+        Raises:
+            HTTPException: 任一限流器拒绝时返回 429
+        """
+        tightest: Optional[RateLimitResult] = None
+        for limiter in limiters:
+            result = await limiter.check(request)
+            if not result.allowed:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="请求过于频繁，请稍后重试",
+                    headers=result.headers()
+                )
+            if tightest is None or result.remaining < tightest.remaining:
+                tightest = result
+        return tightest.headers() if tightest is not None else {}
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取所有限流器的统计"""
+        return {name: limiter.get_stats() for name, limiter in self._limiters.items()}
+
+
+# 全局限流器注册表
+rate_limiter_registry = RateLimiterRegistry()
@@ -0,0 +1,271 @@
+"""
+路由级响应缓存
+
+内存 LRU 缓存，按条目数与字节数双重限额，
+过期后在 stale-while-revalidate 窗口内先返回旧数据，并由单个后台任务刷新；
+过期条目带有 ETag / Last-Modified 时以条件请求回源，上游返回 304 则沿用已缓存的响应体
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Response
+
+from src.models.service_config import CacheConfig
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# 生成待缓存响应的回调
+ResponseLoader = Callable[[], Awaitable[Response]]
+# 缓存回源回调：参数为条件请求头（没有可重新验证的条目时为空），上游可返回 304
+ConditionalLoader = Callable[[Dict[str, str]], Awaitable[Response]]
+
+# 条件请求头 <- 缓存条目中的校验器
+_VALIDATORS = ((b"etag", "If-None-Match"), (b"last-modified", "If-Modified-Since"))
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目"""
+
+    body: bytes
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    stored_at: float
+
+    @property
+    def size(self) -> int:
+        """条目占用字节数（近似）"""
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def validators(self) -> Dict[str, str]:
+        """由条目的 ETag / Last-Modified 构建条件请求头"""
+        stored = dict(self.headers)
+        return {
+            header: stored[name].decode("latin-1") for name, header in _VALIDATORS if name in stored
+        }
+
+
+@dataclass
+class CacheStats:
+    """缓存计数"""
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    evictions: int = 0
+    refreshes: int = 0
+    refresh_failures: int = 0
+
+
+def build_cache_key(method: str, path: str, query_items: Iterable[Tuple[str, str]]) -> str:
+    """构建缓存键
+
+    查询参数按键值排序后编码，参数顺序不同的请求命中同一条目
+
+    Args:
+        method: HTTP 方法
+        path: 请求路径
+        query_items: 查询参数键值对
+
+    Returns:
+        str: 缓存键
+    """
+    query = urlencode(sorted(query_items))
+    return f"{method.upper()} {path}?{query}"
+
+
+class ResponseCache:
+    """单个路由的响应缓存"""
+
+    def __init__(self, name: str, cache_config: CacheConfig):
+        """
+        Args:
+            name: 缓存名称（用于统计与日志）
+            cache_config: 缓存配置
+        """
+        self.name = name
+        self.config = cache_config
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def fetch(
+        self,
+        key: str,
+        loader: ConditionalLoader,
+        refresh_loader: Optional[ConditionalLoader] = None
+    ) -> Response:
+        """读取缓存，未命中时调用 loader 回源
+
+        Args:
+            key: 缓存键
+            loader: 回源函数，过期条目有校验器时传入条件请求头
+            refresh_loader: 后台刷新使用的回源函数，默认与 loader 相同
+
+        Returns:
+            Response: 响应（带 X-Cache 头标识命中状态，上游确认未变化时为 REVALIDATED）
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age <= self.config.ttl:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return self._to_response(entry, "HIT")
+
+            if age <= self.config.ttl + self.config.stale_while_revalidate:
+                self._entries.move_to_end(key)
+                self.stats.stale_hits += 1
+                self._schedule_refresh(key, entry, refresh_loader or loader)
+                return self._to_response(entry, "STALE")
+
+        response = await loader(entry.validators() if entry is not None else {})
+        if response.status_code == 304 and entry is not None:
+            self.stats.revalidated += 1
+            return self._to_response(self._revalidate(key, entry, response), "REVALIDATED")
+
+        self.stats.misses += 1
+        self._store(key, response)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """获取缓存统计"""
+        return {
+            **asdict(self.stats),
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.config.max_entries,
+            "max_bytes": self.config.max_bytes
+        }
+
+    def _schedule_refresh(self, key: str, entry: CacheEntry, loader: ConditionalLoader):
+        """为过期条目启动后台刷新（同一键同时只有一个刷新任务）"""
+        if key in self._refreshing:
+            return
+
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, entry, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: str, entry: CacheEntry, loader: ConditionalLoader):
+        """后台刷新单个条目"""
+        try:
+            response = await loader(entry.validators())
+            if response.status_code == 304:
+                self._revalidate(key, entry, response)
+                self.stats.revalidated += 1
+            else:
+                self._store(key, response)
+            self.stats.refreshes += 1
+        except Exception as e:
+            self.stats.refresh_failures += 1
+            logger.warning(f"缓存 {self.name} 后台刷新失败: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def _store(self, key: str, response: Response):
+        """写入缓存，仅缓存 2xx 响应，必要时按 LRU 淘汰"""
+        if not 200 <= response.status_code < 300:
+            return
+
+        entry = CacheEntry(
+            body=bytes(response.body),
+            status_code=response.status_code,
+            headers=list(response.raw_headers),
+            stored_at=time.monotonic()
+        )
+        if entry.size > self.config.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+        while (
+            len(self._entries) > self.config.max_entries
+            or self._bytes > self.config.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.stats.evictions += 1
+
+    def _revalidate(self, key: str, entry: CacheEntry, not_modified: Response) -> CacheEntry:
+        """上游确认未变化：沿用响应体，以 304 响应中的校验器更新响应头并重新计时"""
+        updated = dict(not_modified.raw_headers)
+        headers = [(name, updated.pop(name, value)) for name, value in entry.headers]
+        headers.extend(updated.items())
+        refreshed = CacheEntry(
+            body=entry.body,
+            status_code=entry.status_code,
+            headers=headers,
+            stored_at=time.monotonic()
+        )
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._entries[key] = refreshed
+        self._bytes += refreshed.size
+        return refreshed
+
+    @staticmethod
+    def _to_response(entry: CacheEntry, state: str) -> Response:
+        """由缓存条目构建响应"""
+        response = Response(content=entry.body, status_code=entry.status_code)
+        response.raw_headers = list(entry.headers)
+        response.headers["X-Cache"] = state
+        return response
+
+
+class CacheRegistry:
+    """响应缓存注册表"""
+
+    def __init__(self):
+        self._caches: Dict[str, ResponseCache] = {}
+
+    def get_or_create(self, name: str, cache_config: CacheConfig) -> ResponseCache:
+        """获取或创建路由缓存，配置变化时重新创建
+
+        Args:
+            name: 缓存名称
+            cache_config: 缓存配置
+
+        Returns:
+            ResponseCache: 路由缓存
+        """
+        cache = self._caches.get(name)
+        if cache is None or cache.config != cache_config:
+            cache = ResponseCache(name, cache_config)
+            self._caches[name] = cache
+        return cache
+
+    def get(self, name: str) -> Optional[ResponseCache]:
+        """按名称获取缓存"""
+        return self._caches.get(name)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取所有缓存的统计"""
+        return {name: cache.get_stats() for name, cache in self._caches.items()}
+
+
+# 全局缓存注册表
+cache_registry = CacheRegistry()
@@ -0,0 +1,234 @@
+"""
+重试与对冲请求
+
+- 幂等请求失败后按指数退避（全抖动）重试，优先换到其他实例
+- 全局重试预算限制重试占比，避免故障期间重试放大流量
+- 对冲：首个请求超过路由历史延迟分位数仍未返回时，向另一个实例再发一次，取先成功者
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Deque, Optional, Set
+
+import httpx
+
+from src.config import config
+from src.models.service_config import HedgeConfig, RetryConfig
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# 默认允许重试的幂等方法
+IDEMPOTENT_METHODS = frozenset({"GET", "DELETE"})
+
+# 单次上游调用：参数为已尝试过的实例集合（调用方会把本次选中的实例加入其中）
+UpstreamAttempt = Callable[[Set[str]], Awaitable[httpx.Response]]
+
+
+@dataclass
+class RetryStats:
+    """重试与对冲计数"""
+
+    requests: int = 0
+    retries: int = 0
+    budget_exhausted: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+
+
+class RetryBudget:
+    """全局重试预算（令牌桶）"""
+
+    def __init__(self, ratio: float, min_per_second: float):
+        """
+        Args:
+            ratio: 每个请求存入的令牌数
+            min_per_second: 每秒保底补充的令牌数
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(10.0, min_per_second * 10)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def deposit(self):
+        """记录一次请求，存入令牌"""
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """尝试取出一个重试令牌
+
+        Returns:
+            bool: 预算充足时返回 True
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    @property
+    def tokens(self) -> float:
+        """当前剩余令牌"""
+        return self._tokens
+
+
+class LatencyTracker:
+    """路由延迟分位数统计（固定大小的样本窗口）"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._sorted: Optional[list] = None
+
+    def record(self, latency: float):
+        """记录一次成功调用的耗时"""
+        self._samples.append(latency)
+        self._sorted = None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """获取分位数，无样本时返回 None"""
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class RetryExecutor:
+    """按路由配置执行重试与对冲"""
+
+    def __init__(self, budget: RetryBudget):
+        self.budget = budget
+        self.stats = RetryStats()
+
+    async def execute(
+        self,
+        attempt: UpstreamAttempt,
+        method: str,
+        retry: Optional[RetryConfig],
+        hedge: Optional[HedgeConfig],
+        latency: Optional[LatencyTracker]
+    ) -> httpx.Response:
+        """执行上游调用
+
+        Args:
+            attempt: 单次上游调用
+            method: HTTP 方法
+            retry: 重试配置，None 表示不重试
+            hedge: 对冲配置，None 表示不对冲
+            latency: 路由延迟统计（对冲延迟来源）
+
+        Returns:
+            httpx.Response: 上游响应
+
+        Raises:
+            httpx.RequestError: 所有尝试均失败时抛出最后一次的异常
+        """
+        self.stats.requests += 1
+        self.budget.deposit()
+
+        allowed = method.upper() in IDEMPOTENT_METHODS or (
+            retry is not None and retry.retry_non_idempotent
+        )
+        attempts = retry.attempts if retry is not None and allowed else 1
+        tried: Set[str] = set()
+
+        for index in range(attempts):
+            last = index == attempts - 1
+            try:
+                if hedge is not None and allowed:
+                    response = await self._hedged(attempt, tried, hedge, latency)
+                else:
+                    response = await self._timed(attempt, tried, latency)
+            except httpx.RequestError as e:
+                if last or not self._withdraw():
+                    raise
+                logger.warning(f"上游请求失败，准备重试 ({index + 1}/{attempts}): {e}")
+            else:
+                if last or response.status_code not in retry.retry_on_status or not self._withdraw():
+                    return response
+                logger.warning(f"上游返回 {response.status_code}，准备重试 ({index + 1}/{attempts})")
+
+            self.stats.retries += 1
+            await asyncio.sleep(self._backoff(index, retry))
+
+    def get_stats(self) -> dict:
+        """获取重试统计"""
+        return {**asdict(self.stats), "budget_tokens": round(self.budget.tokens, 2)}
+
+    def _withdraw(self) -> bool:
+        """取出重试令牌并计数"""
+        if self.budget.try_withdraw():
+            return True
+        self.stats.budget_exhausted += 1
+        return False
+
+    @staticmethod
+    def _backoff(index: int, retry: RetryConfig) -> float:
+        """指数退避（全抖动）"""
+        return random.uniform(0, min(retry.backoff_max, retry.backoff_base * (2 ** index)))
+
+    @staticmethod
+    async def _timed(
+        attempt: UpstreamAttempt,
+        tried: Set[str],
+        latency: Optional[LatencyTracker]
+    ) -> httpx.Response:
+        """执行单次调用并记录成功调用的延迟"""
+        start = time.perf_counter()
+        response = await attempt(tried)
+        if latency is not None and response.status_code < 500:
+            latency.record(time.perf_counter() - start)
+        return response
+
+    async def _hedged(
+        self,
+        attempt: UpstreamAttempt,
+        tried: Set[str],
+        hedge: HedgeConfig,
+        latency: Optional[LatencyTracker]
+    ) -> httpx.Response:
+        """对冲调用：延迟后向另一个实例再发一次，返回先成功的响应"""
+        delay = hedge.initial_delay
+        if latency is not None and len(latency) >= hedge.min_samples:
+            delay = max(hedge.min_delay, latency.percentile(hedge.percentile))
+
+        primary = asyncio.ensure_future(self._timed(attempt, tried, latency))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._withdraw():
+                return await primary
+
+            self.stats.hedges += 1
+            tasks.add(asyncio.ensure_future(self._timed(attempt, tried, latency)))
+
+            failed: Optional[asyncio.Task] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        if task is not primary:
+                            self.stats.hedge_wins += 1
+                        return task.result()
+                    failed = failed or task
+            return failed.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+# 全局重试执行器
+retry_executor = RetryExecutor(
+    RetryBudget(config.RETRY_BUDGET_RATIO, config.RETRY_BUDGET_MIN_PER_SECOND)
+)
@@ -0,0 +1,367 @@
+"""
+编译后的网关路由表
+
+所有配置路由由一个兜底处理函数分发，不再逐条注册 Starlette 路由（Starlette 按正则线性匹配）：
+- 静态路径：哈希表直接命中，查找开销与路由数量无关
+- 含 {param} 段或以 /* 结尾的前缀路由：按路径段构建的前缀树，查找开销只与路径段数有关
+- 同一路径按 HTTP 方法分发，路径匹配但方法不匹配时返回 405
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from starlette.routing import Route
+
+from src.config import config
+from src.models.service_config import RouteItem
+from src.utils.access_log import log_access
+from src.utils.metrics import RouteMetrics, metrics_registry
+from src.utils.tracing import Trace, tracer
+
+# 路由处理函数：参数为客户端请求与渲染后的后端路径
+RouteHandler = Callable[[Request, str], Awaitable[Response]]
+
+# 路径参数段，如 {stock_code}
+PARAM_SEGMENT = re.compile(r"^\{([A-Za-z_][A-Za-z0-9_]*)\}$")
+# 前缀路由的通配段
+WILDCARD_SEGMENT = "*"
+# 兜底路由接受的方法（具体方法由路由表分发）
+DISPATCH_METHODS = ["GET", "HEAD", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"]
+
+
+def split_path(path: str) -> List[str]:
+    """按 / 切分路径，忽略首尾空段"""
+    return [segment for segment in path.strip("/").split("/") if segment]
+
+
+def param_name(segment: str) -> Optional[str]:
+    """路径段为 {name} 时返回参数名"""
+    match = PARAM_SEGMENT.match(segment)
+    return match.group(1) if match else None
+
+
+@dataclass
+class RouteEntry:
+    """路由表中的一条路由"""
+
+    service_name: str
+    route: RouteItem
+    handler: RouteHandler
+    # 后端路径模板的路径段（静态段、{param} 或末尾的 *）
+    backend_segments: List[str] = field(init=False)
+    # 后端路径不含参数与通配段时直接使用
+    static_backend_path: Optional[str] = field(init=False)
+    # 预先绑定标签的路由指标
+    metrics: RouteMetrics = field(init=False)
+
+    def __post_init__(self):
+        self.metrics = metrics_registry.route(self.service_name, self.route.path, self.route.method)
+        template = self.route.backend_path or self.route.path
+        self.backend_segments = split_path(template)
+        dynamic = any(
+            segment == WILDCARD_SEGMENT or param_name(segment) for segment in self.backend_segments
+        )
+        self.static_backend_path = None if dynamic else template
+
+    def backend_path(self, params: Dict[str, str], remainder: Optional[str]) -> str:
+        """用路径参数与通配部分渲染后端路径
+
+        Args:
+            params: 路径参数
+            remainder: 前缀路由匹配到的剩余路径
+
+        Returns:
+            str: 后端路径
+        """
+        if self.static_backend_path is not None:
+            return self.static_backend_path
+
+        parts = []
+        for segment in self.backend_segments:
+            if segment == WILDCARD_SEGMENT:
+                if remainder:
+                    parts.append(quote(remainder, safe="/"))
+                continue
+            name = param_name(segment)
+            parts.append(quote(params[name], safe="") if name else segment)
+        return "/" + "/".join(parts)
+
+
+def _duplicate(route: RouteItem, existing_service: str, service_name: str) -> ValueError:
+    """路由重复配置的错误"""
+    return ValueError(
+        f"路由重复: {route.method} {route.path}（服务 {existing_service} 与 {service_name}）"
+    )
+
+
+class _Node:
+    """前缀树节点"""
+
+    __slots__ = ("children", "param", "param_name", "methods", "wildcard")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.param_name: Optional[str] = None
+        # 路径在此结束的路由（方法 -> 路由）
+        self.methods: Dict[str, RouteEntry] = {}
+        # 以此为前缀的通配路由（方法 -> 路由）
+        self.wildcard: Dict[str, RouteEntry] = {}
+
+
+class RouteTable:
+    """编译后的路由表（构建完成后只读，热重载时整体替换）"""
+
+    def __init__(self):
+        self._static: Dict[str, Dict[str, RouteEntry]] = {}
+        self._root = _Node()
+        self.size = 0
+
+    def add(self, entry: RouteEntry):
+        """加入一条路由
+
+        Args:
+            entry: 路由
+
+        Raises:
+            ValueError: 同一路径与方法重复配置，或同一位置的参数名冲突
+        """
+        methods = self._methods(entry.route.path)
+        existing = methods.get(entry.route.method)
+        if existing is not None:
+            raise _duplicate(entry.route, existing.service_name, entry.service_name)
+        methods[entry.route.method] = entry
+        self.size += 1
+
+    @classmethod
+    def check_conflicts(cls, items: Iterable[Tuple[str, RouteItem]]):
+        """只检查路由冲突，不构建处理函数（不会创建或替换缓存、限流器等路由状态）
+
+        Args:
+            items: (服务名称, 路由配置) 列表
+
+        Raises:
+            ValueError: 同一路径与方法重复配置，或同一位置的参数名冲突
+        """
+        table = cls()
+        for service_name, route in items:
+            methods = table._methods(route.path)
+            existing = methods.get(route.method)
+            if existing is not None:
+                raise _duplicate(route, existing, service_name)
+            methods[route.method] = service_name
+
+    def _methods(self, path: str) -> dict:
+        """路径对应的 方法 -> 路由 映射（必要时创建前缀树节点）
+
+        Raises:
+            ValueError: 同一位置的参数名冲突
+        """
+        segments = split_path(path)
+        if not any(segment == WILDCARD_SEGMENT or param_name(segment) for segment in segments):
+            return self._static.setdefault("/" + "/".join(segments), {})
+
+        node = self._root
+        wildcard = segments[-1] == WILDCARD_SEGMENT
+        for segment in segments[:-1] if wildcard else segments:
+            name = param_name(segment)
+            if name is None:
+                node = node.children.setdefault(segment, _Node())
+                continue
+            if node.param is None:
+                node.param, node.param_name = _Node(), name
+            elif node.param_name != name:
+                raise ValueError(
+                    f"路由 {path} 的参数 {{{name}}} 与同一位置的参数 {{{node.param_name}}} 冲突"
+                )
+            node = node.param
+        return node.wildcard if wildcard else node.methods
+
+    def match(
+        self,
+        method: str,
+        path: str
+    ) -> Tuple[Optional[RouteEntry], Dict[str, str], Optional[str], List[str]]:
+        """查找路由
+
+        静态路径优先，其次按路径段依次尝试静态段、参数段、通配前缀
+
+        Args:
+            method: HTTP 方法
+            path: 请求路径
+
+        Returns:
+            Tuple: 命中的路由（未命中为 None）、路径参数、通配剩余路径、
+                   路径匹配但方法不匹配时允许的方法
+        """
+        allowed: List[str] = []
+        segments = split_path(path)
+
+        methods = self._static.get("/" + "/".join(segments))
+        if methods is not None:
+            entry = self._select(methods, method)
+            if entry is not None:
+                return entry, {}, None, []
+            allowed.extend(methods)
+
+        for methods, params, remainder in self._walk(self._root, segments, 0, {}):
+            entry = self._select(methods, method)
+            if entry is not None:
+                if remainder and path.endswith("/"):
+                    remainder += "/"
+                return entry, params, remainder, []
+            allowed.extend(m for m in methods if m not in allowed)
+
+        return None, {}, None, allowed
+
+    @staticmethod
+    def _select(methods: Dict[str, RouteEntry], method: str) -> Optional[RouteEntry]:
+        """按方法选择路由，HEAD 请求可由 GET 路由处理"""
+        entry = methods.get(method)
+        if entry is None and method == "HEAD":
+            entry = methods.get("GET")
+        return entry
+
+    def _walk(
+        self,
+        node: _Node,
+        segments: List[str],
+        index: int,
+        params: Dict[str, str]
+    ) -> Iterator[Tuple[Dict[str, RouteEntry], Dict[str, str], Optional[str]]]:
+        """按优先级产出匹配的候选路由集合"""
+        if index == len(segments):
+            if node.methods:
+                yield node.methods, params, None
+        else:
+            segment = segments[index]
+            child = node.children.get(segment)
+            if child is not None:
+                yield from self._walk(child, segments, index + 1, params)
+            if node.param is not None:
+                yield from self._walk(
+                    node.param, segments, index + 1, {**params, node.param_name: segment}
+                )
+        if node.wildcard:
+            yield node.wildcard, params, "/".join(segments[index:])
+
+
+class RouteDispatcher:
+    """网关兜底处理函数，按当前路由表分发请求"""
+
+    def __init__(self):
+        self.table = RouteTable()
+        self._installed = False
+
+    def install(self, app: FastAPI):
+        """在应用路由末尾注册兜底路由（只注册一次）
+
+        Args:
+            app: FastAPI 应用
+        """
+        if not self._installed:
+            app.router.routes.append(
+                Route(
+                    "/{path:path}",
+                    endpoint=self.dispatch,
+                    methods=DISPATCH_METHODS,
+                    include_in_schema=False
+                )
+            )
+            self._installed = True
+
+    def swap(self, table: RouteTable):
+        """替换路由表（单次赋值，对进行中的请求没有影响）"""
+        self.table = table
+
+    async def dispatch(self, request: Request) -> Response:
+        """分发请求到匹配的路由
+
+        Raises:
+            HTTPException: 没有匹配的路径（404）或方法不允许（405）
+        """
+        trace, trace_token = tracer.begin(request)
+        response: Optional[Response] = None
+        try:
+            with trace.span("route_lookup"):
+                entry, params, remainder, allowed = self.table.match(request.method, request.scope["path"])
+            if entry is None:
+                metrics_registry.unmatched.labels("405" if allowed else "404").inc()
+                if allowed:
+                    raise HTTPException(
+                        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
+                        detail="Method Not Allowed",
+                        headers={"Allow": ", ".join(allowed)}
+                    )
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+            request.scope["path_params"] = params
+            response = await self._handle(request, entry, entry.backend_path(params, remainder), trace)
+            response.headers[config.REQUEST_ID_HEADER] = trace.request_id
+            return response
+        except HTTPException as e:
+            e.headers = {**(e.headers or {}), config.REQUEST_ID_HEADER: trace.request_id}
+            raise
+        finally:
+            tracer.end(trace, trace_token, response)
+
+    @staticmethod
+    async def _handle(request: Request, entry: RouteEntry, backend_path: str, trace: Trace) -> Response:
+        """调用路由处理函数，记录指标、访问日志与追踪属性"""
+        trace.root.name = f"{request.method} {entry.route.path}"
+        trace.root.attributes["service"] = entry.service_name
+        metrics = entry.metrics
+        timing, token = metrics.start()
+        start = time.perf_counter()
+        response: Optional[Response] = None
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        try:
+            response = await entry.handler(request, backend_path)
+            status_code = response.status_code
+            return response
+        except HTTPException as e:
+            status_code = e.status_code
+            raise
+        except asyncio.CancelledError:
+            # 客户端断开连接
+            status_code = 499
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            request_size = _content_length(request.headers.get("content-length"))
+            response_size = _response_size(response)
+            trace.root.attributes["status"] = status_code
+            metrics.finish(timing, token, status_code, elapsed, request_size, response_size)
+            log_access(
+                request, entry.service_name, entry.route, status_code, elapsed, timing.upstream,
+                request_size, response_size
+            )
+
+
+def _content_length(value: Optional[str]) -> Optional[int]:
+    """解析 Content-Length，缺失或无效时返回 None"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _response_size(response: Optional[Response]) -> Optional[int]:
+    """已缓冲响应取响应体长度，流式响应取 Content-Length（未知时返回 None）"""
+    if response is None:
+        return None
+    body = getattr(response, "body", None)
+    if body is not None:
+        return len(body)
+    return _content_length(response.headers.get("content-length"))
+
+
+# 全局路由分发器
+route_dispatcher = RouteDispatcher()
@@ -0,0 +1,130 @@
+"""
+请求合并（single-flight）
+
+相同键的并发调用只执行一次，所有等待者共享同一结果或异常
+"""
+
+import asyncio
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+from fastapi import Response
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    """请求合并计数"""
+
+    executions: int = 0
+    coalesced: int = 0
+
+
+def copy_response(response: Response) -> Response:
+    """复制响应对象，避免多个请求共享同一可变响应头
+
+    Args:
+        response: 原始响应（需已渲染 body）
+
+    Returns:
+        Response: 内容相同的新响应
+    """
+    copied = Response(content=response.body, status_code=response.status_code)
+    copied.raw_headers = list(response.raw_headers)
+    return copied
+
+
+class SingleFlight(Generic[T]):
+    """单个路由的请求合并器"""
+
+    def __init__(self, name: str, share: Optional[Callable[[T], T]] = None):
+        """
+        Args:
+            name: 名称（用于统计）
+            share: 共享结果给等待者前的复制函数，默认直接共享
+        """
+        self.name = name
+        self.stats = SingleFlightStats()
+        self._share = share
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """执行调用，若相同键已有调用在进行中则等待其结果
+
+        实际调用在独立任务中执行，发起者被取消（如客户端断开）不会影响其他等待者
+
+        Args:
+            key: 调用键
+            fn: 实际调用
+
+        Returns:
+            T: 调用结果
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+            result = await asyncio.shield(task)
+            return self._share(result) if self._share else result
+
+        self.stats.executions += 1
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def is_running(self, key: str) -> bool:
+        """相同键是否已有调用在进行中"""
+        return key in self._calls
+
+    @property
+    def in_flight(self) -> int:
+        """进行中的调用数"""
+        return len(self._calls)
+
+    def get_stats(self) -> dict:
+        """获取合并统计"""
+        return {**asdict(self.stats), "in_flight": self.in_flight}
+
+    def _finish(self, key: str, task: asyncio.Task):
+        """调用结束后移除记录"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有等待者都已取消时避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+
+class SingleFlightRegistry:
+    """请求合并器注册表"""
+
+    def __init__(self):
+        self._groups: Dict[str, SingleFlight] = {}
+
+    def get_or_create(
+        self,
+        name: str,
+        share: Optional[Callable[[T], T]] = None
+    ) -> SingleFlight[T]:
+        """获取或创建请求合并器
+
+        Args:
+            name: 名称
+            share: 共享结果的复制函数
+
+        Returns:
+            SingleFlight: 请求合并器
+        """
+        group = self._groups.get(name)
+        if group is None:
+            group = SingleFlight(name, share)
+            self._groups[name] = group
+        return group
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取所有合并器的统计"""
+        return {name: group.get_stats() for name, group in self._groups.items()}
+
+
+# 全局请求合并器注册表
+single_flight_registry = SingleFlightRegistry()
@@ -0,0 +1,157 @@
+"""
+流式透传代理
+
+请求体与响应体均以字节流原样转发，不做 JSON 解析与重新编码
+"""
+
+from contextlib import AbstractAsyncContextManager, AsyncExitStack
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from src.utils.compression import accepts
+from src.utils.http_client import client_registry
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# RFC 7230 6.1 定义的逐跳头部，不能跨代理转发
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+})
+
+
+def filter_headers(
+    headers: Iterable[Tuple[str, str]],
+    exclude: Iterable[str] = ()
+) -> List[Tuple[str, str]]:
+    """过滤逐跳头部
+
+    除固定的逐跳头部外，`Connection` 头中列出的字段同样视为逐跳头部
+
+    Args:
+        headers: 原始头部键值对
+        exclude: 额外需要去除的头部（小写）
+
+    Returns:
+        List[Tuple[str, str]]: 可转发的头部（保留重复字段，如 Set-Cookie）
+    """
+    items = list(headers)
+    dropped = set(HOP_BY_HOP_HEADERS) | {name.lower() for name in exclude}
+    for name, value in items:
+        if name.lower() == "connection":
+            dropped.update(token.strip().lower() for token in value.split(",") if token.strip())
+
+    return [(name, value) for name, value in items if name.lower() not in dropped]
+
+
+async def stream_proxy(
+    request: Request,
+    client: httpx.AsyncClient,
+    service_name: str,
+    url: str,
+    method: str,
+    trackers: Sequence[AbstractAsyncContextManager] = (),
+    extra_headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[httpx.Timeout] = None,
+    extensions: Optional[Dict[str, object]] = None
+) -> StreamingResponse:
+    """以流式方式代理请求
+
+    Args:
+        request: 客户端请求
+        client: 上游客户端
+        service_name: 服务名称
+        url: 上游完整 URL（不含查询参数）
+        method: HTTP 方法
+        trackers: 需要覆盖整个响应周期的上下文（如并发名额、实例并发计数）
+        extra_headers: 额外附加到上游请求的头部
+        timeout: 上游调用超时，默认使用客户端超时
+        extensions: httpx 请求扩展（如追踪回调）
+
+    Returns:
+        StreamingResponse: 逐块转发上游响应字节的响应
+
+    Raises:
+        httpx.RequestError: 建立上游连接或读取响应头失败时
+    """
+    headers = filter_headers(request.headers.items(), exclude=("host", "accept-encoding"))
+    # 上游字节原样转发给客户端，只能请求客户端接受的编码；
+    # 客户端未声明时明确要求 identity，避免 httpx 默认的 gzip, deflate 让上游返回客户端无法解码的响应
+    accept_encoding = request.headers.get("accept-encoding") or "identity"
+    headers.append(("accept-encoding", accept_encoding))
+    if extra_headers:
+        extra_names = {name.lower() for name in extra_headers}
+        headers = [(k, v) for k, v in headers if k.lower() not in extra_names]
+        headers.extend(extra_headers.items())
+    has_body = method.upper() in ("POST", "PUT", "PATCH")
+
+    upstream_request = client.build_request(
+        method,
+        url,
+        params=request.query_params.multi_items(),
+        headers=headers,
+        content=request.stream() if has_body else None,
+        extensions=extensions,
+        **({"timeout": timeout} if timeout is not None else {})
+    )
+
+    # 连接占用统计与上游响应需要在响应体发送完毕后才释放
+    resources = AsyncExitStack()
+    await resources.enter_async_context(client_registry.track(service_name, client))
+    try:
+        for tracker in trackers:
+            await resources.enter_async_context(tracker)
+        upstream_response = await client.send(upstream_request, stream=True)
+    except BaseException:
+        await resources.aclose()
+        raise
+    resources.push_async_callback(upstream_response.aclose)
+
+    # 上游无视请求仍返回了客户端不接受的编码时，改为转发解压后的字节
+    encoding = upstream_response.headers.get("content-encoding", "").strip().lower()
+    decode = bool(encoding) and encoding != "identity" and not accepts(accept_encoding, encoding)
+    if decode:
+        logger.warning(f"{service_name} 返回了客户端不接受的编码 {encoding}，解压后转发")
+    excluded = ("date", "server")  # 由网关所在服务器重新生成
+    if decode:
+        excluded += ("content-encoding", "content-length")
+
+    response = StreamingResponse(
+        _iter_upstream(upstream_response, resources, service_name, decode),
+        status_code=upstream_response.status_code,
+        background=BackgroundTask(resources.aclose)
+    )
+    response.raw_headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in filter_headers(upstream_response.headers.multi_items(), exclude=excluded)
+    ]
+    return response
+
+
+async def _iter_upstream(
+    response: httpx.Response,
+    resources: AsyncExitStack,
+    service_name: str,
+    decode: bool = False
+) -> AsyncIterator[bytes]:
+    """逐块读取上游原始字节（保留 content-encoding，不解压）；decode 为 True 时读取解压后的字节"""
+    try:
+        async for chunk in (response.aiter_bytes() if decode else response.aiter_raw()):
+            yield chunk
+    except httpx.RequestError as e:
+        logger.error(f"{service_name} 流式响应中断: {e}")
+    finally:
+        await resources.aclose()
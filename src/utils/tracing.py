@@ -0,0 +1,418 @@
+"""
+请求 ID 与分布式追踪
+
+- 每个网关路由请求接受客户端传入的请求 ID（REQUEST_ID_HEADER）与 W3C traceparent，缺失时生成，
+  并转发给上游、在响应头中返回请求 ID
+- 采样的请求记录各阶段的 span：路由查找、请求体读取、上游调用（连接池等待、建连、首字节）与响应写出
+- span 由后台线程批量交给可替换的导出器（memory / file / log），采样决定之外的请求只生成 ID，开销很小
+"""
+
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Deque, Dict, List, Mapping, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.background import BackgroundTask
+
+from src.config import config
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# W3C traceparent: version-trace_id-parent_id-flags
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# 接受的客户端请求 ID
+REQUEST_ID = re.compile(r"^[A-Za-z0-9._:\-]{1,128}$")
+# 内存导出器保留的 trace 数
+MEMORY_EXPORTER_SIZE = 1000
+# 待导出队列容量，导出跟不上时丢弃
+EXPORT_QUEUE_SIZE = 10000
+
+# httpcore trace 事件前缀（去掉 http11./http2. 协议前缀后）到 span 名称的映射
+_UPSTREAM_PHASES = {
+    "connect_tcp": "connect",
+    "connect_unix_socket": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send_headers",
+    "send_request_body": "send_body",
+    "receive_response_headers": "ttfb",
+    "receive_response_body": "response_body",
+}
+
+_NULL_SPAN = nullcontext()
+
+
+def _new_id(bits: int) -> str:
+    """生成十六进制随机 ID"""
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def request_id_from(headers: Mapping[str, str]) -> str:
+    """取客户端传入的请求 ID，缺失或格式不合法时生成新的 ID"""
+    request_id = headers.get(config.REQUEST_ID_HEADER)
+    if request_id is None or not REQUEST_ID.match(request_id):
+        request_id = _new_id(128)
+    return request_id
+
+
+@dataclass
+class Span:
+    """追踪中的一个阶段"""
+
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class _SpanScope:
+    """with 语句内的 span，退出时记录结束时间与异常"""
+
+    __slots__ = ("span",)
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end = time.perf_counter()
+        if exc_type is not None:
+            self.span.attributes["error"] = exc_type.__name__
+        return False
+
+
+class Trace:
+    """单个请求的追踪上下文"""
+
+    __slots__ = ("trace_id", "request_id", "sampled", "root", "spans", "_epoch")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], request_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.request_id = request_id
+        self.sampled = sampled
+        start = time.perf_counter()
+        # perf_counter 与墙钟时间的换算基准
+        self._epoch = time.time() - start
+        self.root = Span("gateway", _new_id(64), parent_id, start)
+        self.spans: List[Span] = [self.root]
+
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> ContextManager:
+        """在 with 语句中记录一个阶段，未采样时不记录"""
+        if not self.sampled:
+            return _NULL_SPAN
+        return _SpanScope(self.start_span(name, parent, **attributes))
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """开始一个阶段（跨越多个调用点时使用，由 end_span 结束）"""
+        span = Span(name, _new_id(64), (parent or self.root).span_id, time.perf_counter(), None, attributes)
+        if self.sampled:
+            self.spans.append(span)
+        return span
+
+    @staticmethod
+    def end_span(span: Span, **attributes: Any):
+        """结束阶段"""
+        span.end = time.perf_counter()
+        if attributes:
+            span.attributes.update(attributes)
+
+    def headers(self, span: Optional[Span] = None) -> Dict[str, str]:
+        """转发给上游的请求 ID 与 traceparent（上游的父 span 为本次上游调用）"""
+        span_id = (span or self.root).span_id
+        return {
+            config.REQUEST_ID_HEADER: self.request_id,
+            "traceparent": f"00-{self.trace_id}-{span_id}-{'01' if self.sampled else '00'}"
+        }
+
+    def httpx_extensions(self, span: Span) -> Dict[str, Any]:
+        """采样时通过 httpcore trace 扩展记录连接池等待、建连与首字节等阶段"""
+        if not self.sampled:
+            return {}
+        started: Dict[str, float] = {}
+        pool = self.start_span("pool_acquire", span)
+
+        async def on_event(event: str, info: dict):
+            now = time.perf_counter()
+            if pool.end is None:
+                pool.end = now
+            name, _, stage = event.rpartition(".")
+            phase = _UPSTREAM_PHASES.get(name.rpartition(".")[2])
+            if phase is None:
+                return
+            if stage == "started":
+                if phase == "send_headers":
+                    # 首字节时间从开始发送请求算起
+                    started["ttfb"] = now
+                if phase != "ttfb":
+                    started[phase] = now
+                return
+            child = Span(phase, _new_id(64), span.span_id, started.pop(phase, now), now)
+            if stage == "failed":
+                child.attributes["error"] = True
+            self.spans.append(child)
+
+        return {"trace": on_event}
+
+    def to_dicts(self) -> List[dict]:
+        """导出格式：时间为墙钟秒数，耗时为毫秒"""
+        return [
+            {
+                "trace_id": self.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start_time": round(self._epoch + span.start, 6),
+                "duration_ms": round(((span.end or span.start) - span.start) * 1000, 3),
+                "attributes": span.attributes
+            }
+            for span in self.spans
+        ]
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """当前请求的追踪上下文"""
+    return _current_trace.get()
+
+
+def phase(name: str, **attributes: Any) -> ContextManager:
+    """在当前请求的追踪中记录一个阶段（没有追踪或未采样时不记录）"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return trace.span(name, **attributes)
+
+
+class SpanExporter(ABC):
+    """span 导出器接口，export 在后台线程中调用"""
+
+    @abstractmethod
+    def export(self, spans: List[dict]):
+        """导出一批 span
+
+        Args:
+            spans: 见 Trace.to_dicts
+        """
+
+    def close(self):
+        """释放导出器资源"""
+
+
+class MemorySpanExporter(SpanExporter):
+    """保存在内存中的最近 trace（测试与 GET /gateway/traces 使用）"""
+
+    def __init__(self, size: int = MEMORY_EXPORTER_SIZE):
+        self._traces: Deque[List[dict]] = deque(maxlen=size)
+
+    def export(self, spans: List[dict]):
+        self._traces.append(spans)
+
+    def recent(self, limit: int = 20) -> List[List[dict]]:
+        """最近的 trace，最新的在前"""
+        return list(self._traces)[::-1][:limit]
+
+
+class FileSpanExporter(SpanExporter):
+    """追加写入 JSON Lines 文件，每行一个 span"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: List[dict]):
+        self._file.write("".join(json.dumps(span, ensure_ascii=False) + "\n" for span in spans))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class LogSpanExporter(SpanExporter):
+    """通过 gateway.trace 日志输出（每个 trace 一条）"""
+
+    def __init__(self):
+        self._logger = logging.getLogger("gateway.trace")
+
+    def export(self, spans: List[dict]):
+        root = spans[0]
+        self._logger.info(
+            "trace %s %s %.1fms", root["trace_id"], root["name"], root["duration_ms"],
+            extra={"fields": {"type": "trace", "spans": spans}}
+        )
+
+
+def create_exporter(url: str) -> Optional[SpanExporter]:
+    """根据 TRACE_EXPORTER 创建导出器
+
+    Args:
+        url: none、memory、log 或 file:///path
+
+    Returns:
+        Optional[SpanExporter]: 导出器，none 时为 None
+
+    Raises:
+        ValueError: 不支持的导出器
+    """
+    if url in ("", "none"):
+        return None
+    if url == "memory":
+        return MemorySpanExporter()
+    if url == "log":
+        return LogSpanExporter()
+    if url.startswith("file://"):
+        return FileSpanExporter(url[len("file://"):])
+    raise ValueError(f"不支持的追踪导出器: {url}")
+
+
+@dataclass
+class TracerStats:
+    """追踪计数"""
+
+    traces: int = 0
+    sampled: int = 0
+    exported: int = 0
+    dropped: int = 0
+    export_errors: int = 0
+
+
+class Tracer:
+    """追踪器：生成追踪上下文、做采样决定，并在后台线程中导出"""
+
+    def __init__(self):
+        self.exporter: Optional[SpanExporter] = None
+        self.sample_rate = 0.0
+        self.stats = TracerStats()
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(EXPORT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, exporter_url: str, sample_rate: float, exporter: Optional[SpanExporter] = None):
+        """配置导出器与采样率
+
+        Args:
+            exporter_url: 导出器地址，见 create_exporter
+            sample_rate: 采样比例（0~1）；上游已采样（traceparent flags=01）的请求总是采样
+            exporter: 自定义导出器，优先于 exporter_url
+        """
+        self.exporter = exporter or create_exporter(exporter_url)
+        self.sample_rate = sample_rate
+        if self.exporter is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+            logger.info(f"🔭 追踪已启用: {type(self.exporter).__name__}，采样率 {sample_rate}")
+
+    def stop(self):
+        """导出剩余的 trace 后停止后台线程"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def begin(self, request: Request) -> Tuple[Trace, Token]:
+        """开始请求的追踪
+
+        Args:
+            request: 客户端请求
+
+        Returns:
+            Tuple: 追踪上下文与用于恢复上下文变量的 token
+        """
+        headers = request.headers
+        request_id = request_id_from(headers)
+
+        trace_id = parent_id = None
+        parent_sampled = False
+        traceparent = headers.get("traceparent")
+        if traceparent:
+            match = TRACEPARENT.match(traceparent.strip().lower())
+            if match and match.group(1) != "0" * 32:
+                trace_id, parent_id = match.group(1), match.group(2)
+                parent_sampled = int(match.group(3), 16) & 1 == 1
+
+        sampled = self.exporter is not None and (
+            parent_sampled or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        )
+        trace = Trace(trace_id or _new_id(128), parent_id, request_id, sampled)
+        trace.root.attributes.update(method=request.method, path=request.scope["path"])
+        self.stats.traces += 1
+        return trace, _current_trace.set(trace)
+
+    def end(self, trace: Trace, token: Token, response: Optional[Response]):
+        """请求处理结束：恢复上下文变量；采样的请求在响应写出后导出
+
+        Args:
+            trace: 追踪上下文
+            token: begin 返回的 token
+            response: 处理函数返回的响应，异常时为 None
+        """
+        _current_trace.reset(token)
+        if not trace.sampled:
+            return
+        if response is None:
+            self._finish(trace)
+            return
+
+        write = trace.start_span("response_write")
+        background = response.background
+
+        async def written():
+            trace.end_span(write)
+            try:
+                if background is not None:
+                    await background()
+            finally:
+                self._finish(trace)
+
+        response.background = BackgroundTask(written)
+
+    def get_stats(self) -> dict:
+        """获取追踪统计"""
+        return {
+            "exporter": type(self.exporter).__name__ if self.exporter else None,
+            "sample_rate": self.sample_rate,
+            "queued": self._queue.qsize(),
+            **self.stats.__dict__
+        }
+
+    def _finish(self, trace: Trace):
+        """结束根 span 并放入导出队列"""
+        trace.root.end = time.perf_counter()
+        self.stats.sampled += 1
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.stats.dropped += 1
+
+    def _run(self):
+        """后台线程：逐个导出 trace"""
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                self.exporter.export(trace.to_dicts())
+                self.stats.exported += 1
+            except Exception as e:
+                self.stats.export_errors += 1
+                logger.warning(f"追踪导出失败: {e}")
+
+
+# 全局追踪器
+tracer = Tracer()
@@ -0,0 +1,251 @@
+"""
+上游调用
+
+选择上游实例（负载均衡、健康检查、熔断）并发送单次请求
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Set, Tuple
+
+import httpx
+from fastapi import HTTPException, status
+
+from src.utils.circuit_breaker import CircuitBreaker, breaker_registry
+from src.utils.compression import accepts
+from src.utils.concurrency import limiter_registry
+from src.utils.deadline import Deadline
+from src.utils.health_checker import health_checker
+from src.utils.http_client import client_registry
+from src.utils.json_codec import RAW_CONTENT, is_json
+from src.utils.load_balancer import EndpointState, LoadBalancer, balancer_registry
+from src.utils.logger import setup_logger
+from src.utils.metrics import metrics_registry
+from src.utils.tracing import current_trace
+
+logger = setup_logger()
+
+
+def select_endpoint(
+    service_name: str,
+    tried: Optional[Set[str]] = None
+) -> Tuple[LoadBalancer, EndpointState, CircuitBreaker]:
+    """通过负载均衡器选择上游实例，跳过不健康或已熔断的实例
+
+    重试与对冲时优先选择尚未尝试过的实例，全部尝试过则允许重复
+
+    Args:
+        service_name: 服务名称
+        tried: 已尝试过的实例
+
+    Returns:
+        Tuple: 负载均衡器、选中的实例及其熔断器
+
+    Raises:
+        HTTPException: 服务没有可用实例时，立即返回 503 而不是等待超时
+    """
+    balancer = balancer_registry.get(service_name)
+    tripped = breaker_registry.unavailable_endpoints(service_name)
+    exclude = health_checker.unhealthy_endpoints(service_name) | tripped
+    endpoint = None
+    if balancer is not None:
+        if tried:
+            endpoint = balancer.select(exclude | tried)
+        if endpoint is None:
+            endpoint = balancer.select(exclude)
+    breaker = breaker_registry.get(service_name, endpoint.url) if endpoint else None
+    if endpoint is None or breaker is None:
+        breaker_registry.reject(service_name, tripped)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"服务 {service_name} 没有可用实例"
+        )
+    return balancer, endpoint, breaker
+
+
+async def call_upstream(
+    service_name: str,
+    backend_path: str,
+    method: str,
+    params: dict = None,
+    json_data: dict = None,
+    tried: Optional[Set[str]] = None,
+    deadline: Optional[Deadline] = None,
+    headers: Optional[Dict[str, str]] = None,
+    accept_encoding: Optional[str] = None
+) -> httpx.Response:
+    """选择上游实例并发送请求
+
+    Args:
+        service_name: 服务名称
+        backend_path: 后端服务路径
+        method: HTTP 方法
+        params: URL 参数
+        json_data: POST/PUT 请求的 JSON 数据
+        tried: 本次请求已尝试过的实例，优先选择其他实例，并记录本次选中的实例
+        deadline: 请求截止时间，决定本次调用的超时并传递给后端
+        headers: 额外请求头（如缓存重新验证的条件请求头）
+        accept_encoding: 客户端的 Accept-Encoding，指定时转发给上游，
+            上游按其中的编码压缩的 JSON 响应保留原始字节（见 json_codec.RAW_CONTENT）
+
+    Returns:
+        httpx.Response: 上游响应
+
+    Raises:
+        HTTPException: 没有可用实例、服务繁忙被拒绝、截止时间已过或方法不支持时
+        httpx.RequestError: 上游请求失败时
+    """
+    if deadline is not None:
+        deadline.check()
+
+    # 服务并发限制：超出时排队，排队时间不超过剩余截止时间
+    limiter = limiter_registry.get(service_name)
+    if limiter is None:
+        return await _call_endpoint(
+            service_name, backend_path, method, params, json_data, tried, deadline, headers, accept_encoding
+        )
+
+    async with limiter.slot(deadline.remaining() if deadline else None):
+        return await _call_endpoint(
+            service_name, backend_path, method, params, json_data, tried, deadline, headers, accept_encoding
+        )
+
+
+async def _call_endpoint(
+    service_name: str,
+    backend_path: str,
+    method: str,
+    params: dict = None,
+    json_data: dict = None,
+    tried: Optional[Set[str]] = None,
+    deadline: Optional[Deadline] = None,
+    extra_headers: Optional[Dict[str, str]] = None,
+    accept_encoding: Optional[str] = None
+) -> httpx.Response:
+    """向选中的实例发送请求，记录负载均衡与熔断统计"""
+    timeout: Optional[httpx.Timeout] = None
+    headers: Dict[str, str] = dict(extra_headers or {})
+    if deadline is not None:
+        deadline.check()
+        timeout = deadline.httpx_timeout()
+        headers.update(deadline.headers())
+
+    balancer, endpoint, breaker = select_endpoint(service_name, tried)
+    if tried is not None:
+        tried.add(endpoint.url)
+    url = f"{endpoint.base_url}{backend_path}"
+    logger.debug("代理请求: %s %s", method, url)
+
+    # 请求 ID 与 traceparent 转发给上游，采样时记录本次调用的各阶段
+    trace = current_trace()
+    span = None
+    extensions: Dict[str, object] = {}
+    if trace is not None:
+        span = trace.start_span("upstream", service=service_name, endpoint=endpoint.url, method=method)
+        headers = {**headers, **trace.headers(span)}
+        extensions = trace.httpx_extensions(span)
+
+    client = client_registry.get_client(service_name)
+    service_metrics = metrics_registry.service(service_name)
+    breaker.on_request()
+    start = time.perf_counter()
+    try:
+        async with client_registry.track(service_name, client), balancer.track(endpoint):
+            response = await _send(
+                client, url, method, params, json_data, headers, timeout, extensions, accept_encoding
+            )
+    except httpx.RequestError as e:
+        elapsed = time.perf_counter() - start
+        breaker.record(None, elapsed)
+        service_metrics.record(None, e, elapsed)
+        if span is not None:
+            trace.end_span(span, error=type(e).__name__)
+        raise
+    except asyncio.CancelledError:
+        breaker.release()
+        if span is not None:
+            trace.end_span(span, cancelled=True)
+        raise
+    elapsed = time.perf_counter() - start
+    breaker.record(response.status_code, elapsed)
+    service_metrics.record(response.status_code, None, elapsed)
+    if span is not None:
+        trace.end_span(span, status=response.status_code)
+    return response
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    url: str,
+    method: str,
+    params: dict = None,
+    json_data: dict = None,
+    headers: Dict[str, str] = None,
+    timeout: Optional[httpx.Timeout] = None,
+    extensions: Optional[Dict[str, object]] = None,
+    accept_encoding: Optional[str] = None
+) -> httpx.Response:
+    """按 HTTP 方法发送请求"""
+    # 未指定超时时沿用客户端默认超时
+    extra = {"headers": headers}
+    if timeout is not None:
+        extra["timeout"] = timeout
+    if extensions:
+        extra["extensions"] = extensions
+
+    if accept_encoding is not None:
+        return await _send_passthrough(client, url, method, params, json_data, accept_encoding, extra)
+
+    if method.upper() == "GET":
+        return await client.get(url, params=params, **extra)
+    elif method.upper() == "POST":
+        return await client.post(url, json=json_data, **extra)
+    elif method.upper() == "PUT":
+        return await client.put(url, json=json_data, **extra)
+    elif method.upper() == "DELETE":
+        return await client.delete(url, params=params, **extra)
+    elif method.upper() == "PATCH":
+        return await client.patch(url, json=json_data, **extra)
+    else:
+        raise HTTPException(status_code=400, detail=f"不支持的 HTTP 方法: {method}")
+
+
+async def _send_passthrough(
+    client: httpx.AsyncClient,
+    url: str,
+    method: str,
+    params: Optional[dict],
+    json_data: Optional[dict],
+    accept_encoding: str,
+    extra: Dict[str, object]
+) -> httpx.Response:
+    """以客户端的 Accept-Encoding 发送请求
+
+    上游按客户端接受的编码压缩的 JSON 响应只读取原始字节（存入 RAW_CONTENT，不解压）；
+    其他响应（未压缩、非 JSON 或客户端不接受的编码）照常读取并解压
+    """
+    if method.upper() not in ("GET", "POST", "PUT", "DELETE", "PATCH"):
+        raise HTTPException(status_code=400, detail=f"不支持的 HTTP 方法: {method}")
+    has_body = method.upper() in ("POST", "PUT", "PATCH")
+    extra["headers"] = {**(extra["headers"] or {}), "accept-encoding": accept_encoding}
+    request = client.build_request(
+        method,
+        url,
+        params=None if has_body else params,
+        json=json_data if has_body else None,
+        **extra
+    )
+    response = await client.send(request, stream=True)
+    try:
+        encoding = response.headers.get("content-encoding", "").strip().lower()
+        if (
+            encoding and encoding != "identity"
+            and is_json(response.headers.get("content-type"))
+            and accepts(accept_encoding, encoding)
+        ):
+            response.extensions[RAW_CONTENT] = b"".join([chunk async for chunk in response.aiter_raw()])
+        else:
+            await response.aread()
+    finally:
+        await response.aclose()
+    return response